@@ -0,0 +1,69 @@
+"""
+Compare per-frame text parameter sampling and box rotation with the block-sampled augmentation engine.
+
+Only parameters and boxes are timed, the drawing is the same for both.
+The per-frame path is the dataset creator's previous one: a random.Random
+per frame, cv2.transform per rotated box, and frames whose rotated text
+left the image dropped.
+
+Run from the repository root:
+    python -m benchmarks.bench_augmentation --frames 20000
+"""
+import argparse
+import random
+import string
+import time
+import cv2
+import numpy as np
+from utils.augmentation import AugmentationEngine, TextAugmentation, FONTS
+
+def per_frame(seed, frame_index, width=640, height=640, margin=20):
+    """
+    Sample one frame the previous way, returning its box or None when the frame was dropped.
+    """
+    rng = random.Random(f"{seed}:video:{frame_index}")
+    if rng.random() >= 0.7:
+        return ()
+    section = lambda n: "".join(rng.choices(string.ascii_letters + string.digits, k=n)).upper()
+    text = "  ".join(f"{section(4)}-{section(6)}-{section(4)}")
+    x, y = rng.randint(10, width - 200), rng.randint(10, height - 30)
+    font = int(rng.choice(FONTS))
+    font_scale = round(rng.uniform(0.3, 0.7), 2)
+    thickness = rng.randint(1, 3)
+    _ = (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255))
+    (text_width, text_height), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+    x = min(max(margin, x), width - text_width - margin)
+    y = min(max(margin + text_height, y), height - text_height - margin)
+    if rng.random() >= 0.5:
+        return (x, y - text_height, x + text_width, y + baseline)
+    matrix = cv2.getRotationMatrix2D((x + text_width // 2, y - text_height // 2), rng.uniform(-30, 30), 1.0)
+    corners = np.array([[x, y - text_height], [x + text_width, y - text_height],
+                        [x + text_width, y + baseline], [x, y + baseline]])
+    rotated = cv2.transform(corners.reshape(-1, 1, 2), matrix).reshape(-1, 2)
+    if rotated[:, 0].min() < 0 or rotated[:, 0].max() > width or rotated[:, 1].min() < 0 or rotated[:, 1].max() > height:
+        return None
+    return (*rotated.min(axis=0), *rotated.max(axis=0))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--block-size", type=int, default=64)
+    parser.add_argument("--instances", type=int, default=1, help="Most text instances per frame for the engine")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dropped = sum(per_frame(0, i) is None for i in range(args.frames))
+    previous = time.perf_counter() - start
+
+    engine = AugmentationEngine([TextAugmentation(max_instances=args.instances)], block_size=args.block_size)
+    engine.sample(np.random.default_rng(0), args.block_size)  # warm up
+    start = time.perf_counter()
+    for block in range(0, args.frames, args.block_size):
+        engine.sample(np.random.default_rng([0, block]), args.block_size)
+    blocked = time.perf_counter() - start
+
+    print(f"Per frame: {previous / args.frames * 1e6:7.1f} us/frame, {dropped} frames dropped")
+    print(f"Blocked:   {blocked / args.frames * 1e6:7.1f} us/frame, 0 frames dropped ({previous / blocked:.1f}x)")
+
+if __name__ == "__main__":
+    main()
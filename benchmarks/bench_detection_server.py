@@ -0,0 +1,79 @@
+"""
+Load-test a running detection server and report requests/sec and tail latency.
+
+Start the server first, e.g.:
+    python -m utils.detection_server --port 8080
+
+Then run from the repository root:
+    python -m benchmarks.bench_detection_server --address http://127.0.0.1:8080 --clients 8
+"""
+import argparse
+import json
+import threading
+import time
+import numpy as np
+from utils.batching import percentile
+from utils.detection_server import DetectionClient
+
+def client_loop(address, frames, requests, encoding, with_crops, latencies, errors):
+    client = DetectionClient(address)
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            try:
+                client.detect(frames, encoding=encoding, with_crops=with_crops)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors.append(1)
+                # The connection may be unusable after an error
+                client.close()
+                client = DetectionClient(address)
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--address", default="http://127.0.0.1:8080", help="Server URL or Unix socket path")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    parser.add_argument("--frames-per-request", type=int, default=1)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--encoding", choices=("raw", "jpeg"), default="raw")
+    parser.add_argument("--crops", action="store_true", help="Ask for the crops too")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+              for _ in range(args.frames_per_request)]
+
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client_loop, args=(args.address, frames, args.requests, args.encoding,
+                                                          args.crops, latencies, errors))
+               for _ in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": len(latencies) / elapsed,
+        "frames_per_sec": len(latencies) * args.frames_per_request / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+    for name, value in results.items():
+        print(f"{name:>16}: {value:.2f}" if isinstance(value, float) else f"{name:>16}: {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measure peak memory of the frame queue at several resolutions, bounded by frame count or by bytes.
+
+A producer decodes a synthetic video into a DynamicBatcher, and a
+consumer slower than the decoder drains it, so the queue stays full.
+Each configuration runs in its own process, so peak RSS is its own.
+
+Run from the repository root:
+    python -m benchmarks.bench_frame_memory --frames 300 --queue-size 250 --queue-bytes 268435456
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from benchmarks.bench_frame_reader import make_synthetic_video
+from utils.batching import DynamicBatcher
+from utils.frame_pool import FramePool
+from utils.frame_reader import sample_frames
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+def run(video_path, queue_size, queue_bytes, pooled, consume_seconds, result):
+    pool = FramePool() if pooled else None
+    batcher = DynamicBatcher(max_batch_size=8, max_wait=0.01, max_queue=queue_size, max_bytes=queue_bytes,
+                             size_fn=lambda item: item[0].nbytes)
+
+    def consume():
+        while True:
+            batch = batcher.next_batch()
+            if batch is None:
+                break
+            time.sleep(consume_seconds * len(batch))
+            for _, release in batch:
+                if release is not None:
+                    release()
+            batcher.task_done(len(batch))
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    start = time.perf_counter()
+    for _, frame in sample_frames(video_path, frame_pool=pool):
+        batcher.put((frame, pool.release_fn(frame) if pool is not None else None))
+    batcher.close()
+    consumer.join()
+    result.put({"seconds": time.perf_counter() - start,
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                "pool": pool.stats() if pool is not None else None})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--queue-size", type=int, default=250, help="Frames the queue may hold")
+    parser.add_argument("--queue-bytes", type=int, default=256 * (1 << 20), help="Bytes the queue may hold")
+    parser.add_argument("--consume-ms", type=float, default=5.0, help="Consumer time per frame")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    work_dir = tempfile.mkdtemp()
+    try:
+        for name, (width, height) in RESOLUTIONS.items():
+            video_path = make_synthetic_video(os.path.join(work_dir, f"{name}.mp4"), args.frames, width, height)
+            for label, queue_bytes, pooled in (("frame count", None, False), ("bytes + pool", args.queue_bytes, True)):
+                result = ctx.Queue()
+                process = ctx.Process(target=run, args=(video_path, args.queue_size, queue_bytes, pooled,
+                                                        args.consume_ms / 1000, result))
+                process.start()
+                stats = result.get()
+                process.join()
+                print(f"{name:>6} {label:>12}: peak RSS {stats['peak_rss_mb']:7.0f} MB, "
+                      f"{args.frames / stats['seconds']:6.1f} frames/s"
+                      + (f", pool {stats['pool']}" if stats["pool"] else ""))
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare the old read-every-frame loop against utils.frame_reader.sample_frames.
+
+Run from the repository root:
+    python -m benchmarks.bench_frame_reader --frames 600 --stride 12
+"""
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from utils.frame_reader import sample_frames
+
+def make_synthetic_video(path, frames=600, width=1280, height=720, fps=30):
+    """
+    Write a synthetic video with moving content so the codec has real work to do.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = np.roll(background, i * 4, axis=1)
+        cv2.putText(frame, f"FRAME {i:05d}", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def legacy_loop(video_path, stride):
+    """
+    The loop get_objects.producer used: read() every frame, keep every stride-th.
+    """
+    cap = cv2.VideoCapture(video_path)
+    kept = 0
+    frame_count = 0
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_count += 1
+        if frame_count % stride != 0:
+            continue
+        kept += 1
+    cap.release()
+    return kept
+
+def time_it(fn, *args, **kwargs):
+    start = time.perf_counter()
+    kept = fn(*args, **kwargs)
+    return kept, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--stride", type=int, default=12)
+    parser.add_argument("--seek-threshold", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = make_synthetic_video(os.path.join(tmp_dir, "synthetic.mp4"),
+                                          args.frames, args.width, args.height)
+
+        runs = {
+            "legacy read()": lambda: legacy_loop(video_path, args.stride),
+            "grab/retrieve": lambda: sum(1 for _ in sample_frames(
+                video_path, stride=args.stride, offset=args.stride - 1,
+                seek_threshold=args.seek_threshold)),
+            "keyframes": lambda: sum(1 for _ in sample_frames(video_path, keyframes_only=True)),
+            "2 fps": lambda: sum(1 for _ in sample_frames(video_path, target_fps=2)),
+        }
+
+        for name, run in runs.items():
+            kept, elapsed = time_it(run)
+            print(f"{name:>15}: kept {kept:5d} frames in {elapsed:7.3f}s "
+                  f"({args.frames / elapsed:8.1f} source frames/sec)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure get_objects import time and time-to-first-detection in fresh interpreters.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 5 --json startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import get_objects
+print(time.perf_counter() - start)
+"""
+
+FIRST_DETECTION_SNIPPET = """
+import time
+start = time.perf_counter()
+import get_objects
+import numpy as np
+detector = get_objects.get_model()
+if {warmup}:
+    detector.warmup()
+ready = time.perf_counter()
+detector([np.zeros((720, 1280, 3), dtype=np.uint8)])
+done = time.perf_counter()
+print(done - start, done - ready)
+"""
+
+def run_snippet(snippet):
+    output = subprocess.run([sys.executable, "-c", snippet], check=True,
+                            capture_output=True, text=True).stdout
+    return [float(value) for value in output.strip().splitlines()[-1].split()]
+
+def summarize(samples):
+    return {"median_sec": statistics.median(samples), "min_sec": min(samples), "max_sec": max(samples)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    import_times = [run_snippet(IMPORT_SNIPPET)[0] for _ in range(args.runs)]
+    cold = [run_snippet(FIRST_DETECTION_SNIPPET.format(warmup=False)) for _ in range(args.runs)]
+    warm = [run_snippet(FIRST_DETECTION_SNIPPET.format(warmup=True)) for _ in range(args.runs)]
+
+    results = {
+        "import": summarize(import_times),
+        "time_to_first_detection": summarize([total for total, _ in cold]),
+        "first_batch_without_warmup": summarize([first for _, first in cold]),
+        "first_batch_after_warmup": summarize([first for _, first in warm]),
+    }
+
+    for name, summary in results.items():
+        print(f"{name:>28}: {summary['median_sec'] * 1000:9.1f} ms median")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare downloading every video before generating the dataset with streaming ingest.
+
+Downloads are simulated by a throttled fake YoutubeDL that copies local
+synthetic videos, so no network is needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming_ingest --videos 4 --download-seconds 2
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+from benchmarks.bench_frame_reader import make_synthetic_video
+from utils.download_manager import DownloadManager, video_id
+from utils.parallel_dataset import build_dataset_parallel
+
+def throttled_downloader(sources, seconds):
+    """
+    Build a YoutubeDL stand-in that copies sources[url] to the output file in `seconds`.
+    """
+    class ThrottledYoutubeDL:
+        def __init__(self, options):
+            self.output_path = options["outtmpl"]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def download(self, urls):
+            with open(sources[urls[0]], "rb") as src, open(self.output_path + ".part", "wb") as dst:
+                data = src.read()
+                chunk = max(1, len(data) // 20)
+                for i in range(0, len(data), chunk):
+                    dst.write(data[i:i + chunk])
+                    time.sleep(seconds / 20)
+            os.replace(self.output_path + ".part", self.output_path)
+
+    return ThrottledYoutubeDL
+
+def run(streaming, jobs, sources, args, logger):
+    work_dir = tempfile.mkdtemp()
+    try:
+        manager = DownloadManager(os.path.join(work_dir, "raw"), max_workers=args.download_workers,
+                                  ydl_class=throttled_downloader(sources, args.download_seconds))
+        start = time.perf_counter()
+        if streaming:
+            video_paths = manager.stream(jobs)
+        else:
+            video_paths = [path for path in manager.download_all(jobs) if path]
+        build_dataset_parallel(video_paths, os.path.join(work_dir, "processed"), logger,
+                               num_workers=args.workers, seed=0)
+        return time.perf_counter() - start
+    finally:
+        shutil.rmtree(work_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--videos", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--download-seconds", type=float, default=2.0, help="Time each fake download takes")
+    parser.add_argument("--download-workers", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=2, help="Dataset generation processes")
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench_streaming_ingest")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    source_dir = tempfile.mkdtemp()
+    try:
+        sources, jobs = {}, []
+        for i in range(args.videos):
+            url = f"https://www.youtube.com/watch?v=video_{i}"
+            sources[url] = make_synthetic_video(os.path.join(source_dir, f"source_{i}.mp4"), args.frames, 1280, 720)
+            jobs.append((url, f"{video_id(url)}.mp4"))
+
+        sequential = run(False, jobs, sources, args, logger)
+        streaming = run(True, jobs, sources, args, logger)
+    finally:
+        shutil.rmtree(source_dir)
+
+    print(f"Download then convert: {sequential:.2f} s")
+    print(f"Streaming ingest:      {streaming:.2f} s ({sequential / streaming:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare the full-canvas text rendering of the dataset creator against utils.text_overlay.
+
+Run from the repository root:
+    python -m benchmarks.bench_text_overlay --iterations 500
+"""
+import argparse
+import random
+import time
+import cv2
+import numpy as np
+from utils.text_overlay import TextOverlay
+
+FONTS = [cv2.FONT_HERSHEY_PLAIN, cv2.FONT_HERSHEY_COMPLEX,
+         cv2.FONT_HERSHEY_TRIPLEX, cv2.FONT_HERSHEY_COMPLEX_SMALL]
+
+def make_params(count, seed=0):
+    """
+    Draw the same random text parameters the dataset creator would.
+    """
+    rng = random.Random(seed)
+    params = []
+    for _ in range(count):
+        text = "  ".join("".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", k=16)))
+        font = rng.choice(FONTS)
+        scale = round(rng.uniform(0.3, 0.7), 2)
+        thickness = rng.randint(1, 3)
+        color = (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255))
+        angle = rng.uniform(-30, 30) if rng.random() < 0.5 else 0.0
+        params.append((text, font, scale, thickness, color, angle))
+    return params
+
+def full_canvas(frame, text, font, scale, thickness, color, angle):
+    """
+    The previous approach: render onto a blank full-size canvas, warp it and blend it.
+    """
+    height, width = frame.shape[:2]
+    (text_width, text_height), _ = cv2.getTextSize(text, font, scale, thickness)
+    x, y = 40, 320
+    text_img = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.putText(text_img, text, (x, y), font, scale, color, thickness)
+    if angle:
+        matrix = cv2.getRotationMatrix2D((x + text_width // 2, y - text_height // 2), angle, 1.0)
+        text_img = cv2.warpAffine(text_img, matrix, (width, height))
+    return cv2.addWeighted(frame, 1, text_img, 1, 0)
+
+def roi_overlay(overlay, frame, text, font, scale, thickness, color, angle):
+    (text_width, text_height), _ = cv2.getTextSize(text, font, scale, thickness)
+    x, y = 40, 320
+    overlay.draw(frame, text, (x, y), font, scale, color, thickness,
+                 angle=angle, center=(x + text_width // 2, y - text_height // 2))
+    return frame
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    params = make_params(args.iterations)
+    base = np.random.default_rng(0).integers(0, 255, (640, 640, 3), dtype=np.uint8)
+
+    start = time.perf_counter()
+    for text, font, scale, thickness, color, angle in params:
+        full_canvas(base.copy(), text, font, scale, thickness, color, angle)
+    legacy = time.perf_counter() - start
+
+    overlay = TextOverlay()
+    start = time.perf_counter()
+    for text, font, scale, thickness, color, angle in params:
+        roi_overlay(overlay, base.copy(), text, font, scale, thickness, color, angle)
+    cold = time.perf_counter() - start
+
+    # Second pass with every sprite already cached
+    start = time.perf_counter()
+    for text, font, scale, thickness, color, angle in params:
+        roi_overlay(overlay, base.copy(), text, font, scale, thickness, color, angle)
+    warm = time.perf_counter() - start
+
+    for name, elapsed in (("full canvas", legacy), ("roi, cold cache", cold), ("roi, warm cache", warm)):
+        print(f"{name:>16}: {elapsed / args.iterations * 1e6:8.1f} us/frame")
+
+if __name__ == "__main__":
+    main()
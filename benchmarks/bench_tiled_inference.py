@@ -0,0 +1,123 @@
+"""
+Compare full-frame, tiled and coarse-then-refine inference on high-resolution frames.
+
+Frames are synthetic: textured backgrounds with text drawn at the sizes the
+dataset is generated with, so every frame has known ground-truth boxes.
+Reports frames/sec, tiles run per frame, recall and precision per mode.
+
+Run from the repository root:
+    python -m benchmarks.bench_tiled_inference --weights yolo11n_trained.pt --width 3840 --height 2160
+"""
+import argparse
+import json
+import string
+import time
+import cv2
+import numpy as np
+from utils.detector import Detector
+from utils.postprocess import to_numpy
+from utils.tiling import SlicedDetector
+from utils.tracker import iou_matrix
+
+FONTS = [cv2.FONT_HERSHEY_PLAIN, cv2.FONT_HERSHEY_COMPLEX, cv2.FONT_HERSHEY_TRIPLEX, cv2.FONT_HERSHEY_COMPLEX_SMALL]
+
+def make_frame(rng, width, height, objects):
+    """
+    Draw text objects onto a textured background.
+
+    Returns:
+        tuple: (frame, (N, 4) ground-truth xyxy boxes)
+    """
+    noise = rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8)
+    frame = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    boxes = []
+    for _ in range(objects):
+        text = "-".join("".join(rng.choice(list(string.ascii_uppercase + string.digits), n)) for n in (4, 6, 4))
+        spaced_text = "  ".join(text)
+        font = FONTS[rng.integers(len(FONTS))]
+        font_scale = float(rng.uniform(0.3, 0.7))
+        thickness = int(rng.integers(1, 4))
+        (text_width, text_height), baseline = cv2.getTextSize(spaced_text, font, font_scale, thickness)
+        x = int(rng.integers(20, width - text_width - 20))
+        y = int(rng.integers(20 + text_height, height - baseline - 20))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.putText(frame, spaced_text, (x, y), font, font_scale, color, thickness)
+        boxes.append([x, y - text_height, x + text_width, y + baseline])
+    return frame, np.array(boxes, dtype=np.float32)
+
+def score(results, truths, conf, iou_threshold=0.5):
+    """
+    Count true positives, false positives and missed objects over all frames.
+    """
+    tp = fp = fn = 0
+    for result, truth in zip(results, truths):
+        boxes = to_numpy(result.boxes.xyxy).reshape(-1, 4)
+        boxes = boxes[to_numpy(result.boxes.conf) >= conf]
+        matched = set()
+        if len(boxes) and len(truth):
+            ious = iou_matrix(boxes, truth)
+            for b in np.argsort(-ious.max(axis=1)):
+                t = int(ious[b].argmax())
+                if ious[b, t] >= iou_threshold and t not in matched:
+                    matched.add(t)
+        tp += len(matched)
+        fp += len(boxes) - len(matched)
+        fn += len(truth) - len(matched)
+    return tp, fp, fn
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--weights", default="yolo11n_trained.pt")
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--objects", type=int, default=3, help="Text objects per frame")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--conf", type=float, default=0.7, help="Confidence a box needs to count")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    samples = [make_frame(rng, args.width, args.height, args.objects) for _ in range(args.frames)]
+    frames = [frame for frame, _ in samples]
+    truths = [boxes for _, boxes in samples]
+
+    detector = Detector(args.weights, args.backend)
+    detector.warmup(batch_size=args.batch_size)
+
+    modes = {
+        "full_frame": detector,
+        "tiles": SlicedDetector(detector, "tiles", tile_size=args.tile_size, overlap=args.overlap,
+                                batch_size=args.batch_size * 2),
+        "refine": SlicedDetector(detector, "refine", tile_size=args.tile_size, overlap=args.overlap,
+                                 batch_size=args.batch_size * 2),
+    }
+
+    report = {}
+    for name, model in modes.items():
+        results = []
+        start = time.perf_counter()
+        for i in range(0, len(frames), args.batch_size):
+            results.extend(model(frames[i:i + args.batch_size], imgsz=640))
+        elapsed = time.perf_counter() - start
+
+        tp, fp, fn = score(results, truths, args.conf)
+        report[name] = {
+            "frames_per_sec": len(frames) / elapsed,
+            "tiles_per_frame": getattr(model, "tiles_run", 0) / len(frames),
+            "recall": tp / (tp + fn) if tp + fn else 0.0,
+            "precision": tp / (tp + fp) if tp + fp else 0.0,
+        }
+        print(f"{name:>10}: {report[name]['frames_per_sec']:7.2f} frames/s, "
+              f"{report[name]['tiles_per_frame']:5.1f} tiles/frame, "
+              f"recall {report[name]['recall']:.3f}, precision {report[name]['precision']:.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "modes": report}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
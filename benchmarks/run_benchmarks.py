@@ -0,0 +1,260 @@
+"""
+Benchmark every stage of the detection and dataset pipelines on synthetic videos.
+
+Each stage runs in its own process so its peak RSS is measured in isolation.
+Results are written as JSON so runs from different commits can be compared.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --output bench_output.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.bench_frame_reader import make_synthetic_video
+
+def peak_rss_mb():
+    """
+    Get the peak resident set size of this process in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def summarize(count, seconds, latencies):
+    """
+    Build the result of a stage from its item count, wall time and per-item latencies.
+    """
+    from utils.batching import percentile
+
+    return {
+        "items": count,
+        "seconds": seconds,
+        "items_per_sec": count / seconds if seconds > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+def bench_decode(video_paths, stride):
+    """
+    The producer's decode loop: sample every stride-th frame of each video.
+    """
+    from utils.frame_reader import sample_frames
+
+    latencies, count = [], 0
+    start = last = time.perf_counter()
+    for video_path in video_paths:
+        for _ in sample_frames(video_path, stride=stride, offset=stride - 1):
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+            count += 1
+    return summarize(count, time.perf_counter() - start, latencies)
+
+def load_frames(video_paths, stride, limit):
+    from utils.frame_reader import sample_frames
+
+    frames = []
+    for video_path in video_paths:
+        for _, frame in sample_frames(video_path, stride=stride, offset=stride - 1):
+            frames.append(frame)
+            if len(frames) == limit:
+                return frames
+    return frames
+
+def bench_inference(video_paths, stride, weights, backend, batch_size, limit):
+    """
+    The consumer's model call on batches of sampled frames.
+    """
+    if not os.path.exists(weights):
+        return {"skipped": f"weights {weights} not found"}
+    try:
+        from utils.detector import Detector
+        detector = Detector(weights, backend)
+        detector.warmup(batch_size=1, runs=1)
+    except ImportError as e:
+        return {"skipped": f"inference runtime unavailable: {e}"}
+
+    frames = load_frames(video_paths, stride, limit)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        batch = frames[i:i + batch_size]
+        batch_start = time.perf_counter()
+        detector(batch)
+        # Per-frame latency is the batch latency shared by its frames
+        latencies.extend([(time.perf_counter() - batch_start)] * len(batch))
+    return summarize(len(frames), time.perf_counter() - start, latencies)
+
+class _Boxes:
+    """Minimal stand-in for ultralytics Boxes"""
+    def __init__(self, xywh, conf, cls):
+        self.xywh, self.conf, self.cls = xywh, conf, cls
+
+    def __len__(self):
+        return len(self.conf)
+
+def synthetic_results(frames, boxes_per_frame, seed=0):
+    """
+    Build objects shaped like ultralytics results with random boxes.
+    """
+    import numpy as np
+    from types import SimpleNamespace
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for frame in frames:
+        height, width = frame.shape[:2]
+        xywh = np.column_stack([rng.uniform(0, width, boxes_per_frame), rng.uniform(0, height, boxes_per_frame),
+                                rng.uniform(20, 200, boxes_per_frame), rng.uniform(10, 60, boxes_per_frame)])
+        boxes = _Boxes(xywh.astype(np.float32), rng.uniform(0.3, 1.0, boxes_per_frame).astype(np.float32),
+                       np.zeros(boxes_per_frame, dtype=np.float32))
+        results.append(SimpleNamespace(boxes=boxes))
+    return results
+
+def bench_postprocess(video_paths, stride, batch_size, limit, boxes_per_frame=10):
+    """
+    Box filtering, expansion, clipping and crop extraction on synthetic detections.
+    """
+    from utils.postprocess import postprocess_batch, extract_crops
+
+    frames = load_frames(video_paths, stride, limit)
+    results = synthetic_results(frames, boxes_per_frame)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        batch_start = time.perf_counter()
+        detections = postprocess_batch(results[i:i + batch_size], frames[i:i + batch_size])
+        extract_crops(frames[i:i + batch_size], detections)
+        latencies.append(time.perf_counter() - batch_start)
+    return summarize(len(frames), time.perf_counter() - start, latencies)
+
+def bench_crop_writing(video_paths, stride, limit, threads):
+    """
+    Enqueueing crops on the writer pool and flushing them to disk.
+    """
+    from utils.crop_writer import CropWriter
+
+    frames = load_frames(video_paths, stride, limit)
+    crops = [frame[100:220, 200:520].copy() for frame in frames]
+    with tempfile.TemporaryDirectory() as output_dir:
+        writer = CropWriter(output_dir, num_threads=threads)
+        latencies = []
+        start = time.perf_counter()
+        for crop in crops:
+            enqueue_start = time.perf_counter()
+            writer.write(crop)
+            latencies.append(time.perf_counter() - enqueue_start)
+        writer.close()
+        return summarize(len(crops), time.perf_counter() - start, latencies)
+
+class _TimedFrames:
+    """Frame source for convert_to_training_frames that records the time between frames"""
+    def __init__(self):
+        self.latencies = []
+
+    def sample_frames(self, *args, **kwargs):
+        from utils.frame_reader import sample_frames
+
+        last = time.perf_counter()
+        for item in sample_frames(*args, **kwargs):
+            yield item
+            # Time from handing out one frame to being asked for the next
+            now = time.perf_counter()
+            self.latencies.append(now - last)
+            last = now
+
+def bench_dataset(video_paths):
+    """
+    convert_to_training_frames, per saved frame.
+    """
+    from utils.dataset_creator import convert_to_training_frames
+
+    logger = logging.getLogger("benchmark")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    timed = _TimedFrames()
+    count = 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        for video_path in video_paths:
+            count += len(convert_to_training_frames(video_path, output_dir, logger, seed=0, frame_cache=timed))
+        return summarize(count, time.perf_counter() - start, timed.latencies)
+
+STAGES = {
+    "decode": lambda args, videos: bench_decode(videos, args.stride),
+    "inference": lambda args, videos: bench_inference(videos, args.stride, args.weights, args.backend,
+                                                      args.batch_size, args.limit),
+    "postprocess": lambda args, videos: bench_postprocess(videos, args.stride, args.batch_size, args.limit),
+    "crop_writing": lambda args, videos: bench_crop_writing(videos, args.stride, args.limit, args.writer_threads),
+    "dataset": lambda args, videos: bench_dataset(videos),
+}
+
+def _run_stage(name, args, videos, queue):
+    try:
+        result = STAGES[name](args, videos)
+    except Exception as e:
+        result = {"error": str(e)}
+    result["peak_rss_mb"] = peak_rss_mb()
+    queue.put(result)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--videos", type=int, default=2)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--stride", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=64, help="Frames used by the inference/post-processing stages")
+    parser.add_argument("--writer-threads", type=int, default=2)
+    parser.add_argument("--weights", default="yolo11n_trained.pt")
+    parser.add_argument("--backend", default="pytorch")
+    args = parser.parse_args()
+
+    context = mp.get_context("spawn")
+    results = {}
+    with tempfile.TemporaryDirectory() as video_dir:
+        videos = [make_synthetic_video(os.path.join(video_dir, f"synthetic_{i}.mp4"),
+                                       args.frames, args.width, args.height)
+                  for i in range(args.videos)]
+
+        for name in args.stages:
+            queue = context.Queue()
+            process = context.Process(target=_run_stage, args=(name, args, videos, queue))
+            process.start()
+            results[name] = queue.get()
+            process.join()
+            print(f"{name:>13}: {json.dumps(results[name])}")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "stages": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,168 @@
-from ultralytics import YOLO
 from utils.logger import setup_logger
-from utils.download_helper import download_youtube_video
-from multiprocessing import Pool
-from queue import Queue
-from uuid import uuid4
+from utils.download_manager import DownloadManager, read_links
+from utils.detector import get_detector
+from utils.metrics import metrics, tracer, timed, SnapshotWriter
+from collections import namedtuple
+import json
 import threading
 import time
-import cv2
 import os
 
+# The pipeline stages pull in cv2, numpy and the inference runtime, so they are
+# imported inside the functions that run them. Importing this module, e.g. only
+# for download_videos, stays cheap and loads no weights.
+
 logger = setup_logger(__name__)
 
 RAW_DIR = "Dataset/raw-live/"
 PROCESSED_DIR = "Dataset/processed-live/"
 RESULTS_DIR = "./Results/"
 
-# Create a queue for frame chunks
-frame_queue = Queue(maxsize=50)  # Limit queue size to prevent memory issues
+# Videos downloaded at the same time, and the fragment and bandwidth budgets they share
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_FRAGMENTS = 8
+# Total download rate in bytes per second, None for no limit
+DOWNLOAD_RATE_LIMIT = None
+# Attempts after the first one before a download is given up
+DOWNLOAD_RETRIES = 3
+# Detect on each video as soon as it is downloaded instead of on the files in RAW_DIR,
+# so downloading and detection overlap; videos are then decoded in the producer thread
+STREAMING_INGEST = False
+
+# Trained weights, and the runtime to run them with: "pytorch", "onnx" or "openvino".
+# Non-PyTorch backends export the weights on first use and reuse the export afterwards.
+MODEL_WEIGHTS = "yolo11n_trained.pt"
+INFERENCE_BACKEND = "pytorch"
+INFERENCE_INT8 = False
+# Load the model and run it on blank frames before processing, so first-batch latency is predictable
+MODEL_WARMUP = True
+
+# Run detection on every FRAME_STRIDE-th frame of each video
+FRAME_STRIDE = 12
+
+# Cache sampled frames here so later runs skip decoding, None disables the cache
+FRAME_CACHE_DIR = None
+FRAME_CACHE_BYTES = 20 * (1 << 30)
+
+# Decode in this many worker processes, 0 decodes in the producer thread
+DECODE_WORKERS = 0
+# Frames that may be decoded ahead of the consumer when using worker processes
+DECODE_SLOTS = 64
+# Split videos longer than this many frames into separately decoded segments
+SEGMENT_FRAMES = None
+
+# Detect on overlapping native-resolution tiles so small objects in high-resolution frames are not
+# downscaled away: "tiles" runs every tile plus the full frame, "refine" only runs the tiles around
+# candidates of a low-confidence full-frame pass, None runs on full frames only
+SLICED_INFERENCE = None
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+
+# Keep boxes above this confidence, expanded around their centre by these factors
+CONF_THRESHOLD = 0.7
+BOX_WIDTH_SCALE = 1.3
+BOX_HEIGHT_SCALE = 1.7
+
+# Largest batch sent to the model, and how long a frame may wait for its batch to fill
+MAX_BATCH_SIZE = 8
+MAX_BATCH_WAIT = 0.05
+# Frames waiting for inference before the producers block
+FRAME_QUEUE_SIZE = 250
+# Bytes of frames waiting for inference before the producers block, so the queue takes the same
+# memory at any resolution; None only bounds the number of frames
+FRAME_QUEUE_BYTES = 1 << 30
+# Decode frames into reused buffers instead of allocating one per frame
+FRAME_POOL = True
+# Resident memory of the process above which the producers pause until the consumer catches up,
+# None for no limit
+RSS_BUDGET_BYTES = None
+
+# Crops are encoded and written by a pool of writer threads
+CROP_WRITER_THREADS = 2
+CROP_QUEUE_SIZE = 256
+CROP_FORMAT = "jpg"
+CROP_QUALITY = 95
+# Pack crops into tar shards of this many images instead of loose files
+CROP_SHARD_SIZE = None
+
+# Live sources (RTSP/HTTP URLs, device indices, "-" for stdin, or files replayed as cameras)
+# are read instead of RAW_DIR when set
+LIVE_SOURCES = []
+LIVE_FRAME_STRIDE = 1
+# Live frames waiting for inference; beyond this the oldest are dropped to bound latency
+LIVE_QUEUE_SIZE = 16
+# Pace local files given as live sources at their native frame rate
+LIVE_REPLAY_NATIVE_FPS = True
 
-# Create a stop event
+# Follow objects across frames and write one crop per object instead of one per detection
+TRACKING = False
+TRACK_IOU_THRESHOLD = 0.3
+# Sampled frames an object may go undetected before its track ends
+TRACK_MAX_AGE = 3
+# Keep the crop with the best "confidence" or "sharpness"
+TRACK_SELECT = "confidence"
+# While every track of a video is stable, widen the stride up to this, None keeps FRAME_STRIDE.
+# Only used when the producer thread decodes the videos itself, without FRAME_CACHE_DIR or DECODE_WORKERS
+ADAPTIVE_MAX_STRIDE = None
+
+# Skip inference on frames that barely changed since the last inferred frame of their video:
+# "diff" compares downscaled frames, "phash" perceptual hashes, None runs on every frame
+MOTION_GATE = None
+# Change needed to run inference, None uses the default of the mode
+MOTION_THRESHOLD = None
+
+# Serve stage metrics in the Prometheus text format on this port, None disables the endpoint
+METRICS_PORT = None
+# Interface the endpoint listens on, "0.0.0.0" exposes it to other hosts
+METRICS_HOST = "127.0.0.1"
+# Write a JSON snapshot of the stage metrics to this file every METRICS_INTERVAL seconds
+METRICS_SNAPSHOT = None
+METRICS_INTERVAL = 10.0
+# Record per-stage spans and write them to this Chrome trace file, None disables tracing
+TRACE_FILE = None
+
+# A sampled frame waiting for inference; release frees its decode buffer, if any,
+# captured_at is the time.perf_counter() at which a live frame was captured, and
+# stream is what the tracker follows objects in, the video itself unless set
+FrameItem = namedtuple("FrameItem", ["frame", "video_path", "frame_index", "release", "captured_at", "stream"],
+                       defaults=(None, None))
+
+# Created by get_localized_objects once the results directory exists
+frame_batcher = None
+crop_writer = None
+frame_cache = None
+frame_pool = None
+rss_budget = None
+
+# Created by get_localized_objects when TRACKING is enabled
+tracker = None
+adaptive_stride = None
+track_log = None
+
+# Created by get_localized_objects when MOTION_GATE is set
+motion_gate = None
+
+# Set to stop reading live sources
 stop_event = threading.Event()
 
-# Perform object detection
-model = YOLO("yolo11n_trained.pt")
+# Capture to crop hand-off latency of live frames
+live_latency = None
+
+def get_model():
+    """Get the shared detector, the weights are loaded on its first use"""
+    return get_detector(MODEL_WEIGHTS, INFERENCE_BACKEND, int8=INFERENCE_INT8, logger=logger)
+
+def get_download_manager(logger):
+    """Get a download manager saving to RAW_DIR"""
+    return DownloadManager(RAW_DIR, max_workers=DOWNLOAD_WORKERS, max_fragments=DOWNLOAD_FRAGMENTS,
+                           rate_limit=DOWNLOAD_RATE_LIMIT, retries=DOWNLOAD_RETRIES, logger=logger)
+
+def video_sources():
+    """Get the paths of the videos to detect on, as they finish downloading when STREAMING_INGEST is set"""
+    if STREAMING_INGEST:
+        return get_download_manager(logger).stream(read_links("youtube_links.txt"))
+    return [os.path.join(RAW_DIR, video_file) for video_file in os.listdir(RAW_DIR)
+            if video_file.endswith(('.mp4', '.avi', '.mov'))]
 
 def download_videos(logger):
     """
@@ -32,150 +172,367 @@ def download_videos(logger):
 
     try:
         # Get urls from the file
-        urls = []
+        jobs = read_links("youtube_links.txt")
 
-        file_count = 1
-
-        with open("youtube_links.txt", "r") as f:
-            for line in f:
-                url = line.strip()
-                if url:
-                    urls.append((url, RAW_DIR, f"dataset_{file_count}.mp4", logger))
-                    file_count += 1
-
-        # Download videos in parallel
-        with Pool(processes=len(urls)) as pool:
-            pool.starmap(download_youtube_video, urls)
+        # Download videos in parallel, on a bounded pool under a shared budget
+        get_download_manager(logger).download_all(jobs)
 
     except Exception as e:
         logger.error(f"Error downloading videos: {e}")
 
 def consumer():
-    """Consumer thread that processes frame chunks"""
+    """Consumer thread that runs detection on batches of frames"""
+    from utils.postprocess import postprocess_batch, extract_crops
+
+    frames_inferred = metrics.counter("frames_inferred_total", "Frames run through the model")
+    frames_skipped = metrics.counter("frames_skipped_total", "Frames skipped by the motion gate")
+    crops_total = metrics.counter("crops_total", "Crops extracted from accepted boxes")
+
     try:
-        while not stop_event.is_set():
-            try:
-                frame_chunk = frame_queue.get(timeout=1)
-            except Exception as e:
-                logger.error(f"No data found in queue")
-                continue
-                
-            # Process your frame chunk here
-            # For example: save frames, perform detection, etc.
-            logger.info(f"Processing chunk of {len(frame_chunk)} frames")
-
-            results = model(frame_chunk, imgsz=640)
-
-            for i, result in enumerate(results):
-                # Create a copy of the frame
-                frame_copy = frame_chunk[i].copy()
-                
-                # Get the original boxes
-                boxes = result.boxes.xywh
-                confs = result.boxes.conf
-                names = [result.names[cls.item()] for cls in result.boxes.cls.int()]
-                
-                # Only process frames with high confidence detections
-                if names and any(conf > 0.7 for conf in confs):
-                    # Draw modified boxes on the frame copy
-                    for box, conf, name in zip(boxes, confs, names):
-                        if conf > 0.7:
-                            # Convert xywh to xyxy for drawing
-                            x, y, w, h = box
-                            w *= 1.3  # Increase width by 30%
-                            h *= 1.7  # Increase height by 60%
-                            x1 = int(x - w/2)
-                            y1 = int(y - h/2)
-                            x2 = int(x + w/2)
-                            y2 = int(y + h/2)
-                            
-                            # Get frame dimensions
-                            height, width = frame_copy.shape[:2]
-                            
-                            # Ensure coordinates are within frame boundaries
-                            x1 = max(0, min(x1, width))
-                            y1 = max(0, min(y1, height))
-                            x2 = max(0, min(x2, width))
-                            y2 = max(0, min(y2, height))
-                            
-                            # Only proceed if the box has valid dimensions
-                            if x2 > x1 and y2 > y1:
-                                # Save the modified frame
-                                id = uuid4()
-                                # Crop the frame to the modified box dimensions
-                                cropped_frame = frame_copy[y1:y2, x1:x2]
-                                if not cropped_frame.size == 0:  # Additional check for empty frame
-                                    cv2.imwrite(f"{RESULTS_DIR}/cropped_result_{id}.jpg", cropped_frame)
-            
-            frame_queue.task_done()
+        model = get_model()
+        if SLICED_INFERENCE:
+            from utils.tiling import SlicedDetector
+            model = SlicedDetector(model, mode=SLICED_INFERENCE, tile_size=TILE_SIZE, overlap=TILE_OVERLAP,
+                                   batch_size=MAX_BATCH_SIZE * 2)
+        while True:
+            # Time spent here means the consumer is starved by the producers
+            with timed("batch_wait"):
+                batch = frame_batcher.next_batch()
+            if batch is None:
+                break
+
+            # Static frames are dropped before they reach the model
+            inferred = batch
+            if motion_gate is not None:
+                with timed("motion_gate"):
+                    # Keyed like the tracker, segments decoded in parallel are compared within themselves only
+                    inferred = [item for item in batch
+                                if motion_gate.should_infer(item.stream or item.video_path, item.frame)]
+                frames_skipped.inc(len(batch) - len(inferred))
+
+            if inferred:
+                frame_chunk = [item.frame for item in inferred]
+                logger.info(f"Processing batch of {len(frame_chunk)} frames, "
+                            f"{crop_writer.depth()} crops waiting to be written")
+
+                inference_start = time.perf_counter()
+                with timed("inference"):
+                    results = model(frame_chunk, imgsz=640)
+                frame_batcher.record_inference(len(frame_chunk), time.perf_counter() - inference_start)
+                frames_inferred.inc(len(frame_chunk))
+
+                with timed("postprocess"):
+                    # Filter, expand and clip all boxes of the batch in one pass
+                    detections = postprocess_batch(results, frame_chunk, conf_threshold=CONF_THRESHOLD,
+                                                   width_scale=BOX_WIDTH_SCALE, height_scale=BOX_HEIGHT_SCALE)
+
+                    # Crops are copied out, so the frames themselves can be released right away
+                    crops = extract_crops(frame_chunk, detections)
+                crops_total.inc(len(crops))
+
+                # Time spent here means the crop writers are behind, i.e. the disk is the bottleneck
+                with timed("crop_write"):
+                    if tracker is None:
+                        for _, cropped_frame in crops:
+                            crop_writer.write(cropped_frame)
+                    else:
+                        update_tracks(inferred, detections, crops)
+
+            # Hand shared memory slots back to the decode workers
+            done_at = time.perf_counter()
+            for item in batch:
+                if item.release is not None:
+                    item.release()
+                if item.captured_at is not None:
+                    live_latency.record(done_at - item.captured_at)
+
+            frame_batcher.task_done(len(batch))
             
+        # Objects still in view at the end get their crop written too
+        if tracker is not None:
+            write_tracks(tracker.flush())
+
         logger.info("Consumer thread finished")
     except Exception as e:
         logger.error(f"Error in consumer thread: {e}")
+    finally:
+        # Once the consumer is gone, producers must not wait for room or for it to finish the queue
+        for item in frame_batcher.abort():
+            if item.release is not None:
+                item.release()
+
+def write_tracks(tracks):
+    """Write the best crop and the record of every finished track"""
+    for track in tracks:
+        # Ids restart with every run, the run id keeps crops of earlier runs from being overwritten
+        name = f"track_{tracker.run_id}_{track.track_id}"
+        crop_writer.write(track.best_crop, name)
+        record = track.record()
+        record["run_id"] = tracker.run_id
+        record["crop"] = name + crop_writer.extension
+        track_log.write(json.dumps(record) + "\n")
+
+def update_tracks(batch, detections, crops):
+    """Feed the detections of a batch to the tracker, frame by frame"""
+    import numpy as np
+
+    for i, item in enumerate(batch):
+        indices = np.flatnonzero(detections.frame_ids == i)
+        frame_crops = [crops[j][1] for j in indices]
+        finished = tracker.update(item.stream or item.video_path, item.frame_index, detections.boxes[indices],
+                                  detections.confs[indices], frame_crops)
+        write_tracks(finished)
+
+        if adaptive_stride is not None:
+            adaptive_stride.update(item.video_path, tracker.is_stable(item.video_path))
 
 def producer():
     """Producer thread that reads frames from videos"""
+    from utils.frame_reader import sample_frames
+
+    frames_decoded, decode_seconds = _decode_metrics()
+    # Cached frames are memory maps, only decoded frames come from the pool
+    pool = frame_pool if frame_cache is None else None
     try:
-        for video_file in os.listdir(RAW_DIR):
-            if video_file.endswith(('.mp4', '.avi', '.mov')):
-                video_path = os.path.join(RAW_DIR, video_file)
-                cap = cv2.VideoCapture(video_path)
-                
-                frame_chunk = []
-                frame_count = 0
-                while cap.isOpened():
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                        
-                    frame_count += 1
-
-                    if frame_count % 12 != 0:
-                        continue
-
-                    frame_chunk.append(frame)
-                    if len(frame_chunk) == 5:
-                        frame_queue.put(frame_chunk)
-                        frame_chunk = []
-                
-                # Put remaining frames if any
-                if frame_chunk:
-                    frame_queue.put(frame_chunk)
-                
-                cap.release()
-        
-        # Signal the consumer that we're done
-        stop_event.set()
+        for video_path in video_sources():
+            # Skipped frames are only grabbed, never converted or copied
+            if adaptive_stride is not None and frame_cache is None:
+                # The stride follows the tracker, so it is asked for after every frame
+                frames = sample_frames(video_path, offset=FRAME_STRIDE - 1, frame_pool=pool,
+                                       stride_fn=lambda path=video_path: adaptive_stride.stride(path))
+            elif frame_cache is not None:
+                frames = frame_cache.sample_frames(video_path, stride=FRAME_STRIDE, offset=FRAME_STRIDE - 1)
+            else:
+                frames = sample_frames(video_path, stride=FRAME_STRIDE, offset=FRAME_STRIDE - 1, frame_pool=pool)
+
+            last = time.perf_counter()
+            for frame_index, frame in frames:
+                decode_seconds.observe(time.perf_counter() - last)
+                frames_decoded.inc()
+                # Time spent here means the frame queue is full and the consumer is behind
+                with timed("queue_put"):
+                    throttle()
+                    frame_batcher.put(FrameItem(frame, video_path, frame_index,
+                                                pool.release_fn(frame) if pool is not None else None))
+                last = time.perf_counter()
+
         logger.info("Producer thread finished")
         
     except Exception as e:
         logger.error(f"Error in producer thread: {e}")
-        stop_event.set()  # Signal error condition
+    finally:
+        # Signal the consumer that no more frames are coming
+        frame_batcher.close()
+
+def throttle():
+    """Pause the calling producer while the process is over its memory budget"""
+    if rss_budget is not None:
+        rss_budget.wait(frame_batcher.unfinished)
+
+def _release_item(item):
+    """Free the buffer of a frame dropped before inference"""
+    if item.release is not None:
+        item.release()
+
+def _decode_metrics():
+    """Get the counter and histogram of frames handed to the producers by the decoder"""
+    return (metrics.counter("frames_decoded_total", "Sampled frames decoded"),
+            metrics.histogram("stage_seconds", "Time spent per call of a pipeline stage", stage="decode"))
+
+def _segment_stream(video_path, frame_index):
+    """
+    Get the tracker stream of a frame decoded by the pool.
+
+    Segments of one video are decoded in parallel and their frames arrive
+    interleaved, so each segment is tracked as a stream of its own; objects
+    crossing a segment boundary get one crop per segment.
+    """
+    if not SEGMENT_FRAMES:
+        return None
+    # Segments start at multiples of SEGMENT_FRAMES, see build_decode_tasks
+    return f"{video_path}@{frame_index // SEGMENT_FRAMES * SEGMENT_FRAMES}"
+
+def _release_slot(pool, slot):
+    """Build a callback returning a slot to the decode pool"""
+    return lambda: pool.release(slot)
+
+def pool_producer():
+    """Producer thread that decodes videos in worker processes"""
+    from utils.decode_pool import DecodePool
+
+    frames_decoded, decode_seconds = _decode_metrics()
+    pool = None
+    try:
+        video_paths = video_sources()
+        if video_paths:
+            pool = DecodePool(video_paths, num_workers=DECODE_WORKERS, num_slots=DECODE_SLOTS,
+                              stride=FRAME_STRIDE, offset=FRAME_STRIDE - 1,
+                              segment_frames=SEGMENT_FRAMES, frame_cache=frame_cache, logger=logger)
+
+            # Frames stay in shared memory until the consumer releases their slots
+            last = time.perf_counter()
+            for video_path, frame_index, frame, slot in pool.frames():
+                # Waiting here means the decode workers are behind
+                decode_seconds.observe(time.perf_counter() - last)
+                frames_decoded.inc()
+                with timed("queue_put"):
+                    throttle()
+                    frame_batcher.put(FrameItem(frame, video_path, frame_index, _release_slot(pool, slot),
+                                                stream=_segment_stream(video_path, frame_index)))
+                last = time.perf_counter()
+
+            # Wait for the consumer before the shared memory is freed
+            frame_batcher.close()
+            frame_batcher.join()
+
+        logger.info("Producer thread finished")
+
+    except Exception as e:
+        logger.error(f"Error in producer thread: {e}")
+    finally:
+        frame_batcher.close()
+        if pool is not None:
+            pool.close()
+
+def live_producer(source):
+    """Read one live source until it ends or stop_event is set"""
+    from utils.live_source import iter_live_frames
+
+    frames_captured = metrics.counter("frames_captured_total", "Frames read from live sources", source=str(source))
+    try:
+        for frame_index, frame, captured_at in iter_live_frames(source, stride=LIVE_FRAME_STRIDE,
+                                                               replay_native_fps=LIVE_REPLAY_NATIVE_FPS,
+                                                               stop_event=stop_event, frame_pool=frame_pool,
+                                                               logger=logger):
+            frames_captured.inc()
+            throttle()
+            release = frame_pool.release_fn(frame) if frame_pool is not None else None
+            frame_batcher.put(FrameItem(frame, str(source), frame_index, release, captured_at))
+        logger.info(f"Live source {source} finished")
+    except Exception as e:
+        logger.error(f"Error reading live source {source}: {e}")
+
+def live_producers():
+    """Producer thread that reads every live source on its own thread"""
+    try:
+        threads = [threading.Thread(target=live_producer, args=(source,), daemon=True)
+                   for source in LIVE_SOURCES]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info("Producer thread finished")
+    finally:
+        frame_batcher.close()
 
 def get_localized_objects(logger):
     """
     Convert videos to frames using producer-consumer pattern
     """
-    global RAW_DIR, PROCESSED_DIR, RESULTS_DIR
+    global RAW_DIR, PROCESSED_DIR, RESULTS_DIR, crop_writer, frame_cache, tracker, adaptive_stride, track_log
+    global motion_gate, frame_batcher, live_latency, frame_pool, rss_budget
+
+    from utils.batching import DynamicBatcher
+    from utils.crop_writer import CropWriter
+    from utils.frame_pool import FramePool, RssBudget
+    from utils.frame_cache import FrameCache
+    from utils.live_source import LatencyTracker
+    from utils.motion_gate import MotionGate
+    from utils.tracker import IoUTracker, AdaptiveStride
 
     os.makedirs(PROCESSED_DIR, exist_ok=True)
     os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    # The queue is bounded in bytes as well as frames, so high-resolution videos do not take more memory
+    queue_bytes = dict(max_bytes=FRAME_QUEUE_BYTES, size_fn=lambda item: item.frame.nbytes)
+    if LIVE_SOURCES:
+        # Stale live frames are dropped rather than queued behind inference
+        frame_batcher = DynamicBatcher(max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_BATCH_WAIT,
+                                       max_queue=LIVE_QUEUE_SIZE, drop_oldest=True, on_drop=_release_item,
+                                       **queue_bytes)
+    else:
+        frame_batcher = DynamicBatcher(max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_BATCH_WAIT,
+                                       max_queue=FRAME_QUEUE_SIZE, **queue_bytes)
+    frame_pool = FramePool() if FRAME_POOL else None
+    rss_budget = RssBudget(RSS_BUDGET_BYTES) if RSS_BUDGET_BYTES else None
+    live_latency = LatencyTracker()
+
+    crop_writer = CropWriter(RESULTS_DIR, num_threads=CROP_WRITER_THREADS, max_queue=CROP_QUEUE_SIZE,
+                             image_format=CROP_FORMAT, quality=CROP_QUALITY,
+                             shard_size=CROP_SHARD_SIZE, logger=logger)
+    if FRAME_CACHE_DIR:
+        frame_cache = FrameCache(FRAME_CACHE_DIR, max_bytes=FRAME_CACHE_BYTES, logger=logger)
+    if MOTION_GATE:
+        motion_gate = MotionGate(mode=MOTION_GATE, threshold=MOTION_THRESHOLD)
+    if TRACKING:
+        tracker = IoUTracker(iou_threshold=TRACK_IOU_THRESHOLD, max_age=TRACK_MAX_AGE, select=TRACK_SELECT)
+        track_log = open(os.path.join(RESULTS_DIR, "tracks.jsonl"), "a")
+        # The stride is chosen while decoding, which only the producer thread does for files it reads itself
+        if ADAPTIVE_MAX_STRIDE and (FRAME_CACHE_DIR or LIVE_SOURCES or (DECODE_WORKERS and not STREAMING_INGEST)):
+            logger.warning("ADAPTIVE_MAX_STRIDE only applies to videos decoded in the producer thread without "
+                           "FRAME_CACHE_DIR, DECODE_WORKERS or LIVE_SOURCES, ignoring it")
+        elif ADAPTIVE_MAX_STRIDE:
+            adaptive_stride = AdaptiveStride(FRAME_STRIDE, ADAPTIVE_MAX_STRIDE)
+    if MODEL_WARMUP:
+        get_model().warmup(batch_size=MAX_BATCH_SIZE)
+
+    # Queue depths tell which side of each queue is the bottleneck
+    metrics.gauge("frame_queue_depth", "Frames waiting for inference", fn=frame_batcher.qsize)
+    metrics.gauge("frame_queue_bytes", "Bytes of frames waiting for inference", fn=frame_batcher.qbytes)
+    metrics.gauge("crop_queue_depth", "Crops waiting to be written", fn=crop_writer.depth)
+    if TRACE_FILE:
+        tracer.enable()
+    metrics_server = metrics.serve(METRICS_PORT, host=METRICS_HOST) if METRICS_PORT else None
+    snapshot_writer = SnapshotWriter(metrics, METRICS_SNAPSHOT, METRICS_INTERVAL) if METRICS_SNAPSHOT else None
     
     start_time = time.time()
 
+    if LIVE_SOURCES:
+        target = live_producers
+    else:
+        target = pool_producer if DECODE_WORKERS and not STREAMING_INGEST else producer
+
     # Create and start threads
-    producer_thread = threading.Thread(target=producer)
+    producer_thread = threading.Thread(target=target)
     consumer_thread = threading.Thread(target=consumer)
     
     producer_thread.start()
     consumer_thread.start()
     
     # Wait for both threads to complete
-    producer_thread.join()
+    try:
+        producer_thread.join()
+    except KeyboardInterrupt:
+        # Live sources never end on their own
+        stop_event.set()
+        producer_thread.join()
     consumer_thread.join()
 
+    # Make sure every crop is on disk before reporting
+    crop_writer.close()
+    if track_log is not None:
+        track_log.close()
+
     end_time = time.time()
     logger.info(f"Total time taken: {end_time - start_time} seconds")
+    logger.info(f"Batching stats: {frame_batcher.stats()}")
+    logger.info(f"Crop writer stats: {crop_writer.stats()}")
+    if frame_pool is not None:
+        logger.info(f"Frame pool stats: {frame_pool.stats()}")
+    if rss_budget is not None:
+        logger.info(f"Producers paused {rss_budget.throttled_seconds:.1f} s by the memory budget")
+    if LIVE_SOURCES:
+        logger.info(f"Live capture to crop latency: {live_latency.stats()}")
+    if motion_gate is not None:
+        logger.info(f"Motion gate stats: {motion_gate.stats()}")
+    logger.info(f"Stage timings: {metrics.snapshot()['histograms']}")
+
+    if snapshot_writer is not None:
+        snapshot_writer.close()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if TRACE_FILE:
+        tracer.dump(TRACE_FILE)
 
 if __name__ == "__main__":
     #download_videos(logger)
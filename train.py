@@ -1,36 +1,102 @@
 import os
 from ultralytics import YOLO
 from utils.logger import setup_logger
-from utils.download_helper import download_youtube_video
+from utils.download_manager import DownloadManager, read_links
 from utils.dataset_creator import convert_to_training_frames
-from multiprocessing import Pool
+from utils.augmentation import AugmentationEngine, TextAugmentation, GaussianBlur, GaussianNoise, Perspective
+from utils.parallel_dataset import build_dataset_parallel
+from utils.incremental_dataset import build_dataset_incremental
+from utils.frame_cache import FrameCache
+from utils.packed_trainer import PackedDetectionTrainer, write_packed_data_yaml
+from utils.packed_dataset import clear_packed
+from utils.inference_backend import export_model
+from utils.train_launcher import launch_training
 
 logger = setup_logger(__name__)
 
 RAW_DIR = "Dataset/raw/"
 PROCESSED_DIR = "Dataset/Processed/"
 
+# Videos downloaded at the same time, and the fragment and bandwidth budgets they share
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_FRAGMENTS = 8
+# Total download rate in bytes per second, None for no limit
+DOWNLOAD_RATE_LIMIT = None
+# Attempts after the first one before a download is given up
+DOWNLOAD_RETRIES = 3
+# Convert each video as soon as it is downloaded instead of the files in RAW_DIR,
+# so downloading and dataset generation overlap
+STREAMING_INGEST = False
+
+# Dataset generation processes, 1 converts the videos serially
+DATASET_WORKERS = None
+# Split videos into tasks of this many frames when generating in parallel
+DATASET_SEGMENT_FRAMES = None
+# Seed for the augmentations, None draws a new one per run
+DATASET_SEED = None
+# Cache resized frames here so regenerating the dataset skips decoding, None disables the cache
+FRAME_CACHE_DIR = None
+FRAME_CACHE_BYTES = 20 * (1 << 30)
+# Only convert new, changed or interrupted videos and prune the outputs of removed ones,
+# checkpointing every DATASET_CHECKPOINT_FRAMES frames; reuses the previous seed unless DATASET_SEED is set
+DATASET_INCREMENTAL = False
+DATASET_CHECKPOINT_FRAMES = 1000
+# "files" writes one jpg/txt pair per frame, "packed" writes sharded archives with a label index
+DATASET_FORMAT = "files"
+# Most text instances drawn on one frame
+DATASET_TEXT_INSTANCES = 1
+# Chance that a frame is blurred, gets sensor noise or is perspective warped, 0 disables each
+DATASET_BLUR = 0.0
+DATASET_NOISE = 0.0
+DATASET_PERSPECTIVE = 0.0
+# Also save every frame as a decoded .npy array for TRAIN_CACHE = "disk" ("files" format only)
+DATASET_SAVE_ARRAYS = False
+
+# Training device, None uses the GPU if there is one and falls back to the CPU
+TRAIN_DEVICE = None
+# Batch size and data loader workers, None sizes them from the device, cores and memory
+TRAIN_BATCH = None
+TRAIN_WORKERS = None
+# "ram" keeps decoded images in memory, "disk" reads the .npy arrays next to them, None decodes every epoch
+TRAIN_CACHE = None
+
+# Export the trained weights for these CPU runtimes ("onnx", "openvino") after training
+EXPORT_BACKENDS = []
+# Quantize the exports to INT8
+EXPORT_INT8 = False
+
+def get_download_manager(logger):
+    """
+    Get a download manager saving to RAW_DIR
+    """
+    return DownloadManager(RAW_DIR, max_workers=DOWNLOAD_WORKERS, max_fragments=DOWNLOAD_FRAGMENTS,
+                           rate_limit=DOWNLOAD_RATE_LIMIT, retries=DOWNLOAD_RETRIES, logger=logger)
+
+def get_augmenter():
+    """
+    Get the augmentations applied to the dataset frames
+    """
+    augmentations = [TextAugmentation(max_instances=DATASET_TEXT_INSTANCES)]
+    if DATASET_PERSPECTIVE:
+        augmentations.append(Perspective(probability=DATASET_PERSPECTIVE))
+    if DATASET_BLUR:
+        augmentations.append(GaussianBlur(probability=DATASET_BLUR))
+    if DATASET_NOISE:
+        augmentations.append(GaussianNoise(probability=DATASET_NOISE))
+    return AugmentationEngine(augmentations)
+
 def download_videos(logger):
     """
     Download videos from youtube links
     """
     global RAW_DIR
+
     try:
         # Get urls from the file
-        urls = []
-
-        file_count = 1
-
-        with open("youtube_links.txt", "r") as f:
-            for line in f:
-                url = line.strip()
-                if url:
-                    urls.append((url, RAW_DIR, f"dataset_{file_count}.mp4", logger))
-                    file_count += 1
+        jobs = read_links("youtube_links.txt")
 
-        # Download videos in parallel
-        with Pool(processes=len(urls)) as pool:
-            pool.starmap(download_youtube_video, urls)
+        # Download videos in parallel, on a bounded pool under a shared budget
+        get_download_manager(logger).download_all(jobs)
 
     except Exception as e:
         logger.error(f"Error downloading videos: {e}")
@@ -41,8 +107,35 @@ def create_dataset(logger):
     """
     global RAW_DIR, PROCESSED_DIR
 
-    for video_file in os.listdir(RAW_DIR):
-        convert_to_training_frames(os.path.join(RAW_DIR, video_file), PROCESSED_DIR, logger)
+    if STREAMING_INGEST:
+        video_paths = get_download_manager(logger).stream(read_links("youtube_links.txt"))
+    else:
+        video_paths = [os.path.join(RAW_DIR, video_file) for video_file in os.listdir(RAW_DIR)]
+    frame_cache = FrameCache(FRAME_CACHE_DIR, max_bytes=FRAME_CACHE_BYTES, logger=logger) if FRAME_CACHE_DIR else None
+    augmenter = get_augmenter()
+
+    if DATASET_INCREMENTAL:
+        # Pruning removed videos needs the full list, so this waits for every download
+        build_dataset_incremental(list(video_paths), PROCESSED_DIR, logger, num_workers=DATASET_WORKERS,
+                                  seed=DATASET_SEED, chunk_frames=DATASET_CHECKPOINT_FRAMES,
+                                  frame_cache=frame_cache, output_format=DATASET_FORMAT, augmenter=augmenter,
+                                  save_arrays=DATASET_SAVE_ARRAYS)
+    elif DATASET_WORKERS == 1:
+        if DATASET_FORMAT == "packed":
+            # Shards of a previous build would otherwise be read alongside the new ones
+            clear_packed(PROCESSED_DIR)
+        for video_path in video_paths:
+            convert_to_training_frames(video_path, PROCESSED_DIR, logger, seed=DATASET_SEED,
+                                       frame_cache=frame_cache, output_format=DATASET_FORMAT,
+                                       augmenter=augmenter, save_arrays=DATASET_SAVE_ARRAYS)
+    else:
+        build_dataset_parallel(video_paths, PROCESSED_DIR, logger, num_workers=DATASET_WORKERS,
+                               segment_frames=DATASET_SEGMENT_FRAMES, seed=DATASET_SEED,
+                               frame_cache=frame_cache, output_format=DATASET_FORMAT, augmenter=augmenter,
+                               save_arrays=DATASET_SAVE_ARRAYS)
+
+    if DATASET_FORMAT == "packed":
+        write_packed_data_yaml(PROCESSED_DIR)
 
 def train_model(logger):
     """
@@ -52,16 +145,23 @@ def train_model(logger):
     logger.info("Loading model")
     model = YOLO("yolo11n.pt")
 
+    # Packed datasets are read straight from their shards by a custom trainer
+    packed = DATASET_FORMAT == "packed"
+
     # Train the model
     logger.info("Training model")
-    model.train(
-        data="Dataset/Processed/data.yaml",
-        epochs=50,
+    launch_training(
+        model,
+        data="Dataset/Processed/data_packed.yaml" if packed else "Dataset/Processed/data.yaml",
+        device=TRAIN_DEVICE,
+        batch=TRAIN_BATCH,
+        workers=TRAIN_WORKERS,
+        # Packed shards are memory-mapped, the page cache already keeps them resident
+        cache=None if packed else TRAIN_CACHE,
         imgsz=640,
-        batch=10,
-        workers=1,
-        device="cuda",
-        cache=False,
+        logger=logger,
+        trainer=PackedDetectionTrainer if packed else None,
+        epochs=50,
         optimizer="Adam",
         patience=10,
         save=True,
@@ -72,6 +172,12 @@ def train_model(logger):
     logger.info("Saving model")
     model.save("yolo11n_trained_new.pt")
 
+    # Export for the CPU detection nodes
+    for backend in EXPORT_BACKENDS:
+        export_model("yolo11n_trained_new.pt", backend, imgsz=640, int8=EXPORT_INT8,
+                     data="Dataset/Processed/data_packed.yaml" if packed else "Dataset/Processed/data.yaml",
+                     logger=logger)
+
 if __name__ == "__main__":
     #download_videos(logger)
     #create_dataset(logger)
@@ -0,0 +1,325 @@
+import string
+import zlib
+import cv2
+import numpy as np
+from utils.text_overlay import TextOverlay
+
+FONTS = np.array([
+    cv2.FONT_HERSHEY_PLAIN,  # Times New Roman-like serif font
+    cv2.FONT_HERSHEY_COMPLEX,  # Similar to Times New Roman
+    cv2.FONT_HERSHEY_TRIPLEX,  # Bold serif font
+    cv2.FONT_HERSHEY_COMPLEX_SMALL  # Smaller serif font
+])
+
+# Letters are drawn in both cases and upper-cased, as the text generator always did
+_ALPHABET = np.frombuffer((string.ascii_letters + string.digits).upper().encode(), dtype=np.uint8)
+# XXXX-XXXXXX-XXXX
+_DASHES = (4, 11)
+_TEXT_LENGTH = 16
+
+# Glyph sprites are cached per process and reused across frames and videos
+text_overlay = TextOverlay()
+
+def box_corners(boxes):
+    """
+    Get the four corners of xyxy boxes.
+
+    Returns:
+        numpy.ndarray: (..., 4, 2) corners, clockwise from the top-left.
+    """
+    x1, y1, x2, y2 = boxes[..., 0], boxes[..., 1], boxes[..., 2], boxes[..., 3]
+    return np.stack([np.stack([x1, y1], -1), np.stack([x2, y1], -1),
+                     np.stack([x2, y2], -1), np.stack([x1, y2], -1)], axis=-2)
+
+def rotated_boxes(x, y, text_width, text_height, baseline, angle):
+    """
+    Compute the boxes of rotated text for any number of placements at once.
+
+    Text is rotated about its centre like cv2.getRotationMatrix2D does, and
+    the box is the axis-aligned bound of the rotated corners.
+
+    Args:
+        x, y (numpy.ndarray): Bottom-left corners of the text, as in cv2.putText.
+        text_width, text_height, baseline (numpy.ndarray): Sizes from cv2.getTextSize.
+        angle (numpy.ndarray): Rotations in degrees, counter-clockwise.
+
+    Returns:
+        tuple: ((..., 4) xyxy boxes, rotation centre x, rotation centre y)
+    """
+    center_x = x + text_width // 2
+    center_y = y - text_height // 2
+    corners = box_corners(np.stack([x, y - text_height, x + text_width, y + baseline], axis=-1).astype(np.float64))
+    radians = np.deg2rad(angle)[..., None]
+    alpha, beta = np.cos(radians), np.sin(radians)
+    dx = corners[..., 0] - center_x[..., None]
+    dy = corners[..., 1] - center_y[..., None]
+    rotated_x = alpha * dx + beta * dy + center_x[..., None]
+    rotated_y = -beta * dx + alpha * dy + center_y[..., None]
+    boxes = np.stack([rotated_x.min(-1), rotated_y.min(-1), rotated_x.max(-1), rotated_y.max(-1)], axis=-1)
+    return boxes, center_x, center_y
+
+class TextAugmentation:
+    """
+    Draw random XXXX-XXXXXX-XXXX text, optionally rotated, and label its box.
+
+    Placements that leave the frame, or overlap an earlier instance of the
+    same frame, are drawn again; after max_attempts the first instance
+    falls back to unrotated text, which the clamping keeps inside the
+    frame, and further instances are left out.
+    """
+
+    def __init__(self, probability=0.7, max_instances=1, rotate_probability=0.5, max_angle=30.0,
+                 margin=20, max_attempts=10):
+        """
+        Args:
+            probability (float): Chance that a frame gets text.
+            max_instances (int): Most text instances per frame, each frame with text gets 1 to max_instances.
+            rotate_probability (float): Chance that an instance is rotated.
+            max_angle (float): Largest rotation in degrees, either way.
+            margin (int): Distance kept from the frame edges before rotation.
+            max_attempts (int): Times an invalid placement is drawn again.
+        """
+        self.probability = probability
+        self.max_instances = max_instances
+        self.rotate_probability = rotate_probability
+        self.max_angle = max_angle
+        self.margin = margin
+        self.max_attempts = max_attempts
+
+    def describe(self):
+        return {"name": "text", **vars(self)}
+
+    def _positions(self, rng, size, text_width, text_height, width, height):
+        # Random position, then clamped so the unrotated text keeps its margin
+        x = rng.integers(10, width - 200, size, endpoint=True)  # Increased margin for longer text
+        y = rng.integers(10, height - 30, size, endpoint=True)
+        x = np.minimum(np.maximum(self.margin, x), width - text_width - self.margin)
+        y = np.minimum(np.maximum(self.margin + text_height, y), height - text_height - self.margin)
+        return x, y
+
+    def _invalid(self, boxes, active, width, height):
+        outside = ((boxes[..., 0] < 0) | (boxes[..., 1] < 0) | (boxes[..., 2] > width) | (boxes[..., 3] > height))
+        # Overlap with any earlier instance of the same frame
+        x1 = np.maximum(boxes[:, :, None, 0], boxes[:, None, :, 0])
+        y1 = np.maximum(boxes[:, :, None, 1], boxes[:, None, :, 1])
+        x2 = np.minimum(boxes[:, :, None, 2], boxes[:, None, :, 2])
+        y2 = np.minimum(boxes[:, :, None, 3], boxes[:, None, :, 3])
+        earlier = np.tri(boxes.shape[1], k=-1, dtype=bool)
+        overlapping = ((x2 > x1) & (y2 > y1) & earlier & active[:, None, :]).any(axis=2)
+        return active & (outside | overlapping)
+
+    def sample(self, rng, count, width, height):
+        shape = (count, self.max_instances)
+        has_text = rng.random(count) < self.probability
+        instances = np.where(has_text, rng.integers(1, self.max_instances, count, endpoint=True), 0)
+        active = np.arange(self.max_instances)[None, :] < instances[:, None]
+
+        codes = _ALPHABET[rng.integers(0, len(_ALPHABET), shape + (_TEXT_LENGTH,))]
+        codes[..., _DASHES] = ord("-")
+        texts = codes.view(f"S{_TEXT_LENGTH}")[..., 0]
+        fonts = FONTS[rng.integers(0, len(FONTS), shape)]
+        # Quantized so glyph sprites can be reused
+        font_scales = np.round(rng.uniform(0.3, 0.7, shape), 2)
+        thicknesses = rng.integers(1, 3, shape, endpoint=True)
+        colors = rng.integers(0, 255, shape + (3,), endpoint=True)
+        rotate = rng.random(shape) < self.rotate_probability
+        angles = np.where(rotate, rng.uniform(-self.max_angle, self.max_angle, shape), 0.0)
+
+        # Text sizes are the only part measured per instance
+        spaced_texts = np.empty(shape, dtype=object)
+        text_width, text_height, baseline = (np.zeros(shape, dtype=np.int64) for _ in range(3))
+        for i, j in zip(*np.nonzero(active)):
+            spaced_texts[i, j] = "  ".join(texts[i, j].decode())
+            (text_width[i, j], text_height[i, j]), baseline[i, j] = cv2.getTextSize(
+                spaced_texts[i, j], int(fonts[i, j]), float(font_scales[i, j]), int(thicknesses[i, j]))
+
+        x, y = self._positions(rng, shape, text_width, text_height, width, height)
+        boxes, center_x, center_y = rotated_boxes(x, y, text_width, text_height, baseline, angles)
+
+        # Draw invalid placements again, all of them in one pass per attempt
+        for _ in range(self.max_attempts):
+            invalid = self._invalid(boxes, active, width, height)
+            if not invalid.any():
+                break
+            new_x, new_y = self._positions(rng, int(invalid.sum()), text_width[invalid], text_height[invalid],
+                                           width, height)
+            x[invalid], y[invalid] = new_x, new_y
+            angles[invalid] = np.where(rotate[invalid],
+                                       rng.uniform(-self.max_angle, self.max_angle, int(invalid.sum())), 0.0)
+            boxes, center_x, center_y = rotated_boxes(x, y, text_width, text_height, baseline, angles)
+        else:
+            invalid = self._invalid(boxes, active, width, height)
+            angles[:, 0] = np.where(invalid[:, 0], 0.0, angles[:, 0])
+            active[:, 1:] &= ~invalid[:, 1:]
+            boxes, center_x, center_y = rotated_boxes(x, y, text_width, text_height, baseline, angles)
+
+        return {"active": active, "texts": spaced_texts, "fonts": fonts, "font_scales": font_scales,
+                "thicknesses": thicknesses, "colors": colors, "angles": angles, "x": x, "y": y,
+                "center_x": center_x, "center_y": center_y, "boxes": boxes}
+
+    def apply(self, frame, params, i, boxes):
+        for j in np.flatnonzero(params["active"][i]):
+            text_overlay.draw(frame, params["texts"][i, j], (int(params["x"][i, j]), int(params["y"][i, j])),
+                              int(params["fonts"][i, j]), float(params["font_scales"][i, j]),
+                              tuple(int(c) for c in params["colors"][i, j]), int(params["thicknesses"][i, j]),
+                              angle=float(params["angles"][i, j]),
+                              center=(int(params["center_x"][i, j]), int(params["center_y"][i, j])))
+        placed = params["boxes"][i][params["active"][i]]
+        return frame, np.concatenate([boxes, placed.astype(np.float32)])
+
+class GaussianBlur:
+    """Blur the whole frame, as out-of-focus or compressed footage would be"""
+
+    def __init__(self, probability=0.2, min_sigma=0.3, max_sigma=1.5):
+        self.probability = probability
+        self.min_sigma = min_sigma
+        self.max_sigma = max_sigma
+
+    def describe(self):
+        return {"name": "blur", **vars(self)}
+
+    def sample(self, rng, count, width, height):
+        return {"active": rng.random(count) < self.probability,
+                "sigmas": rng.uniform(self.min_sigma, self.max_sigma, count)}
+
+    def apply(self, frame, params, i, boxes):
+        if params["active"][i]:
+            frame = cv2.GaussianBlur(frame, (0, 0), float(params["sigmas"][i]))
+        return frame, boxes
+
+class GaussianNoise:
+    """Add sensor-like Gaussian noise"""
+
+    def __init__(self, probability=0.2, max_std=8.0):
+        self.probability = probability
+        self.max_std = max_std
+
+    def describe(self):
+        return {"name": "noise", **vars(self)}
+
+    def sample(self, rng, count, width, height):
+        # The noise itself is too large to draw for a whole batch, each frame gets its own seed
+        return {"active": rng.random(count) < self.probability,
+                "stds": rng.uniform(0, self.max_std, count),
+                "seeds": rng.integers(0, 2 ** 32, count)}
+
+    def apply(self, frame, params, i, boxes):
+        if params["active"][i]:
+            noise = np.random.default_rng(int(params["seeds"][i])).standard_normal(frame.shape, dtype=np.float32)
+            noise *= params["stds"][i]
+            frame = cv2.add(frame, noise, dtype=cv2.CV_8U)
+        return frame, boxes
+
+class Perspective:
+    """Warp the frame as if filmed from an angle, moving the boxes with it"""
+
+    def __init__(self, probability=0.2, max_shift=0.08):
+        """
+        Args:
+            probability (float): Chance that a frame is warped.
+            max_shift (float): Largest move of each frame corner, as a fraction of the frame size.
+        """
+        self.probability = probability
+        self.max_shift = max_shift
+
+    def describe(self):
+        return {"name": "perspective", **vars(self)}
+
+    def sample(self, rng, count, width, height):
+        source = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float32)
+        shifts = rng.uniform(-self.max_shift, self.max_shift, (count, 4, 2)) * [width, height]
+        targets = np.clip(source + shifts, 0, [width, height]).astype(np.float32)
+        matrices = np.stack([cv2.getPerspectiveTransform(source, target) for target in targets])
+        return {"active": rng.random(count) < self.probability, "matrices": matrices}
+
+    def apply(self, frame, params, i, boxes):
+        if not params["active"][i]:
+            return frame, boxes
+        height, width = frame.shape[:2]
+        matrix = params["matrices"][i]
+        frame = cv2.warpPerspective(frame, matrix, (width, height))
+        if len(boxes):
+            corners = cv2.perspectiveTransform(box_corners(boxes).reshape(1, -1, 2).astype(np.float32), matrix)
+            corners = corners.reshape(-1, 4, 2)
+            boxes = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+        return frame, boxes
+
+class AugmentationEngine:
+    """
+    Apply a chain of augmentations, with their parameters drawn a block of frames at a time.
+
+    Every augmentation samples the parameters of a whole block in
+    vectorized calls on one NumPy generator, leaving only the pixel work
+    per frame. Blocks sit at fixed positions in the video and each is
+    seeded from the dataset seed, the video and the block index, so the
+    output does not depend on how the frames are split across workers or
+    chunks.
+
+    Augmentations provide sample(rng, count, width, height), returning
+    arrays with one entry per frame, and apply(frame, params, i, boxes),
+    returning the frame and its xyxy boxes after the augmentation.
+    """
+
+    def __init__(self, augmentations=None, width=640, height=640, block_size=64):
+        """
+        Args:
+            augmentations (list): Augmentations applied in order, defaults to text only.
+            width (int): Width of the frames.
+            height (int): Height of the frames.
+            block_size (int): Frames whose parameters are sampled together.
+        """
+        self.augmentations = augmentations if augmentations is not None else [TextAugmentation()]
+        self.width = width
+        self.height = height
+        self.block_size = block_size
+        self._block = None
+
+    def __getstate__(self):
+        # Workers sample their own blocks
+        return dict(self.__dict__, _block=None)
+
+    def describe(self):
+        """
+        Get the settings that decide the output, for telling whether outputs are stale.
+        """
+        return {"width": self.width, "height": self.height, "block_size": self.block_size,
+                "augmentations": [augmentation.describe() for augmentation in self.augmentations]}
+
+    def sample(self, rng, count):
+        """
+        Sample the parameters of every augmentation for count frames.
+        """
+        return [augmentation.sample(rng, count, self.width, self.height) for augmentation in self.augmentations]
+
+    def _block_params(self, seed, video_name, block):
+        key = (seed, video_name, block)
+        if self._block is None or self._block[0] != key:
+            if seed is None:
+                rng = np.random.default_rng()
+            else:
+                rng = np.random.default_rng([seed, zlib.crc32(video_name.encode()), block])
+            self._block = (key, self.sample(rng, self.block_size))
+        return self._block[1]
+
+    def augment(self, frame, seed, video_name, sample_index):
+        """
+        Augment one frame.
+
+        Args:
+            frame (numpy.ndarray): The BGR frame, drawn on in place where possible.
+            seed (int): The dataset seed, None for a fresh random block.
+            video_name (str): The name of the video the frame belongs to.
+            sample_index (int): Position of the frame among the sampled frames of the video.
+
+        Returns:
+            tuple: (augmented frame, (N, 4) xyxy boxes clipped to the frame)
+        """
+        block, slot = divmod(sample_index, self.block_size)
+        params = self._block_params(seed, video_name, block)
+        boxes = np.empty((0, 4), dtype=np.float32)
+        for augmentation, augmentation_params in zip(self.augmentations, params):
+            frame, boxes = augmentation.apply(frame, augmentation_params, slot, boxes)
+        boxes = np.clip(boxes, 0, [self.width, self.height, self.width, self.height])
+        # Boxes warped out of the frame are dropped
+        boxes = boxes[(boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])]
+        return frame, boxes
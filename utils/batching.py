@@ -0,0 +1,245 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+
+def percentile(values, q):
+    """
+    Get the q-th percentile of a sequence, or 0.0 if it is empty.
+    """
+    if not values:
+        return 0.0
+    return float(np.percentile(np.asarray(values, dtype=np.float64), q))
+
+class DynamicBatcher:
+    """
+    Gather items from any number of producers into batches for inference.
+
+    A batch is dispatched as soon as it holds max_batch_size items, or once
+    its oldest item has waited max_wait seconds, whichever comes first.
+    put() blocks while max_queue items, or max_bytes of them as measured
+    by size_fn, are waiting, which back-pressures the producers. Bounding
+    bytes keeps the memory of the queue the same whatever the frame
+    resolution. With drop_oldest, put() never blocks and the oldest
+    waiting item is discarded instead, which bounds latency for live sources.
+    """
+
+    def __init__(self, max_batch_size=8, max_wait=0.05, max_queue=256, history=1024,
+                 drop_oldest=False, on_drop=None, max_bytes=None, size_fn=None):
+        """
+        Args:
+            max_batch_size (int): Largest batch handed to the consumer.
+            max_wait (float): Longest time in seconds an item waits for its batch to fill.
+            max_queue (int): Number of items that may wait before put() blocks.
+            history (int): Number of recent samples kept for the latency percentiles.
+            drop_oldest (bool): Discard the oldest item instead of blocking when full.
+            on_drop (callable): Called with every discarded item, e.g. to free its buffer.
+            max_bytes (int): Bytes of items that may wait before put() blocks, None for no limit.
+            size_fn (callable): Size of an item in bytes, needed with max_bytes.
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.drop_oldest = drop_oldest
+        self.on_drop = on_drop
+        self.max_bytes = max_bytes
+        self.size_fn = size_fn
+
+        self._items = deque()
+        self._bytes = 0
+        self._closed = False
+        self._aborted = False
+        self._unfinished = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+
+        # Counters for tuning the batch size
+        self._started_at = time.perf_counter()
+        self._batches = 0
+        self._batched_items = 0
+        self._full_batches = 0
+        self._dropped = 0
+        self._queue_waits = deque(maxlen=history)
+        self._inference_times = deque(maxlen=history)
+        self._inference_items = 0
+        self._inference_total = 0.0
+
+    def put(self, item):
+        """
+        Add an item, blocking while the queue is full unless dropping the oldest.
+        """
+        size = self.size_fn(item) if self.max_bytes is not None else 0
+        dropped = []
+        with self._not_full:
+            while self.drop_oldest and self._items and self._full(size):
+                old, _, old_size = self._items.popleft()
+                self._bytes -= old_size
+                dropped.append(old)
+                self._dropped += 1
+                self._unfinished -= 1
+            while self._full(size) and not self._closed:
+                self._not_full.wait()
+            if self._aborted:
+                raise RuntimeError("Cannot put into a batcher whose consumer has stopped")
+            if self._closed:
+                raise RuntimeError("Cannot put into a closed batcher")
+            self._items.append((item, time.perf_counter(), size))
+            self._bytes += size
+            self._unfinished += 1
+            self._not_empty.notify()
+
+        if self.on_drop is not None:
+            for old in dropped:
+                self.on_drop(old)
+
+    def _full(self, size):
+        if len(self._items) >= self.max_queue:
+            return True
+        # An item larger than the whole budget still goes through once the queue is empty
+        return self.max_bytes is not None and len(self._items) > 0 and self._bytes + size > self.max_bytes
+
+    def close(self):
+        """
+        Signal that no more items will be added.
+        """
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def abort(self):
+        """
+        Signal that the consumer has stopped, e.g. after an error.
+
+        Closes the batcher and discards the waiting items. Blocked and later
+        put() calls raise instead of waiting for room that will never come,
+        and join() returns.
+
+        Returns:
+            list: The discarded items, so their buffers can be freed.
+        """
+        with self._lock:
+            self._closed = True
+            self._aborted = True
+            discarded = [item for item, _, _ in self._items]
+            self._items.clear()
+            self._bytes = 0
+            self._unfinished = 0
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            self._all_done.notify_all()
+        return discarded
+
+    def qsize(self):
+        """
+        Get the number of items waiting to be batched.
+        """
+        with self._lock:
+            return len(self._items)
+
+    def qbytes(self):
+        """
+        Get the bytes of the items waiting to be batched, 0 without max_bytes.
+        """
+        with self._lock:
+            return self._bytes
+
+    def unfinished(self):
+        """
+        Get the number of items put but not yet marked as processed.
+        """
+        with self._lock:
+            return self._unfinished
+
+    def next_batch(self):
+        """
+        Wait for the next batch.
+
+        Returns:
+            list: Up to max_batch_size items, or None once closed and drained.
+        """
+        with self._not_empty:
+            while not self._items:
+                if self._closed:
+                    return None
+                self._not_empty.wait()
+
+            # Give the batch until the oldest item's deadline to fill up
+            deadline = self._items[0][1] + self.max_wait
+            while len(self._items) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._not_empty.wait(remaining)
+
+            count = min(len(self._items), self.max_batch_size)
+            now = time.perf_counter()
+            batch = []
+            for _ in range(count):
+                item, enqueued_at, size = self._items.popleft()
+                self._bytes -= size
+                self._queue_waits.append(now - enqueued_at)
+                batch.append(item)
+
+            self._batches += 1
+            self._batched_items += count
+            if count == self.max_batch_size:
+                self._full_batches += 1
+            self._not_full.notify_all()
+            return batch
+
+    def task_done(self, count=1):
+        """
+        Mark count items as fully processed.
+        """
+        with self._lock:
+            self._unfinished = max(0, self._unfinished - count)
+            if self._unfinished <= 0:
+                self._all_done.notify_all()
+
+    def join(self):
+        """
+        Block until every item put so far has been marked as processed.
+        """
+        with self._all_done:
+            while self._unfinished > 0:
+                self._all_done.wait()
+
+    def record_inference(self, batch_size, seconds):
+        """
+        Record how long the consumer spent running inference on a batch.
+        """
+        with self._lock:
+            self._inference_times.append(seconds)
+            self._inference_items += batch_size
+            self._inference_total += seconds
+
+    def stats(self):
+        """
+        Get throughput and latency counters.
+
+        Returns:
+            dict: Batch counts, fill ratio, throughput and p50/p99 latencies in milliseconds.
+        """
+        with self._lock:
+            elapsed = time.perf_counter() - self._started_at
+            queue_waits = list(self._queue_waits)
+            inference_times = list(self._inference_times)
+            return {
+                "batches": self._batches,
+                "items": self._batched_items,
+                "mean_batch_size": self._batched_items / self._batches if self._batches else 0.0,
+                "full_batch_ratio": self._full_batches / self._batches if self._batches else 0.0,
+                "items_per_sec": self._batched_items / elapsed if elapsed > 0 else 0.0,
+                "inference_items_per_sec": (self._inference_items / self._inference_total
+                                            if self._inference_total > 0 else 0.0),
+                "queue_wait_p50_ms": percentile(queue_waits, 50) * 1000,
+                "queue_wait_p99_ms": percentile(queue_waits, 99) * 1000,
+                "inference_p50_ms": percentile(inference_times, 50) * 1000,
+                "inference_p99_ms": percentile(inference_times, 99) * 1000,
+                "queued": len(self._items),
+                "queued_bytes": self._bytes,
+                "dropped": self._dropped,
+            }
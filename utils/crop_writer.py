@@ -0,0 +1,197 @@
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from queue import Queue
+from uuid import uuid4
+import cv2
+
+def get_encode_params(image_format, quality):
+    """
+    Get the cv2.imencode parameters for an image format.
+
+    Args:
+        image_format (str): One of "jpg", "png" or "webp".
+        quality (int): JPEG/WebP quality (0-100), or PNG compression level (0-9).
+
+    Returns:
+        tuple: (extension, params)
+    """
+    image_format = image_format.lower().lstrip(".")
+    if image_format in ("jpg", "jpeg"):
+        return ".jpg", [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    if image_format == "webp":
+        return ".webp", [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    if image_format == "png":
+        return ".png", [cv2.IMWRITE_PNG_COMPRESSION, min(int(quality), 9)]
+    raise ValueError(f"Unsupported image format: {image_format}")
+
+class ShardWriter:
+    """
+    Append encoded images to numbered tar or zip archives of a fixed size.
+
+    Numbering continues after the shards already in the directory.
+    """
+
+    def __init__(self, output_dir, shard_size=1000, shard_format="tar", prefix="crops"):
+        if shard_format not in ("tar", "zip"):
+            raise ValueError(f"Unsupported shard format: {shard_format}")
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.shard_format = shard_format
+        self.prefix = prefix
+        self._archive = None
+        self._count = 0
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def _open_next(self):
+        self._count = 0
+        # Created exclusively, shards of earlier runs are skipped instead of truncated
+        while True:
+            path = os.path.join(self.output_dir, f"{self.prefix}_{self._index:05d}.{self.shard_format}")
+            self._index += 1
+            try:
+                if self.shard_format == "tar":
+                    self._archive = tarfile.open(path, "x")
+                else:
+                    # Images are already compressed, storing them avoids a second pass
+                    self._archive = zipfile.ZipFile(path, "x", compression=zipfile.ZIP_STORED)
+                return
+            except FileExistsError:
+                continue
+
+    def add(self, name, data):
+        """
+        Add one encoded image to the current shard.
+        """
+        with self._lock:
+            if self._archive is None or self._count >= self.shard_size:
+                self.close()
+                self._open_next()
+
+            if self.shard_format == "tar":
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                self._archive.addfile(info, io.BytesIO(data))
+            else:
+                self._archive.writestr(name, data)
+            self._count += 1
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+class CropWriter:
+    """
+    Encode and write detection crops on a thread pool.
+
+    The consumer only enqueues crops, encoding and disk writes happen on the
+    writer threads. The queue is bounded so a slow disk back-pressures the
+    consumer instead of growing memory.
+    """
+
+    def __init__(self, output_dir, num_threads=2, max_queue=256, image_format="jpg",
+                 quality=95, shard_size=None, shard_format="tar", logger=None):
+        """
+        Args:
+            output_dir (str): The directory to write crops to.
+            num_threads (int): Number of encode/write threads.
+            max_queue (int): Crops that may wait before write() blocks.
+            image_format (str): One of "jpg", "png" or "webp".
+            quality (int): Encoding quality, see get_encode_params.
+            shard_size (int): Pack crops into archives of this many images instead of loose files.
+            shard_format (str): "tar" or "zip" when sharding.
+            logger (logging.Logger): The logger to use for logging.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.logger = logger
+        self.extension, self.params = get_encode_params(image_format, quality)
+        self.shards = ShardWriter(output_dir, shard_size, shard_format) if shard_size else None
+
+        self._queue = Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._written = 0
+        self._bytes = 0
+        self._errors = 0
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(num_threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def write(self, crop, name=None):
+        """
+        Enqueue a crop for writing, blocking while the queue is full.
+
+        The crop must not be modified by the caller afterwards.
+
+        Args:
+            crop (numpy.ndarray): The image to write.
+            name (str): File name without extension, defaults to a random one.
+        """
+        self._queue.put((crop, name or f"cropped_result_{uuid4()}"))
+
+    def depth(self):
+        """
+        Get the number of crops waiting to be written.
+        """
+        return self._queue.qsize()
+
+    def stats(self):
+        """
+        Get the number of crops and bytes written so far.
+        """
+        with self._lock:
+            return {"written": self._written, "bytes": self._bytes,
+                    "errors": self._errors, "queued": self._queue.qsize()}
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                crop, name = job
+                ok, encoded = cv2.imencode(self.extension, crop, self.params)
+                if not ok:
+                    raise ValueError(f"Could not encode {name}")
+
+                data = encoded.tobytes()
+                if self.shards is not None:
+                    self.shards.add(name + self.extension, data)
+                else:
+                    with open(os.path.join(self.output_dir, name + self.extension), "wb") as f:
+                        f.write(data)
+
+                with self._lock:
+                    self._written += 1
+                    self._bytes += len(data)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                if self.logger:
+                    self.logger.error(f"Error writing crop: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Block until every enqueued crop has been written.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Flush pending crops, stop the threads and close any open shard.
+        """
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self.shards is not None:
+            self.shards.close()
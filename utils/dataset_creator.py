@@ -1,19 +1,17 @@
 import os
 import cv2
-import random
-import string
+import time
 import numpy as np
+from utils.frame_reader import sample_frames
+from utils.augmentation import AugmentationEngine
+from utils.packed_dataset import PackedDatasetWriter
+from utils.metrics import metrics
+from utils.logger import PER_FRAME
 
-def generate_random_section(length):
-    """
-    Generate a random section of text.
-
-    Args:
-        length (int): The length of the text to generate.
-
-    Returns:
-    """
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=length)).upper()
+# Text only, as the dataset has always been generated
+default_augmenter = AugmentationEngine()
+# Every nth frame of a video is converted
+FRAME_SAVE_INTERVAL = 10
 
 def create_required_directories(output_dir):
     """
@@ -36,15 +34,9 @@ def create_required_directories(output_dir):
 
     return train_dir, test_dir, val_dir, train_labels_dir, test_labels_dir, val_labels_dir
 
-def get_random_position(width, height):
-    """
-    Get a random position for the text.
-    """
-    x = random.randint(10, width - 200)  # Increased margin for longer text
-    y = random.randint(10, height - 30)
-    return x, y
-
-def convert_to_training_frames(video_path, output_dir, logger):
+def convert_to_training_frames(video_path, output_dir, logger, seed=None, start=0, stop=None, frame_cache=None,
+                               output_format="files", raise_errors=False, augmenter=None,
+                               save_arrays=False):
     """
     Convert a video file to a sequence of frames.
 
@@ -52,10 +44,26 @@ def convert_to_training_frames(video_path, output_dir, logger):
         video_path (str): The path to the video file.
         output_dir (str): The directory to save the frames.
         logger (logging.Logger): The logger to use for logging.
+        seed (int): Seed for reproducible augmentations.
+        start (int): Index of the first frame to convert.
+        stop (int): Index one past the last frame to convert.
+        frame_cache (FrameCache): Optional cache to read the resized frames through.
+        output_format (str): "files" for one jpg/txt per frame, "packed" for sharded archives.
+        raise_errors (bool): Re-raise errors after logging them instead of returning the partial records.
+        augmenter (AugmentationEngine): The augmentations to apply, defaults to random text.
+        save_arrays (bool): Also save each "files" frame decoded as a .npy array next to its jpg,
+            which the ultralytics disk cache reads instead of decoding the jpg every epoch.
 
     Returns:
-        None
+        list: One record per saved frame with its image and label paths.
     """
+    records = []
+    packed_writer = None
+    augmenter = augmenter or default_augmenter
+    frames_saved = metrics.counter("dataset_frames_total", "Frames saved as training samples")
+    # Per-frame cost, from handing out one frame to reading the next, so it includes decoding
+    frame_seconds = metrics.histogram("stage_seconds", "Time spent per call of a pipeline stage",
+                                      stage="dataset_frame")
     try:
         # Get the video name
         video_name = video_path.split("/")[-1].replace(".mp4", "")
@@ -63,194 +71,82 @@ def convert_to_training_frames(video_path, output_dir, logger):
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
 
-        # Open video file
-        cap = cv2.VideoCapture(video_path)
-        
-        # Get video properties
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
         # Create required directories
         logger.info(f"Creating required directories in {output_dir}")
         train_dir, test_dir, val_dir, train_labels_dir, test_labels_dir, val_labels_dir = create_required_directories(output_dir)
 
-        # Initialize frame counter
-        frame_index = 0
-        frame_save_interval = 10
-
-        # Read and save frames
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # Resize frame to 640x640
-            frame = cv2.resize(frame, (640, 640))
-
-            # Save every nth frame
-            if frame_index % frame_save_interval == 0:
-                # Update width and height for normalized calculations
-                width = 640
-                height = 640
-                
-                # Randomly decide whether to add text to this frame (70% chance)
-                if random.random() < 0.7:
-                    # Add random alphanumeric text to the frame
-                    # Generate random text in format XXXX-XXXXXX-XXXX
-                    
-                    random_text = f"{generate_random_section(4)}-{generate_random_section(6)}-{generate_random_section(4)}"
-                    logger.info(f"Generating random text: {random_text}")
-
-                    # Random position for the text
-                    x, y = get_random_position(width, height)
-                    logger.info(f"Random position: ({x}, {y})")
-
-                    # Add text to the frame
-                    fonts = [
-                        cv2.FONT_HERSHEY_PLAIN,  # Times New Roman-like serif font
-                        cv2.FONT_HERSHEY_COMPLEX,  # Similar to Times New Roman
-                        cv2.FONT_HERSHEY_TRIPLEX,  # Bold serif font
-                        cv2.FONT_HERSHEY_COMPLEX_SMALL  # Smaller serif font
-                    ]
-                    font = random.choice(fonts)
-                    font_scale = random.uniform(0.3, 0.7)  # Random font size
-                    font_thickness = random.randint(1, 3)  # Random thickness
-                    font_color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))  # Random color
-                    
-                    # Add spacing between characters
-                    spaced_text = '  '.join(random_text)
-                    
-                    # Get text size with spacing
-                    (text_width, text_height), baseline = cv2.getTextSize(spaced_text, font, font_scale, font_thickness)
-                    
-                    # Calculate text bounding box
-                    text_center_x = x + text_width // 2
-                    text_center_y = y - text_height // 2
-                    
-                    # Ensure text stays within frame boundaries
-                    margin = 20  # Add some margin from the edges
-                    max_x = width - text_width - margin
-                    max_y = height - text_height - margin
-                    
-                    # Adjust position if text would go out of bounds
-                    x = min(max(margin, x), max_x)
-                    y = min(max(margin + text_height, y), max_y)
-                    
-                    # Recalculate center after position adjustment
-                    text_center_x = x + text_width // 2
-                    text_center_y = y - text_height // 2
-                    
-                    # Create a blank image for the text
-                    text_img = np.zeros((height, width, 3), dtype=np.uint8)
-                    cv2.putText(text_img, spaced_text, (x, y), font, font_scale, font_color, font_thickness)
-
-                    # Randomly decide whether to rotate the text (50% chance)
-                    if random.random() < 0.5:
-                        # Random rotation angle (-30 to 30 degrees)
-                        angle = random.uniform(-30, 30)
-                        
-                        # Get rotation matrix
-                        rotation_matrix = cv2.getRotationMatrix2D((text_center_x, text_center_y), angle, 1.0)
-                        
-                        # Apply rotation to text image
-                        rotated_text = cv2.warpAffine(text_img, rotation_matrix, (width, height))
-                        
-                        # Combine original frame with rotated text
-                        frame = cv2.addWeighted(frame, 1, rotated_text, 1, 0)
-                        
-                        # Calculate rotated bounding box corners
-                        corners = np.array([
-                            [x, y - text_height],
-                            [x + text_width, y - text_height],
-                            [x + text_width, y + baseline],
-                            [x, y + baseline]
-                        ])
-                        
-                        # Rotate corners
-                        rotated_corners = cv2.transform(corners.reshape(-1, 1, 2), rotation_matrix).reshape(-1, 2)
-                        
-                        # Calculate new bounding box
-                        min_x = np.min(rotated_corners[:, 0])
-                        max_x = np.max(rotated_corners[:, 0])
-                        min_y = np.min(rotated_corners[:, 1])
-                        max_y = np.max(rotated_corners[:, 1])
-                        
-                        # Ensure rotated text stays within frame
-                        if min_x < 0 or max_x > width or min_y < 0 or max_y > height:
-                            # If text goes out of bounds, try again with a different position
-                            continue
-                        
-                        # Update text center coordinates for resized frame
-                        text_center_x = (min_x + max_x) / 2
-                        text_center_y = (min_y + max_y) / 2
-                    else:
-                        # Add text without rotation
-                        frame = cv2.addWeighted(frame, 1, text_img, 1, 0)
-                        min_x = x
-                        max_x = x + text_width
-                        min_y = y - text_height
-                        max_y = y + baseline
-                        
-                        # Update text center coordinates for resized frame
-                        text_center_x = (min_x + max_x) / 2
-                        text_center_y = (min_y + max_y) / 2
-                    
-                    # Draw bounding box
-                    # box_color = (0, 255, 0)  # Green color
-                    # box_thickness = 2
-                    # cv2.rectangle(frame, 
-                    #             (int(min_x), int(min_y)), 
-                    #             (int(max_x), int(max_y)), 
-                    #             box_color, 
-                    #             box_thickness)
-
-                    logger.info(f"Text: {random_text}, Center: ({text_center_x}, {text_center_y}), Size: ({text_width}, {text_height}), Position: ({x}, {y})")
-
-                    # Determine which directory to save to based on frame index
-                    if frame_index/10 % 10 < 8:  # 80% for training
-                        logger.info(f"Saving to train directory")
-                        save_dir = train_dir
-                        labels_dir = train_labels_dir
-                    elif frame_index/10 % 10 < 9:  # 10% for testing
-                        logger.info(f"Saving to test directory")
-                        save_dir = test_dir
-                        labels_dir = test_labels_dir
-                    else:  # 10% for validation
-                        logger.info(f"Saving to val directory")
-                        save_dir = val_dir
-                        labels_dir = val_labels_dir
-
-                    # Save the frame
-                    frame_path = os.path.join(save_dir, f"{video_name}_frame_{frame_index:06d}.jpg")
-                    cv2.imwrite(frame_path, frame)
-
-                    # Create corresponding label file
+        if output_format == "packed":
+            # Frame ranges of the same video are converted by separate writers
+            packed_writer = PackedDatasetWriter(output_dir, prefix=f"{video_name}_{start:08d}")
+
+        frame_save_interval = FRAME_SAVE_INTERVAL
+        last_frame_at = None
+        width, height = augmenter.width, augmenter.height
+
+        # Read every nth frame, resized to the augmented size (640x640); the others are never decoded in full
+        read_frames = frame_cache.sample_frames if frame_cache is not None else sample_frames
+        for frame_index, frame in read_frames(video_path, stride=frame_save_interval, resize=(width, height),
+                                              start=start, stop=stop):
+            now = time.perf_counter()
+            if last_frame_at is not None:
+                frame_seconds.observe(now - last_frame_at)
+            last_frame_at = now
+
+            # Cached frames are read-only memory maps, text is drawn in place
+            if frame_cache is not None:
+                frame = frame.copy()
+
+            # Parameters are sampled a block of frames at a time, only the drawing happens per frame
+            frame, boxes = augmenter.augment(frame, seed, video_name, frame_index // frame_save_interval)
+            logger.debug("Boxes: %s", boxes.tolist(), extra=PER_FRAME)
+
+            # Determine which directory to save to based on frame index
+            if frame_index/10 % 10 < 8:  # 80% for training
+                split = "train"
+                save_dir = train_dir
+                labels_dir = train_labels_dir
+            elif frame_index/10 % 10 < 9:  # 10% for testing
+                split = "test"
+                save_dir = test_dir
+                labels_dir = test_labels_dir
+            else:  # 10% for validation
+                split = "val"
+                save_dir = val_dir
+                labels_dir = val_labels_dir
+            logger.debug("Saving to %s directory", split, extra=PER_FRAME)
+
+            # Normalized class x_center y_center width height, one row per text instance
+            labels = [[0, (x1 + x2) / 2 / width, (y1 + y2) / 2 / height, (x2 - x1) / width, (y2 - y1) / height]
+                      for x1, y1, x2, y2 in boxes.tolist()]
+
+            if packed_writer is not None:
+                frame_path = f"{video_name}_frame_{frame_index:06d}"
+                label_path = None
+                packed_writer.add(split, frame_path, frame, labels or None)
+            else:
+                # Save the frame
+                frame_path = os.path.join(save_dir, f"{video_name}_frame_{frame_index:06d}.jpg")
+                cv2.imwrite(frame_path, frame)
+                if save_arrays:
+                    np.save(os.path.splitext(frame_path)[0] + ".npy", frame)
+
+                # Frames without text get no label file
+                label_path = None
+                if labels:
                     label_path = os.path.join(labels_dir, f"{video_name}_frame_{frame_index:06d}.txt")
-                    
-                    # Calculate normalized coordinates
-                    center_x_norm = text_center_x / width
-                    center_y_norm = text_center_y / height
-                    width_norm = (max_x - min_x) / width
-                    height_norm = (max_y - min_y) / height
-                    
-                    # Write label file with format: class x_center y_center width height
                     with open(label_path, 'w') as f:
-                        f.write(f"0 {center_x_norm:.6f} {center_y_norm:.6f} {width_norm:.6f} {height_norm:.6f}\n")
-                else:
-                    # Save frame without text
-                    if frame_index/10 % 10 < 8:  # 80% for training
-                        logger.info(f"Saving to train directory")
-                        save_dir = train_dir
-                    elif frame_index/10 % 10 < 9:  # 10% for testing
-                        logger.info(f"Saving to test directory")
-                        save_dir = test_dir
-                    else:  # 10% for validation
-                        logger.info(f"Saving to val directory")
-                        save_dir = val_dir
+                        for cls, center_x, center_y, box_width, box_height in labels:
+                            f.write(f"{cls} {center_x:.6f} {center_y:.6f} {box_width:.6f} {box_height:.6f}\n")
 
-                    frame_path = os.path.join(save_dir, f"{video_name}_frame_{frame_index:06d}.jpg")
-                    cv2.imwrite(frame_path, frame)
-
-            frame_index += 1
+            records.append({"video": video_name, "frame_index": frame_index,
+                            "image": frame_path, "label": label_path})
+        frames_saved.inc(len(records))
     except Exception as e:
         logger.error(f"Error converting video to frames: {e}")
+        if raise_errors:
+            raise
+    finally:
+        if packed_writer is not None:
+            packed_writer.close()
+
+    return records
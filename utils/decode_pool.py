@@ -0,0 +1,199 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from utils.frame_reader import sample_frames, get_video_properties
+
+# Markers sent on the ready queue alongside frame metadata
+TASK_DONE = "done"
+TASK_ERROR = "error"
+
+def build_decode_tasks(video_paths, segment_frames=None, frame_cache=None, stride=1, offset=0, resize=None):
+    """
+    Split videos into decode tasks, one per video or per time-segment.
+
+    Only whole reads create frame cache entries, so videos the cache does
+    not hold yet are kept whole; they are split once they are cached.
+
+    Args:
+        video_paths (list): Paths of the videos to decode.
+        segment_frames (int): Split videos into segments of this many frames.
+        frame_cache (FrameCache): Optional cache the tasks will read through.
+        stride (int): Stride the tasks read with, to look the videos up in the cache.
+        offset (int): Offset the tasks read with.
+        resize (tuple): Size the tasks read at.
+
+    Returns:
+        list: (video_path, start_frame, stop_frame) tuples, stop_frame None means end of video.
+    """
+    tasks = []
+    for video_path in video_paths:
+        if not segment_frames or (frame_cache is not None
+                                  and not frame_cache.contains(video_path, stride, offset, resize)):
+            tasks.append((video_path, 0, None))
+            continue
+
+        cap = cv2.VideoCapture(video_path)
+        _, frame_count, _, _ = get_video_properties(cap)
+        cap.release()
+
+        if frame_count <= segment_frames:
+            tasks.append((video_path, 0, None))
+            continue
+
+        for start in range(0, frame_count, segment_frames):
+            stop = start + segment_frames
+            tasks.append((video_path, start, stop if stop < frame_count else None))
+    return tasks
+
+def max_frame_bytes(video_paths):
+    """
+    Get the size in bytes of the largest BGR frame among the videos.
+    """
+    largest = 0
+    for video_path in video_paths:
+        cap = cv2.VideoCapture(video_path)
+        _, _, width, height = get_video_properties(cap)
+        cap.release()
+        largest = max(largest, width * height * 3)
+    return largest
+
+def _decode_worker(shm_name, slot_bytes, task_queue, free_slots, ready_queue, stride, offset, frame_cache):
+    """
+    Worker process: decode tasks and copy sampled frames into shared memory slots.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            video_path, start, stop = task
+            try:
+                read_frames = frame_cache.sample_frames if frame_cache is not None else sample_frames
+                for frame_index, frame in read_frames(video_path, stride=stride, offset=offset,
+                                                      start=start, stop=stop):
+                    if frame.nbytes > slot_bytes:
+                        raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {slot_bytes} byte slot")
+
+                    # Blocks when every slot is in use, which throttles decoding
+                    slot = free_slots.get()
+                    view = np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf,
+                                      offset=slot * slot_bytes)
+                    view[...] = frame
+                    del view
+                    ready_queue.put((slot, frame.shape, video_path, frame_index))
+                ready_queue.put((TASK_DONE, task))
+            except Exception as e:
+                ready_queue.put((TASK_ERROR, task, str(e)))
+    finally:
+        shm.close()
+
+class DecodePool:
+    """
+    Decode videos in worker processes and hand frames over in shared memory.
+
+    Frames are written to a fixed number of slots in one shared memory block,
+    so only small metadata tuples cross process boundaries. The number of slots
+    bounds how far decoding can run ahead of the consumer.
+    """
+
+    def __init__(self, video_paths, num_workers=None, num_slots=32, stride=1, offset=0,
+                 segment_frames=None, slot_bytes=None, frame_cache=None, logger=None):
+        """
+        Args:
+            video_paths (list): Paths of the videos to decode.
+            num_workers (int): Number of decode processes, defaults to the CPU count.
+            num_slots (int): Number of frames that can be in flight at once.
+            stride (int): Keep every stride-th frame.
+            offset (int): Index of the first frame to keep.
+            segment_frames (int): Split long videos into tasks of this many frames.
+            slot_bytes (int): Size of one slot, defaults to the largest frame of the videos.
+            frame_cache (FrameCache): Optional cache the workers read frames through.
+            logger (logging.Logger): The logger to use for logging.
+        """
+        self.num_workers = num_workers or mp.cpu_count()
+        self.num_slots = num_slots
+        self.logger = logger
+        self.tasks = build_decode_tasks(video_paths, segment_frames, frame_cache, stride=stride, offset=offset)
+        self._pending = len(self.tasks)
+        self.slot_bytes = slot_bytes or max(max_frame_bytes(video_paths), 1)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * num_slots)
+        self.task_queue = mp.Queue()
+        self.free_slots = mp.Queue()
+        self.ready_queue = mp.Queue()
+
+        for slot in range(num_slots):
+            self.free_slots.put(slot)
+        for task in self.tasks:
+            self.task_queue.put(task)
+        for _ in range(self.num_workers):
+            self.task_queue.put(None)
+
+        self.workers = [
+            mp.Process(target=_decode_worker,
+                       args=(self.shm.name, self.slot_bytes, self.task_queue, self.free_slots,
+                             self.ready_queue, stride, offset, frame_cache),
+                       daemon=True)
+            for _ in range(self.num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def frames(self):
+        """
+        Yield decoded frames until every task is finished.
+
+        The yielded frame is a view into shared memory, pass its slot to
+        release() once the frame is no longer needed.
+
+        Yields:
+            tuple: (video_path, frame_index, frame, slot)
+        """
+        while self._pending:
+            message = self.ready_queue.get()
+            if message[0] == TASK_DONE:
+                self._pending -= 1
+                continue
+            if message[0] == TASK_ERROR:
+                self._pending -= 1
+                if self.logger:
+                    self.logger.error(f"Error decoding {message[1]}: {message[2]}")
+                continue
+
+            slot, shape, video_path, frame_index = message
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf,
+                               offset=slot * self.slot_bytes)
+            yield video_path, frame_index, frame, slot
+
+    def release(self, slot):
+        """
+        Return a slot to the workers once its frame has been consumed.
+        """
+        self.free_slots.put(slot)
+
+    def close(self, timeout=5):
+        """
+        Stop the workers and free the shared memory.
+
+        Workers are given timeout seconds in total to exit once every task
+        is done. If the frames were not all consumed, e.g. because the
+        consumer failed, workers may wait for slots forever and are
+        terminated right away.
+        """
+        deadline = time.monotonic() + (timeout if not self._pending else 0)
+        for worker in self.workers:
+            worker.join(timeout=max(0, deadline - time.monotonic()))
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        try:
+            self.shm.close()
+        except BufferError:
+            # A consumer still holds a frame view, the mapping goes away with it
+            pass
+        self.shm.unlink()
@@ -0,0 +1,332 @@
+import base64
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import cv2
+import numpy as np
+from utils.batching import DynamicBatcher
+from utils.metrics import metrics, timed
+from utils.postprocess import postprocess_batch, extract_crops
+
+# Request bodies: raw uint8 frames of the shape in X-Shape, or JPEGs of the lengths in X-Lengths
+RAW_CONTENT_TYPE = "application/x-raw-frames"
+JPEG_BATCH_CONTENT_TYPE = "application/x-jpeg-batch"
+
+class _Request:
+    """Frames of one client request, completed once every frame has been inferred"""
+
+    def __init__(self, frames, with_crops):
+        self.frames = frames
+        self.with_crops = with_crops
+        self.results = [None] * len(frames)
+        self._remaining = len(frames)
+        self._lock = threading.Lock()
+        self.done = threading.Event()
+        if not frames:
+            self.done.set()
+
+    def complete(self, index, result):
+        self.results[index] = result
+        with self._lock:
+            self._remaining -= 1
+            if not self._remaining:
+                self.done.set()
+
+class DetectionService:
+    """
+    Keep a detector resident and coalesce concurrent requests into shared batches.
+
+    Frames of all pending requests go through one DynamicBatcher, so
+    requests arriving together are inferred together. A batch is sent as
+    soon as it is full or its oldest frame has waited max_wait seconds.
+    Boxes are filtered, expanded and clipped like in get_objects.
+    """
+
+    def __init__(self, detector, max_batch_size=8, max_wait=0.01, max_queue=256, conf_threshold=0.7,
+                 width_scale=1.3, height_scale=1.7, crop_quality=95, logger=None):
+        """
+        Args:
+            detector (Detector): The model, loaded once and shared by every request.
+            max_batch_size (int): Largest batch sent to the model.
+            max_wait (float): Longest time in seconds a frame waits for its batch to fill.
+            max_queue (int): Frames that may wait before new requests block.
+            conf_threshold (float): Minimum confidence for a box to be returned.
+            width_scale (float): Factor applied to the box width.
+            height_scale (float): Factor applied to the box height.
+            crop_quality (int): JPEG quality of the returned crops.
+            logger (logging.Logger): The logger to use for logging.
+        """
+        self.detector = detector
+        self.conf_threshold = conf_threshold
+        self.width_scale = width_scale
+        self.height_scale = height_scale
+        self.crop_params = [cv2.IMWRITE_JPEG_QUALITY, crop_quality]
+        self.logger = logger
+        self.batcher = DynamicBatcher(max_batch_size=max_batch_size, max_wait=max_wait, max_queue=max_queue)
+        self.requests_total = metrics.counter("server_requests_total", "Detection requests served")
+        metrics.gauge("server_queue_depth", "Frames waiting for inference", fn=self.batcher.qsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self.batcher.next_batch()
+            if batch is None:
+                break
+            frames = [request.frames[index] for request, index in batch]
+            try:
+                start = time.perf_counter()
+                with timed("inference"):
+                    results = self.detector(frames)
+                self.batcher.record_inference(len(frames), time.perf_counter() - start)
+
+                with timed("postprocess"):
+                    detections = postprocess_batch(results, frames, conf_threshold=self.conf_threshold,
+                                                   width_scale=self.width_scale, height_scale=self.height_scale)
+                    crops = extract_crops(frames, detections)
+                outputs = [{"boxes": [], "confs": [], "classes": [], "crops": []} for _ in batch]
+                for (frame_id, crop), box, conf, cls in zip(crops, detections.boxes.tolist(),
+                                                             detections.confs.tolist(),
+                                                             detections.classes.tolist()):
+                    output = outputs[frame_id]
+                    output["boxes"].append(box)
+                    output["confs"].append(conf)
+                    output["classes"].append(cls)
+                    if batch[frame_id][0].with_crops:
+                        _, encoded = cv2.imencode(".jpg", crop, self.crop_params)
+                        output["crops"].append(base64.b64encode(encoded.tobytes()).decode())
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Error running detection batch: {e}")
+                outputs = [{"error": str(e)} for _ in batch]
+
+            for (request, index), output in zip(batch, outputs):
+                request.complete(index, output)
+            self.batcher.task_done(len(batch))
+
+    def detect(self, frames, with_crops=False):
+        """
+        Run detection on frames, sharing batches with concurrent callers.
+
+        Args:
+            frames (list): BGR frames.
+            with_crops (bool): Also return the JPEG encoded crops, base64 encoded.
+
+        Returns:
+            list: One dict per frame with its boxes (expanded xyxy), confs, classes and crops.
+        """
+        request = _Request(frames, with_crops)
+        for index in range(len(frames)):
+            self.batcher.put((request, index))
+        request.done.wait()
+        self.requests_total.inc()
+        return request.results
+
+    def close(self):
+        self.batcher.close()
+        self._thread.join()
+
+def decode_frames(content_type, headers, body):
+    """
+    Decode a request body into frames.
+
+    Raw frames are viewed in place, without copying or decoding.
+    """
+    if content_type == RAW_CONTENT_TYPE:
+        shape = tuple(int(value) for value in headers["X-Shape"].split(","))
+        # Anything else would reach the model as a frame it cannot take, e.g. a -1 inferred by reshape
+        if len(shape) not in (3, 4) or shape[-1] != 3 or min(shape) <= 0:
+            raise ValueError(f"X-Shape must be H,W,3 or N,H,W,3 with positive sizes, got {headers['X-Shape']}")
+        array = np.frombuffer(body, dtype=np.uint8).reshape(shape)
+        return list(array) if array.ndim == 4 else [array]
+
+    if content_type == JPEG_BATCH_CONTENT_TYPE:
+        lengths = [int(value) for value in headers["X-Lengths"].split(",")]
+    elif content_type in ("image/jpeg", "image/png"):
+        lengths = [len(body)]
+    else:
+        raise ValueError(f"Unsupported content type: {content_type}")
+    # cv2 raises its own error on empty buffers, which the handler would not answer with a 400
+    if not lengths or min(lengths) <= 0 or sum(lengths) != len(body):
+        raise ValueError(f"Image lengths {lengths} do not split a body of {len(body)} bytes")
+
+    frames, offset = [], 0
+    view = memoryview(body)
+    for length in lengths:
+        try:
+            frame = cv2.imdecode(np.frombuffer(view[offset:offset + length], dtype=np.uint8), cv2.IMREAD_COLOR)
+        except cv2.error as e:
+            raise ValueError(f"Could not decode image: {e}")
+        if frame is None:
+            raise ValueError("Could not decode image")
+        frames.append(frame)
+        offset += length
+    return frames
+
+def make_handler(service):
+    """
+    Build the HTTP request handler serving a DetectionService.
+    """
+    class DetectionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body, content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/health":
+                self._send(200, json.dumps({"status": "ok", "batching": service.batcher.stats()}).encode())
+            elif path == "/metrics":
+                self._send(200, metrics.render_prometheus().encode(), "text/plain; version=0.0.4")
+            else:
+                self._send(404, b'{"error": "not found"}')
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if url.path != "/detect":
+                self._send(404, b'{"error": "not found"}')
+                return
+            try:
+                frames = decode_frames(self.headers.get("Content-Type", "").split(";")[0], self.headers, body)
+            except (KeyError, ValueError) as e:
+                self._send(400, json.dumps({"error": str(e)}).encode())
+                return
+            with_crops = parse_qs(url.query).get("crops", ["0"])[0] in ("1", "true")
+            results = service.detect(frames, with_crops=with_crops)
+            errors = [result["error"] for result in results if "error" in result]
+            if errors:
+                self._send(500, json.dumps({"error": errors[0]}).encode())
+                return
+            self._send(200, json.dumps({"frames": results}).encode())
+
+        def address_string(self):
+            # Unix socket peers have no address
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, format, *args):
+            pass
+
+    return DetectionHandler
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+def serve(service, port=None, unix_socket=None, host="127.0.0.1"):
+    """
+    Serve a DetectionService over HTTP on a TCP port or on a Unix socket, until interrupted.
+    """
+    handler = make_handler(service)
+    if unix_socket:
+        server = ThreadingUnixHTTPServer(unix_socket, handler)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+    if service.logger:
+        service.logger.info(f"Serving detections on {unix_socket or f'http://{host}:{port}'}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=60):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+class DetectionClient:
+    """
+    Client of a detection server, keeping one connection open across requests.
+
+    Not thread-safe, use one client per thread.
+    """
+
+    def __init__(self, address):
+        """
+        Args:
+            address (str): "http://host:port" or the path of a Unix socket.
+        """
+        if address.startswith("http://"):
+            url = urlparse(address)
+            self.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        else:
+            self.connection = _UnixHTTPConnection(address)
+
+    def detect(self, frames, encoding="raw", with_crops=False, jpeg_quality=90):
+        """
+        Send frames for detection.
+
+        Args:
+            frames (list): BGR frames, all of the same shape when sent raw.
+            encoding (str): "raw" to send the pixels as they are, "jpeg" to compress them first.
+            with_crops (bool): Ask for the crops of the accepted boxes.
+            jpeg_quality (int): Quality of the JPEG encoding.
+
+        Returns:
+            list: One dict per frame, see DetectionService.detect.
+        """
+        if encoding == "raw":
+            batch = np.ascontiguousarray(np.stack(frames))
+            body = memoryview(batch).cast("B")
+            headers = {"Content-Type": RAW_CONTENT_TYPE, "X-Shape": ",".join(map(str, batch.shape))}
+        else:
+            encoded = [cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])[1].tobytes()
+                       for frame in frames]
+            body = b"".join(encoded)
+            headers = {"Content-Type": JPEG_BATCH_CONTENT_TYPE,
+                       "X-Lengths": ",".join(str(len(data)) for data in encoded)}
+        headers["Content-Length"] = str(len(body))
+
+        self.connection.request("POST", "/detect?crops=1" if with_crops else "/detect", body=body, headers=headers)
+        response = self.connection.getresponse()
+        payload = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"Detection request failed with {response.status}: {payload.get('error')}")
+        return payload["frames"]
+
+    def close(self):
+        self.connection.close()
+
+# Example usage: python -m utils.detection_server --port 8080, or --unix /tmp/detector.sock
+if __name__ == '__main__':
+    import argparse
+    from utils.detector import Detector
+    from utils.logger import setup_logger
+
+    parser = argparse.ArgumentParser(description="Serve detections from a resident model")
+    parser.add_argument("--weights", default="yolo11n_trained.pt")
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", help="Listen on this Unix socket instead of the TCP port")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait", type=float, default=0.01)
+    parser.add_argument("--conf", type=float, default=0.7)
+    args = parser.parse_args()
+
+    logger = setup_logger("detection_server")
+    detector = Detector(args.weights, args.backend, logger=logger)
+    detector.warmup(batch_size=args.max_batch_size)
+    service = DetectionService(detector, max_batch_size=args.max_batch_size, max_wait=args.max_wait,
+                               conf_threshold=args.conf, logger=logger)
+    serve(service, port=args.port, unix_socket=args.unix)
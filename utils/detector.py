@@ -0,0 +1,86 @@
+import threading
+import time
+
+# Detectors shared by everything in the process, keyed by their configuration
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+class Detector:
+    """
+    Detection model that is only loaded when it is first used.
+
+    Creating a Detector is cheap and imports nothing heavy, the weights
+    and the inference runtime are loaded on the first call or on warmup().
+    """
+
+    def __init__(self, weights, backend="pytorch", int8=False, imgsz=640, logger=None):
+        """
+        Args:
+            weights (str): Path of the trained weights.
+            backend (str): Inference runtime, see utils.inference_backend.BACKENDS.
+            int8 (bool): Use the INT8 quantized export.
+            imgsz (int): Inference image size.
+            logger (logging.Logger): The logger to use for logging.
+        """
+        self.weights = weights
+        self.backend = backend
+        self.int8 = int8
+        self.imgsz = imgsz
+        self.logger = logger
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def model(self):
+        """
+        Get the inference backend, loading it on first access.
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from utils.inference_backend import InferenceBackend
+
+                    start = time.perf_counter()
+                    self._model = InferenceBackend(self.weights, self.backend, int8=self.int8,
+                                                   imgsz=self.imgsz, logger=self.logger)
+                    if self.logger:
+                        self.logger.info(f"Loaded {self.weights} on {self.backend} "
+                                         f"in {time.perf_counter() - start:.2f} seconds")
+        return self._model
+
+    def __call__(self, frames, imgsz=None, **kwargs):
+        return self.model(frames, imgsz=imgsz or self.imgsz, **kwargs)
+
+    def warmup(self, batch_size=1, runs=2):
+        """
+        Load the model and run it on blank frames so the first real batch is not slowed down.
+
+        Returns:
+            float: Seconds spent warming up.
+        """
+        import numpy as np
+
+        start = time.perf_counter()
+        frames = [np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8) for _ in range(batch_size)]
+        for _ in range(runs):
+            self(frames)
+        elapsed = time.perf_counter() - start
+        if self.logger:
+            self.logger.info(f"Warmed up detector in {elapsed:.2f} seconds")
+        return elapsed
+
+def get_detector(weights, backend="pytorch", int8=False, imgsz=640, logger=None):
+    """
+    Get the shared detector for a configuration, creating it (unloaded) if needed.
+    """
+    key = (weights, backend, int8, imgsz)
+    with _detectors_lock:
+        detector = _detectors.get(key)
+        if detector is None:
+            detector = Detector(weights, backend, int8=int8, imgsz=imgsz, logger=logger)
+            _detectors[key] = detector
+        return detector
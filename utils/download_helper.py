@@ -1,5 +1,4 @@
 import os
-import yt_dlp
 from urllib.parse import urlparse, parse_qs
 from utils.logger import setup_logger
 
@@ -25,6 +24,35 @@ def is_valid_youtube_url(url):
     except:
         return False
 
+def build_ydl_options(output_path, filename, concurrent_fragments=4, threads=4, ratelimit=None):
+    """
+    Build the yt-dlp options used for every download.
+
+    Args:
+        output_path (str): The directory to save the video to.
+        filename (str): The name of the video file.
+        concurrent_fragments (int): Fragments of the video downloaded at once.
+        threads (int): Threads used for downloading.
+        ratelimit (int): Largest download rate in bytes per second, None for no limit.
+
+    Returns:
+        dict: Options for yt_dlp.YoutubeDL.
+    """
+    ydl_opts = {
+        'format': 'bestvideo[height<=640][ext=mp4]+bestaudio[ext=m4a]/best[height<=640][ext=mp4]/best[height<=640]',  # Target 640p or lower
+        'outtmpl': os.path.join(output_path, filename),
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': False,
+        'merge_output_format': 'mp4',  # Ensure output is MP4,
+        'concurrent_fragments': concurrent_fragments,  # Download multiple fragments simultaneously
+        'threads': threads,  # Use multiple threads for downloading
+        'continuedl': True,  # Resume partially downloaded files
+    }
+    if ratelimit:
+        ydl_opts['ratelimit'] = ratelimit
+    return ydl_opts
+
 def download_youtube_video(url, output_path, filename="dataset.mp4", logger=None):
     """
     Download a YouTube video using yt-dlp.
@@ -42,6 +70,9 @@ def download_youtube_video(url, output_path, filename="dataset.mp4", logger=None
         if logger is None:
             logger = setup_logger(__name__)
 
+        # Imported here so that processing, which only needs build_ydl_options, runs without yt-dlp
+        import yt_dlp
+
         # Validate URL
         if not is_valid_youtube_url(url):
             logger.error(f"Invalid YouTube URL: {url}")
@@ -50,16 +81,7 @@ def download_youtube_video(url, output_path, filename="dataset.mp4", logger=None
         os.makedirs(output_path, exist_ok=True)
 
         # Configure yt-dlp options
-        ydl_opts = {
-            'format': 'bestvideo[height<=640][ext=mp4]+bestaudio[ext=m4a]/best[height<=640][ext=mp4]/best[height<=640]',  # Target 640p or lower
-            'outtmpl': os.path.join(output_path, filename),
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            'merge_output_format': 'mp4',  # Ensure output is MP4,
-            'concurrent_fragments': 4,  # Download multiple fragments simultaneously
-            'threads': 4,  # Use multiple threads for downloading
-        }
+        ydl_opts = build_ydl_options(output_path, filename)
         
         # Download the video
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
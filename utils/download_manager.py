@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+from utils.download_helper import build_ydl_options, is_valid_youtube_url
+
+REGISTRY_NAME = "downloads.json"
+
+def read_links(links_path="youtube_links.txt"):
+    """
+    Read the links file into download jobs.
+
+    Returns:
+        list: (url, filename) tuples in link order, files named <video id>.mp4.
+    """
+    # Named by video rather than by position, so editing the links file never gives a file to another video
+    jobs = []
+    with open(links_path, "r") as f:
+        for line in f:
+            url = line.strip()
+            if url:
+                jobs.append((url, f"{video_id(url)}.mp4"))
+    return jobs
+
+def video_id(url):
+    """
+    Get a stable id for a URL, the video id for YouTube links and a hash of the URL otherwise.
+    """
+    parsed_url = urlparse(url)
+    if parsed_url.netloc == "youtu.be" and len(parsed_url.path) > 1:
+        return parsed_url.path[1:]
+    ids = parse_qs(parsed_url.query).get("v")
+    if parsed_url.netloc in ("youtube.com", "www.youtube.com") and ids:
+        return ids[0]
+    return hashlib.sha1(url.encode()).hexdigest()[:16]
+
+class DownloadManager:
+    """
+    Download videos on a bounded pool of threads under a shared budget.
+
+    At most max_workers videos download at once, and the fragment
+    concurrency and bandwidth budgets are split evenly between them.
+    Partial files are resumed, failed downloads are retried with
+    exponential backoff, and videos already recorded in the registry of
+    the output directory are skipped.
+    """
+
+    def __init__(self, output_dir, max_workers=4, max_fragments=8, rate_limit=None, retries=3, backoff=2.0,
+                 logger=None, ydl_class=None):
+        """
+        Args:
+            output_dir (str): The directory to save the videos to.
+            max_workers (int): Videos downloaded at the same time.
+            max_fragments (int): Fragments downloaded at the same time across all videos.
+            rate_limit (int): Total download rate in bytes per second, None for no limit.
+            retries (int): Attempts after the first one before a download is given up.
+            backoff (float): Seconds waited before the first retry, doubled on each further retry.
+            logger (logging.Logger): The logger to use for logging.
+            ydl_class (type): Replacement for yt_dlp.YoutubeDL, e.g. a stub in tests.
+        """
+        if ydl_class is None:
+            import yt_dlp
+            ydl_class = yt_dlp.YoutubeDL
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.fragments_per_download = max(1, max_fragments // max_workers)
+        self.rate_per_download = rate_limit // max_workers if rate_limit else None
+        self.retries = retries
+        self.backoff = backoff
+        self.logger = logger
+        self.ydl_class = ydl_class
+
+        self._registry_path = os.path.join(output_dir, REGISTRY_NAME)
+        self._registry = self._load_registry()
+        self._lock = threading.Lock()
+
+    def _load_registry(self):
+        try:
+            with open(self._registry_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, key, url, path):
+        with self._lock:
+            self._registry[key] = {"url": url, "filename": os.path.basename(path), "size": os.path.getsize(path)}
+            temp_path = self._registry_path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self._registry, f, indent=2)
+            os.replace(temp_path, self._registry_path)
+
+    def downloaded_path(self, url):
+        """
+        Get where a URL was already downloaded to, or None if it was not, or its file changed.
+        """
+        with self._lock:
+            entry = self._registry.get(video_id(url))
+        if entry is None:
+            return None
+        path = os.path.join(self.output_dir, entry["filename"])
+        if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+            return None
+        return path
+
+    def download(self, url, filename):
+        """
+        Download one video, retrying with backoff.
+
+        Returns:
+            str: The path of the video, or None if every attempt failed.
+        """
+        # Retrying would not make an invalid URL valid
+        if not is_valid_youtube_url(url):
+            if self.logger:
+                self.logger.error(f"Invalid YouTube URL: {url}")
+            return None
+
+        existing = self.downloaded_path(url)
+        if existing is not None:
+            if self.logger:
+                self.logger.info(f"Already downloaded {url} to {existing}, skipping")
+            return existing
+
+        path = os.path.join(self.output_dir, filename)
+        ydl_opts = build_ydl_options(self.output_dir, filename, concurrent_fragments=self.fragments_per_download,
+                                     threads=self.fragments_per_download, ratelimit=self.rate_per_download)
+
+        for attempt in range(self.retries + 1):
+            try:
+                with self.ydl_class(ydl_opts) as ydl:
+                    if self.logger:
+                        self.logger.info(f"Downloading video from: {url}")
+                    ydl.download([url])
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"{path} was not written")
+                self._record(video_id(url), url, path)
+                if self.logger:
+                    self.logger.info(f"Video downloaded successfully to: {path}")
+                return path
+            except Exception as err:
+                if attempt == self.retries:
+                    if self.logger:
+                        self.logger.error(f"Error downloading video {url}: {err}")
+                    return None
+                # Jittered so failed downloads do not all retry at the same moment
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if self.logger:
+                    self.logger.warning(f"Download of {url} failed ({err}), retrying in {delay:.1f} seconds")
+                time.sleep(delay)
+
+    def download_all(self, jobs, on_complete=None):
+        """
+        Download every job on the worker pool.
+
+        Args:
+            jobs (list): (url, filename) tuples.
+            on_complete (callable): Called with the path of each video as soon as it is available.
+
+        Returns:
+            list: The path of each job's video, None for failed downloads, in job order.
+        """
+        def run(url, filename):
+            path = self.download(url, filename)
+            if path is not None and on_complete is not None:
+                on_complete(path)
+            return path
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(run, url, filename) for url, filename in jobs]
+            return [future.result() for future in futures]
+
+    def stream(self, jobs):
+        """
+        Download every job in the background and yield each video as soon as it is available.
+
+        Videos are yielded in completion order, so the caller can start
+        processing the first one while the others are still downloading.
+
+        Args:
+            jobs (list): (url, filename) tuples.
+
+        Yields:
+            str: The path of each downloaded video, failed downloads are left out.
+        """
+        finished = queue.Queue()
+
+        def run():
+            try:
+                self.download_all(jobs, on_complete=finished.put)
+            finally:
+                finished.put(None)
+
+        threading.Thread(target=run, daemon=True).start()
+        while True:
+            path = finished.get()
+            if path is None:
+                return
+            yield path
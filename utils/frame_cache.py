@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+from uuid import uuid4
+import numpy as np
+from utils.frame_reader import sample_frames
+
+INDEX_NAME = "index.json"
+FRAMES_NAME = "frames.bin"
+
+# Bytes hashed from each end of a video to fingerprint it
+FINGERPRINT_CHUNK = 1 << 20
+
+def fingerprint_video(video_path):
+    """
+    Fingerprint a video from its size and the bytes at its start and end.
+
+    Hashing the ends instead of the whole file keeps lookups cheap while
+    still catching replaced or re-encoded videos.
+
+    Args:
+        video_path (str): The path to the video file.
+
+    Returns:
+        str: Hex digest of the fingerprint.
+    """
+    size = os.path.getsize(video_path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(video_path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK:
+            f.seek(max(size - FINGERPRINT_CHUNK, FINGERPRINT_CHUNK))
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return digest.hexdigest()
+
+class FrameCache:
+    """
+    On-disk cache of sampled, resized frames, read back as memory-mapped arrays.
+
+    Each entry is one raw uint8 file holding every sampled frame of a video,
+    plus a JSON index with the frame shape and indices. Entries are keyed by
+    the video fingerprint, the sampling stride and offset, and the target
+    size. When the cache grows past max_bytes, the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=20 * (1 << 30), logger=None):
+        """
+        Args:
+            cache_dir (str): The directory holding the cache entries.
+            max_bytes (int): Size the cache is trimmed to after every new entry.
+            logger (logging.Logger): The logger to use for logging.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.logger = logger
+
+    def key(self, video_path, stride, offset, resize):
+        """
+        Get the cache key of a video sampled with the given parameters.
+        """
+        size = f"{resize[0]}x{resize[1]}" if resize else "native"
+        return f"{fingerprint_video(video_path)}_s{stride}_o{offset}_{size}"
+
+    def load(self, key):
+        """
+        Open a cache entry.
+
+        Returns:
+            tuple: (frame_indices, frames) with frames a read-only memmap, or None on a miss.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        index_path = os.path.join(entry_dir, INDEX_NAME)
+        if not os.path.exists(index_path):
+            return None
+
+        with open(index_path, "r") as f:
+            index = json.load(f)
+
+        frame_indices = index["frame_indices"]
+        if not frame_indices:
+            frames = np.empty([0] + index["shape"], dtype=np.uint8)
+        else:
+            frames = np.memmap(os.path.join(entry_dir, FRAMES_NAME), dtype=np.uint8, mode="r",
+                               shape=tuple([len(frame_indices)] + index["shape"]))
+
+        # Record the access for LRU eviction
+        os.utime(index_path)
+        return frame_indices, frames
+
+    def sample_frames(self, video_path, stride=1, offset=0, resize=None, start=0, stop=None):
+        """
+        Yield sampled frames from the cache, decoding and caching them on a miss.
+
+        Frames read from the cache are read-only views, copy them before drawing on them.
+        Partial reads (start/stop) use an existing entry but never create one, see fill.
+
+        Args:
+            video_path (str): The path to the video file.
+            stride (int): Keep every stride-th frame.
+            offset (int): Index of the first frame to keep.
+            resize (tuple): Optional (width, height) applied to kept frames.
+            start (int): Index of the first frame to consider.
+            stop (int): Index one past the last frame to consider.
+
+        Yields:
+            tuple: (frame_index, frame)
+        """
+        key = self.key(video_path, stride, offset, resize)
+        cached = self.load(key)
+        if cached is not None:
+            frame_indices, frames = cached
+            for position, frame_index in enumerate(frame_indices):
+                if frame_index < start or (stop is not None and frame_index >= stop):
+                    continue
+                yield frame_index, frames[position]
+            return
+
+        frames = sample_frames(video_path, stride=stride, offset=offset, resize=resize, start=start, stop=stop)
+        if start or stop is not None:
+            yield from frames
+            return
+
+        yield from self._write_through(key, frames)
+
+    def contains(self, video_path, stride=1, offset=0, resize=None):
+        """
+        Check whether a video sampled with the given parameters is cached.
+        """
+        return os.path.exists(os.path.join(self.cache_dir, self.key(video_path, stride, offset, resize), INDEX_NAME))
+
+    def fill(self, video_path, stride=1, offset=0, resize=None):
+        """
+        Decode and cache a whole video unless it is cached already, so partial reads can slice it.
+
+        Returns:
+            bool: Whether the entry is cached now.
+        """
+        if not self.contains(video_path, stride, offset, resize):
+            key = self.key(video_path, stride, offset, resize)
+            for _ in self._write_through(key, sample_frames(video_path, stride=stride, offset=offset,
+                                                             resize=resize)):
+                pass
+        return self.contains(video_path, stride, offset, resize)
+
+    def _write_through(self, key, frames):
+        """
+        Yield frames while appending them to a new cache entry.
+        """
+        tmp_dir = os.path.join(self.cache_dir, f".tmp_{key}_{uuid4().hex}")
+        os.makedirs(tmp_dir)
+        frame_indices = []
+        shape = None
+        complete = False
+        try:
+            with open(os.path.join(tmp_dir, FRAMES_NAME), "wb") as f:
+                for frame_index, frame in frames:
+                    if shape is None:
+                        shape = list(frame.shape)
+                    elif list(frame.shape) != shape:
+                        # Frames of varying size cannot share one array, stop caching
+                        shape = None
+                        yield frame_index, frame
+                        yield from frames
+                        return
+                    f.write(np.ascontiguousarray(frame).tobytes())
+                    frame_indices.append(frame_index)
+                    yield frame_index, frame
+
+            with open(os.path.join(tmp_dir, INDEX_NAME), "w") as f:
+                json.dump({"shape": shape or [0, 0, 3], "frame_indices": frame_indices}, f)
+            complete = True
+        finally:
+            entry_dir = os.path.join(self.cache_dir, key)
+            if complete and not os.path.exists(entry_dir):
+                try:
+                    os.rename(tmp_dir, entry_dir)
+                except OSError:
+                    # Another process cached the same video first
+                    pass
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if complete:
+            self.evict()
+
+    def entries(self):
+        """
+        List the cache entries as (last_access, size, path), oldest first.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            index_path = os.path.join(entry_dir, INDEX_NAME)
+            if name.startswith(".") or not os.path.exists(index_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+            entries.append((os.path.getmtime(index_path), size, entry_dir))
+        return sorted(entries)
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            if self.logger:
+                self.logger.info(f"Evicted frame cache entry {entry_dir}")
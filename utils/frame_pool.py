@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+
+def current_rss():
+    """
+    Get the resident set size of this process in bytes.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current RSS, in kilobytes on Linux
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class FramePool:
+    """
+    Reusable frame buffers that video decoders write into instead of allocating per frame.
+
+    Buffers are kept per shape. A released buffer is handed out again by
+    the next acquire of its shape, so a steady pipeline stops allocating
+    after its first frames. At most max_free_bytes of released buffers
+    are kept, the rest are left to the garbage collector, e.g. after the
+    resolution changes between videos.
+    """
+
+    def __init__(self, max_free_bytes=512 * (1 << 20)):
+        """
+        Args:
+            max_free_bytes (int): Bytes of released buffers kept for reuse.
+        """
+        self.max_free_bytes = max_free_bytes
+        self._free = defaultdict(list)
+        self._free_bytes = 0
+        self._lock = threading.Lock()
+        self._allocated = 0
+        self._reused = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        """
+        Get a buffer of a shape, reused if one is free. Its contents are undefined.
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free[key]
+            if free:
+                buffer = free.pop()
+                self._free_bytes -= buffer.nbytes
+                self._reused += 1
+                return buffer
+            self._allocated += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer):
+        """
+        Return a buffer to the pool. Nothing may use it afterwards.
+        """
+        with self._lock:
+            if self._free_bytes + buffer.nbytes > self.max_free_bytes:
+                return
+            self._free[(buffer.shape, buffer.dtype.str)].append(buffer)
+            self._free_bytes += buffer.nbytes
+
+    def release_fn(self, buffer):
+        """
+        Build a callback returning a buffer to the pool, e.g. for FrameItem.release.
+        """
+        return lambda: self.release(buffer)
+
+    def stats(self):
+        """
+        Get how many buffers were allocated and reused, and the bytes kept free.
+        """
+        with self._lock:
+            return {"allocated": self._allocated, "reused": self._reused, "free_bytes": self._free_bytes}
+
+class RssBudget:
+    """
+    Throttle a producer while the process uses more memory than its budget.
+
+    wait() blocks while the resident set size is over the budget, polling
+    every interval seconds. A producer only waits while its consumer still
+    has queued work that will free memory; once nothing is left to drain,
+    waiting longer would not lower the RSS, so it goes on.
+    """
+
+    def __init__(self, max_rss_bytes, interval=0.01, check_every=8):
+        """
+        Args:
+            max_rss_bytes (int): The budget for the resident set size of the process.
+            interval (float): Seconds between checks while over budget.
+            check_every (int): Read the RSS on every check_every-th call only, it is not free.
+        """
+        self.max_rss_bytes = max_rss_bytes
+        self.interval = interval
+        self.check_every = check_every
+        self._calls = 0
+        self.throttled_seconds = 0.0
+
+    def wait(self, pending=None):
+        """
+        Block while over budget.
+
+        Args:
+            pending (callable): Returns the number of items the consumer has yet to process.
+        """
+        self._calls += 1
+        if self._calls % self.check_every:
+            return
+        start = None
+        while current_rss() > self.max_rss_bytes and (pending is None or pending() > 0):
+            start = start or time.perf_counter()
+            time.sleep(self.interval)
+        if start is not None:
+            self.throttled_seconds += time.perf_counter() - start
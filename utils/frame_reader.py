@@ -0,0 +1,207 @@
+import bisect
+import cv2
+import numpy as np
+
+# Property only exposed by newer OpenCV builds (FFmpeg backend, raw stream mode)
+CAP_PROP_LRF_HAS_KEY_FRAME = getattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME", 67)
+
+def get_video_properties(cap):
+    """
+    Read the basic properties of an opened video.
+
+    Args:
+        cap (cv2.VideoCapture): An opened video capture.
+
+    Returns:
+        tuple: (fps, frame_count, width, height)
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    return fps, frame_count, width, height
+
+def find_keyframes(video_path):
+    """
+    Find the indices of the keyframes in a video without decoding it.
+
+    The video is opened in raw stream mode so grab() only demuxes packets.
+
+    Args:
+        video_path (str): The path to the video file.
+
+    Returns:
+        list: Keyframe indices, or an empty list if the backend cannot report them.
+    """
+    try:
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    except (cv2.error, TypeError):
+        return []
+
+    keyframes = []
+    frame_index = 0
+    try:
+        while cap.isOpened() and cap.grab():
+            if cap.get(CAP_PROP_LRF_HAS_KEY_FRAME) > 0:
+                keyframes.append(frame_index)
+            frame_index += 1
+    finally:
+        cap.release()
+
+    return keyframes
+
+def _wanted_by_stride(stride, offset):
+    """
+    Build a predicate selecting every stride-th frame starting at offset.
+    """
+    def wanted(frame_index):
+        return frame_index >= offset and (frame_index - offset) % stride == 0
+    return wanted
+
+def _wanted_by_fps(native_fps, target_fps):
+    """
+    Build a predicate selecting frames so the output runs at target_fps.
+    """
+    state = {"next_time": 0.0}
+    interval = 1.0 / target_fps
+
+    def wanted(frame_index):
+        timestamp = frame_index / native_fps
+        if timestamp + 1e-9 >= state["next_time"]:
+            state["next_time"] += interval
+            # Catch up if the source fps is lower than the target
+            while state["next_time"] <= timestamp:
+                state["next_time"] += interval
+            return True
+        return False
+    return wanted
+
+def _next_wanted(frame_index, stride, offset):
+    """
+    Return the next frame index at or after frame_index selected by the stride.
+    """
+    if frame_index <= offset:
+        return offset
+    remainder = (frame_index - offset) % stride
+    return frame_index if remainder == 0 else frame_index + stride - remainder
+
+def sample_frames(video_path, stride=1, offset=0, target_fps=None,
+                  keyframes_only=False, resize=None, seek_threshold=None,
+                  start=0, stop=None, stride_fn=None, frame_pool=None):
+    """
+    Yield sampled frames from a video without decoding the skipped ones in full.
+
+    Skipped frames are advanced with grab(), which leaves out the colour
+    conversion and the frame copy that read() pays for. With seek_threshold
+    set, gaps of at least that many frames are jumped over with a seek instead.
+    With a frame_pool, kept frames are decoded (or resized) straight into
+    reused buffers, and the caller hands each one back with frame_pool.release().
+
+    Args:
+        video_path (str): The path to the video file.
+        stride (int): Keep every stride-th frame.
+        offset (int): Index of the first frame to keep when sampling by stride.
+        target_fps (float): Keep frames at this rate instead of by stride.
+        keyframes_only (bool): Keep only the keyframes of the video.
+        resize (tuple): Optional (width, height) applied to kept frames only.
+        seek_threshold (int): Minimum gap in frames for seeking instead of grabbing.
+        start (int): Index of the first frame to consider, reached by seeking.
+        stop (int): Index one past the last frame to consider.
+        stride_fn (callable): Called after every kept frame for the stride to the next one,
+            overrides stride so callers can adapt the sampling rate while reading.
+        frame_pool (FramePool): Pool to take the frame buffers from instead of allocating them.
+
+    Yields:
+        tuple: (frame_index, frame)
+    """
+    if stride < 1:
+        raise ValueError(f"stride must be >= 1, got {stride}")
+
+    keyframes = None
+    if keyframes_only:
+        keyframes = find_keyframes(video_path)
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps, frame_count, width, height = get_video_properties(cap)
+        # Kept frames are decoded into pooled buffers, or into one reused buffer when they are resized
+        pooled = frame_pool is not None and width > 0 and height > 0
+        decode_buffer = np.empty((height, width, 3), dtype=np.uint8) if pooled and resize is not None else None
+
+        if keyframes_only:
+            if keyframes:
+                keyframe_set = set(keyframes)
+                wanted = keyframe_set.__contains__
+            else:
+                # Backend cannot report keyframes, fall back to one frame per second
+                wanted = _wanted_by_stride(max(1, int(round(fps or 1))), 0)
+        elif target_fps:
+            if fps <= 0:
+                raise ValueError(f"Cannot sample by fps, unknown frame rate for {video_path}")
+            wanted = _wanted_by_fps(fps, target_fps)
+        elif stride_fn is not None:
+            state = {"next": max(offset, start)}
+            wanted = lambda frame_index: frame_index == state["next"]
+        else:
+            wanted = _wanted_by_stride(stride, offset)
+
+        # Seeking only makes sense when the next wanted frame is known up front
+        can_seek = (seek_threshold is not None and not target_fps
+                    and (not keyframes_only or keyframes))
+
+        frame_index = 0
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            frame_index = start
+
+        while cap.isOpened():
+            if stop is not None and frame_index >= stop:
+                break
+
+            if can_seek:
+                if keyframes_only:
+                    position = bisect.bisect_left(keyframes, frame_index)
+                    if position == len(keyframes):
+                        break
+                    target = keyframes[position]
+                elif stride_fn is not None:
+                    target = state["next"]
+                else:
+                    target = _next_wanted(frame_index, stride, offset)
+
+                if frame_count and target >= frame_count:
+                    break
+                if stop is not None and target >= stop:
+                    break
+                if target - frame_index >= seek_threshold:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    frame_index = target
+
+            if not cap.grab():
+                break
+
+            if wanted(frame_index):
+                if not pooled:
+                    ret, frame = cap.retrieve()
+                    if ret and resize is not None:
+                        frame = cv2.resize(frame, resize)
+                elif resize is None:
+                    buffer = frame_pool.acquire((height, width, 3))
+                    ret, frame = cap.retrieve(buffer)
+                    if frame is not buffer:
+                        # The backend returned a frame of another shape, the buffer was not used
+                        frame_pool.release(buffer)
+                else:
+                    ret, frame = cap.retrieve(decode_buffer)
+                    if ret:
+                        frame = cv2.resize(frame, resize,
+                                           dst=frame_pool.acquire((resize[1], resize[0]) + frame.shape[2:]))
+                if not ret:
+                    break
+                yield frame_index, frame
+                if stride_fn is not None:
+                    state["next"] = frame_index + max(1, int(stride_fn()))
+
+            frame_index += 1
+    finally:
+        cap.release()
@@ -0,0 +1,233 @@
+import glob
+import json
+import os
+import random
+import re
+from multiprocessing import Pool, cpu_count
+from utils.dataset_creator import convert_to_training_frames, default_augmenter, FRAME_SAVE_INTERVAL
+from utils.decode_pool import build_decode_tasks
+from utils.frame_cache import fingerprint_video
+from utils.packed_dataset import PACKED_DIR
+from utils.parallel_dataset import MANIFEST_NAME
+
+BUILD_DIR = "build"
+BUILD_NAME = "build.json"
+
+# Bump when convert_to_training_frames changes what it writes, so older outputs are rebuilt
+GENERATOR_VERSION = 2
+
+def generation_params(output_format, augmenter=None):
+    """
+    Get the parameters that decide what a video is converted to.
+    """
+    # Round-tripped through JSON so it compares equal to the stored state
+    augmentations = json.loads(json.dumps((augmenter or default_augmenter).describe()))
+    return {"version": GENERATOR_VERSION, "frame_interval": FRAME_SAVE_INTERVAL, "output_format": output_format,
+            "augmentations": augmentations}
+
+def _video_name(video_path):
+    # Same naming as convert_to_training_frames
+    return video_path.split("/")[-1].replace(".mp4", "")
+
+def _state_path(output_dir, video_name):
+    return os.path.join(output_dir, BUILD_DIR, f"{video_name}.json")
+
+def _write_json(path, data):
+    # Written to a temporary file first, so a crash never leaves a truncated state behind
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+def load_state(output_dir, video_name):
+    """
+    Get the build state of a video, or None if it was never built.
+    """
+    try:
+        with open(_state_path(output_dir, video_name), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _remove_chunk(output_dir, video_name, start=None):
+    """
+    Remove the packed shards and index written for one chunk of a video, or for all its chunks without a start.
+    """
+    chunk = f"{start:08d}" if start is not None else r"\d{8}"
+    pattern = re.compile(re.escape(video_name) + "_" + chunk + r"(_\d{5}\.bin|\.npz)")
+    for split_dir in glob.glob(os.path.join(output_dir, PACKED_DIR, "*")):
+        for name in os.listdir(split_dir):
+            if pattern.fullmatch(name):
+                os.remove(os.path.join(split_dir, name))
+
+def _remove_frames(output_dir, video_name, start=0, stop=None):
+    """
+    Remove the image, label and array files of the frames of a video in [start, stop), listed in a state or not.
+    """
+    pattern = re.compile(re.escape(video_name) + r"_frame_(\d+)\.\w+")
+    split_dirs = glob.glob(os.path.join(output_dir, "images", "*")) + glob.glob(os.path.join(output_dir, "labels", "*"))
+    for split_dir in split_dirs:
+        for name in os.listdir(split_dir):
+            match = pattern.fullmatch(name)
+            if match and int(match.group(1)) >= start and (stop is None or int(match.group(1)) < stop):
+                os.remove(os.path.join(split_dir, name))
+
+def prune_outputs(output_dir, state):
+    """
+    Remove every file produced for a video, according to its build state.
+
+    Returns:
+        int: Number of records whose outputs were removed.
+    """
+    # A chunk interrupted before its checkpoint may have written part of its outputs
+    converting = state.get("converting")
+    if state["params"]["output_format"] == "packed":
+        for start in state["chunks"] + ([converting[0]] if converting else []):
+            _remove_chunk(output_dir, state["video"], start)
+    else:
+        if converting:
+            _remove_frames(output_dir, state["video"], *converting)
+        for record in state["records"]:
+            for path in (record["image"], record["label"]):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            # Arrays saved for the disk cache, by the dataset stage or by ultralytics
+            array_path = os.path.splitext(record["image"])[0] + ".npy"
+            if os.path.exists(array_path):
+                os.remove(array_path)
+    return len(state["records"])
+
+def _build_video(video_path, output_dir, seed, chunk_frames, frame_cache, output_format, augmenter, save_arrays,
+                 logger):
+    """
+    Worker: bring the outputs of one video up to date, checkpointing after every chunk.
+
+    Returns:
+        list: The records of the video.
+    """
+    video_name = _video_name(video_path)
+    params = generation_params(output_format, augmenter)
+    fingerprint = fingerprint_video(video_path)
+
+    state = load_state(output_dir, video_name)
+    if state is not None and (state["fingerprint"] != fingerprint or state["params"] != params
+                              or state["seed"] != seed):
+        removed = prune_outputs(output_dir, state)
+        logger.info(f"{video_name} changed since the last build, removed {removed} stale frames")
+        state = None
+
+    if state is not None and state["complete"]:
+        logger.info(f"{video_name} is up to date, skipping")
+        return state["records"]
+
+    if state is None:
+        state = {"video": video_name, "path": video_path, "fingerprint": fingerprint, "params": params,
+                 "seed": seed, "next_frame": 0, "chunks": [], "records": [], "complete": False,
+                 "converting": None}
+    elif state["next_frame"]:
+        logger.info(f"Resuming {video_name} at frame {state['next_frame']}")
+
+    # Chunks are partial reads, which only use a cache entry, so the whole video is cached up front
+    if frame_cache is not None:
+        size = ((augmenter or default_augmenter).width, (augmenter or default_augmenter).height)
+        if not frame_cache.fill(video_path, stride=params["frame_interval"], resize=size):
+            logger.warning(f"Could not cache the frames of {video_name}, decoding them per chunk")
+
+    for _, start, stop in build_decode_tasks([video_path], chunk_frames):
+        if stop is not None and stop <= state["next_frame"]:
+            continue
+        # next_frame only moves past completed chunks, an interrupted one is redone whole
+        start = max(start, state["next_frame"])
+        if output_format == "packed":
+            _remove_chunk(output_dir, video_name, start)
+        state["converting"] = [start, stop]
+        _write_json(_state_path(output_dir, video_name), state)
+
+        records = convert_to_training_frames(video_path, output_dir, logger, seed=seed, start=start, stop=stop,
+                                             frame_cache=frame_cache, output_format=output_format,
+                                             raise_errors=True, augmenter=augmenter, save_arrays=save_arrays)
+        state["records"].extend(records)
+        state["chunks"].append(start)
+        state["next_frame"] = stop if stop is not None else state["next_frame"]
+        state["complete"] = stop is None
+        state["converting"] = None
+        _write_json(_state_path(output_dir, video_name), state)
+
+    return state["records"]
+
+def build_dataset_incremental(video_paths, output_dir, logger, num_workers=None, seed=None, chunk_frames=1000,
+                              frame_cache=None, output_format="files", augmenter=None,
+                              save_arrays=False):
+    """
+    Convert videos to a training dataset, redoing only what changed since the last build.
+
+    A build state per video records its fingerprint, the generation
+    parameters, the seed and the files produced. Unchanged videos are
+    skipped, interrupted ones resume at their last completed chunk, and
+    videos that changed or were removed have their old outputs pruned.
+    Augmentations are seeded per block of frames at fixed positions in
+    each video, so resumed videos come out the same as if they had been
+    built in one go.
+
+    Args:
+        video_paths (list): Paths of the videos to convert.
+        output_dir (str): The directory to save the dataset to.
+        logger (logging.Logger): The logger to use for logging.
+        num_workers (int): Number of processes, defaults to the CPU count, 1 builds serially.
+        seed (int): Seed for the augmentations, defaults to the seed of the last build.
+        chunk_frames (int): Frames converted between two checkpoints of a video.
+        frame_cache (FrameCache): Optional cache to read the resized frames through.
+        output_format (str): "files" or "packed", see convert_to_training_frames.
+        augmenter (AugmentationEngine): The augmentations to apply, see convert_to_training_frames.
+        save_arrays (bool): Also save the frames as .npy arrays, see convert_to_training_frames.
+
+    Returns:
+        str: The path of the manifest of the whole dataset.
+    """
+    os.makedirs(os.path.join(output_dir, BUILD_DIR), exist_ok=True)
+    build_path = os.path.join(output_dir, BUILD_DIR, BUILD_NAME)
+
+    # Keeping the previous seed is what lets unchanged videos be skipped
+    if seed is None:
+        try:
+            with open(build_path, "r") as f:
+                seed = json.load(f)["seed"]
+        except (OSError, ValueError, KeyError):
+            seed = random.randrange(2 ** 32)
+        logger.info(f"Using dataset seed {seed}")
+    _write_json(build_path, {"seed": seed})
+
+    # Videos that are gone take their outputs with them
+    current = {_video_name(video_path) for video_path in video_paths}
+    for state_path in glob.glob(os.path.join(output_dir, BUILD_DIR, "*.json")):
+        video_name = os.path.basename(state_path)[:-len(".json")]
+        if state_path == build_path or video_name in current:
+            continue
+        state = load_state(output_dir, video_name)
+        if state is not None:
+            removed = prune_outputs(output_dir, state)
+            logger.info(f"{video_name} was removed, pruned {removed} frames")
+        # Also whatever carries its name without being in the state, e.g. from a build that crashed
+        _remove_chunk(output_dir, video_name)
+        _remove_frames(output_dir, video_name)
+        os.remove(state_path)
+
+    args = [(video_path, output_dir, seed, chunk_frames, frame_cache, output_format, augmenter, save_arrays,
+             logger)
+            for video_path in video_paths]
+    num_workers = min(num_workers or cpu_count(), len(args)) or 1
+    if num_workers == 1:
+        video_records = [_build_video(*task) for task in args]
+    else:
+        with Pool(processes=num_workers) as pool:
+            video_records = pool.starmap(_build_video, args)
+
+    records = [record for video in video_records for record in video]
+    records.sort(key=lambda record: (record["video"], record["frame_index"]))
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(manifest_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+    logger.info(f"Dataset manifest written to {manifest_path}")
+    return manifest_path
@@ -0,0 +1,185 @@
+import os
+import shutil
+import time
+from utils.postprocess import to_numpy
+from utils.tracker import iou_matrix
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+
+def exported_path(weights, backend, int8=False):
+    """
+    Get where the export of a .pt checkpoint for a backend lives.
+    """
+    stem, _ = os.path.splitext(weights)
+    if backend == "pytorch":
+        return weights
+    if backend == "onnx":
+        return f"{stem}_int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    raise ValueError(f"Unsupported inference backend: {backend}")
+
+def export_model(weights, backend, imgsz=640, int8=False, data=None, logger=None):
+    """
+    Export trained weights for a CPU inference backend.
+
+    ONNX models are exported with dynamic batch size, and INT8 is applied
+    with ONNX Runtime dynamic quantization. OpenVINO INT8 is calibrated by
+    ultralytics and needs a dataset yaml.
+
+    Args:
+        weights (str): Path of the .pt checkpoint.
+        backend (str): One of "pytorch", "onnx" or "openvino".
+        imgsz (int): Inference image size baked into the export.
+        int8 (bool): Quantize weights to INT8.
+        data (str): Dataset yaml for OpenVINO INT8 calibration.
+        logger (logging.Logger): The logger to use for logging.
+
+    Returns:
+        str: Path of the exported model.
+    """
+    if backend == "pytorch":
+        return weights
+
+    from ultralytics import YOLO
+
+    target = exported_path(weights, backend, int8)
+    model = YOLO(weights)
+
+    if backend == "onnx":
+        path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(path, target, weight_type=QuantType.QInt8)
+            path = target
+    elif backend == "openvino":
+        path = model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=int8, data=data)
+        if path != target:
+            # A directory is only replaced by os.replace when it is empty, e.g. not on a re-export
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(path, target)
+            path = target
+    else:
+        raise ValueError(f"Unsupported inference backend: {backend}")
+
+    if logger:
+        logger.info(f"Exported {weights} for {backend} to {path}")
+    return path
+
+class InferenceBackend:
+    """
+    A detector behind one of the supported runtimes.
+
+    All backends run through ultralytics' AutoBackend, so pre-processing,
+    NMS and the Results objects are the same whichever runtime executes the
+    network. Calling the backend matches calling a YOLO model.
+    """
+
+    def __init__(self, weights, backend="pytorch", int8=False, imgsz=640, data=None, logger=None):
+        """
+        Args:
+            weights (str): Path of the .pt checkpoint, or of an already exported model.
+            backend (str): One of "pytorch", "onnx" or "openvino".
+            int8 (bool): Use the INT8 quantized export.
+            imgsz (int): Inference image size.
+            data (str): Dataset yaml for OpenVINO INT8 calibration.
+            logger (logging.Logger): The logger to use for logging.
+        """
+        from ultralytics import YOLO
+
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported inference backend: {backend}")
+
+        path = weights
+        if weights.endswith(".pt") and backend != "pytorch":
+            # Export on first use, reuse the export afterwards
+            path = exported_path(weights, backend, int8)
+            if not os.path.exists(path):
+                path = export_model(weights, backend, imgsz=imgsz, int8=int8, data=data, logger=logger)
+
+        self.backend = backend
+        self.path = path
+        self.imgsz = imgsz
+        self.model = YOLO(path, task="detect")
+
+    def __call__(self, frames, imgsz=None, **kwargs):
+        return self.model(frames, imgsz=imgsz or self.imgsz, verbose=False, **kwargs)
+
+def check_parity(reference, candidate, frames, iou_threshold=0.9, conf_tolerance=0.05, min_conf=0.25):
+    """
+    Check that two backends find the same boxes on the same frames.
+
+    Args:
+        reference (InferenceBackend): The backend taken as ground truth, usually PyTorch.
+        candidate (InferenceBackend): The backend to check.
+        frames (list): Frames to run both backends on.
+        iou_threshold (float): Minimum IoU for two boxes to count as the same detection.
+        conf_tolerance (float): Largest allowed confidence difference between matched boxes.
+        min_conf (float): Ignore boxes below this confidence in both backends.
+
+    Returns:
+        dict: Match ratio, largest confidence difference, timings and an overall "ok".
+    """
+    start = time.perf_counter()
+    reference_results = reference(frames)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate_results = candidate(frames)
+    candidate_time = time.perf_counter() - start
+
+    matched, total, max_conf_diff = 0, 0, 0.0
+    for ref, cand in zip(reference_results, candidate_results):
+        ref_boxes, ref_confs = to_numpy(ref.boxes.xyxy), to_numpy(ref.boxes.conf)
+        cand_boxes, cand_confs = to_numpy(cand.boxes.xyxy), to_numpy(cand.boxes.conf)
+        ref_keep, cand_keep = ref_confs >= min_conf, cand_confs >= min_conf
+        ref_boxes, ref_confs = ref_boxes[ref_keep], ref_confs[ref_keep]
+        cand_boxes, cand_confs = cand_boxes[cand_keep], cand_confs[cand_keep]
+
+        total += max(len(ref_boxes), len(cand_boxes))
+        if not len(ref_boxes) or not len(cand_boxes):
+            continue
+
+        ious = iou_matrix(ref_boxes, cand_boxes)
+        best = ious.argmax(axis=1)
+        for r, c in enumerate(best):
+            if ious[r, c] >= iou_threshold:
+                matched += 1
+                max_conf_diff = max(max_conf_diff, abs(float(ref_confs[r]) - float(cand_confs[c])))
+
+    match_ratio = matched / total if total else 1.0
+    return {
+        "reference": reference.backend,
+        "candidate": candidate.backend,
+        "boxes": total,
+        "match_ratio": match_ratio,
+        "max_conf_diff": max_conf_diff,
+        "reference_sec": reference_time,
+        "candidate_sec": candidate_time,
+        "ok": match_ratio == 1.0 and max_conf_diff <= conf_tolerance,
+    }
+
+# Example usage: compare a backend against PyTorch on frames of a video
+if __name__ == '__main__':
+    import argparse
+    from utils.frame_reader import sample_frames
+    from utils.logger import setup_logger
+
+    parser = argparse.ArgumentParser(description="Check an inference backend against PyTorch")
+    parser.add_argument("--weights", default="yolo11n_trained.pt")
+    parser.add_argument("--backend", default="onnx", choices=BACKENDS)
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--frames", type=int, default=16)
+    args = parser.parse_args()
+
+    logger = setup_logger("inference_backend")
+    frames = []
+    for _, frame in sample_frames(args.video, stride=12):
+        frames.append(frame)
+        if len(frames) == args.frames:
+            break
+
+    reference = InferenceBackend(args.weights, "pytorch", logger=logger)
+    candidate = InferenceBackend(args.weights, args.backend, int8=args.int8, logger=logger)
+    logger.info(f"Parity with PyTorch: {check_parity(reference, candidate, frames)}")
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import deque
+import cv2
+from utils.batching import percentile
+
+def parse_source(source):
+    """
+    Turn a source string into something cv2.VideoCapture accepts.
+
+    Digit strings are device indices, "-" reads a stream piped to stdin,
+    anything else (files, RTSP/HTTP URLs) is passed through.
+    """
+    if isinstance(source, int):
+        return source
+    if source.isdigit():
+        return int(source)
+    if source == "-":
+        return "/dev/stdin"
+    return source
+
+def is_file_source(source):
+    """
+    Check whether a parsed source is a finished local file rather than a live stream.
+    """
+    return isinstance(source, str) and source != "/dev/stdin" and os.path.isfile(source)
+
+def iter_live_frames(source, stride=1, replay_native_fps=True, stop_event=None,
+                     reconnect_attempts=3, reconnect_delay=1.0, frame_pool=None, logger=None):
+    """
+    Yield frames from a live source as they arrive, stamped with their capture time.
+
+    Local files stand in for live sources: with replay_native_fps they are
+    paced at their own frame rate, so they behave like a camera.
+
+    Args:
+        source (str|int): File path, RTSP/HTTP URL, device index or "-" for stdin.
+        stride (int): Keep every stride-th frame, the others are only grabbed.
+        replay_native_fps (bool): Pace local files at their native frame rate.
+        stop_event (threading.Event): Stop reading once set.
+        reconnect_attempts (int): Times to reopen a live stream after it drops.
+        reconnect_delay (float): Seconds to wait before reopening.
+        frame_pool (FramePool): Pool to decode the frames into, the caller releases each frame to it.
+        logger (logging.Logger): The logger to use for logging.
+
+    Yields:
+        tuple: (frame_index, frame, captured_at) with captured_at from time.perf_counter().
+    """
+    source = parse_source(source)
+    replay = replay_native_fps and is_file_source(source)
+    stop_event = stop_event or threading.Event()
+
+    frame_index = 0
+    attempts = 0
+    while not stop_event.is_set():
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            cap.release()
+            if is_file_source(source) or attempts >= reconnect_attempts:
+                if logger:
+                    logger.error(f"Could not open live source {source}")
+                return
+            attempts += 1
+            time.sleep(reconnect_delay)
+            continue
+
+        interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        started_at = time.perf_counter()
+        replayed = 0
+        try:
+            while not stop_event.is_set():
+                if replay:
+                    # Wait until this frame would have arrived from a camera
+                    delay = started_at + replayed * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    replayed += 1
+
+                if not cap.grab():
+                    break
+                captured_at = time.perf_counter()
+
+                if frame_index % stride == 0:
+                    if frame_pool is not None and width > 0 and height > 0:
+                        buffer = frame_pool.acquire((height, width, 3))
+                        ret, frame = cap.retrieve(buffer)
+                        if frame is not buffer:
+                            frame_pool.release(buffer)
+                    else:
+                        ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    attempts = 0
+                    yield frame_index, frame, captured_at
+                frame_index += 1
+        finally:
+            cap.release()
+
+        # Files end for good, streams get a chance to reconnect
+        if is_file_source(source) or attempts >= reconnect_attempts:
+            return
+        attempts += 1
+        if logger:
+            logger.warning(f"Live source {source} dropped, reconnecting ({attempts}/{reconnect_attempts})")
+        time.sleep(reconnect_delay)
+
+class LatencyTracker:
+    """
+    Keep recent latencies and report their percentiles.
+    """
+
+    def __init__(self, history=4096):
+        self._samples = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def stats(self):
+        """
+        Get p50/p90/p99 latency in milliseconds.
+        """
+        with self._lock:
+            samples = list(self._samples)
+        return {
+            "count": len(samples),
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p90_ms": percentile(samples, 90) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
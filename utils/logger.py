@@ -1,50 +1,124 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
 
-def setup_logger(name, log_dir='logs'):
+# Pass as extra= on records logged once per frame, they are sampled instead of all written
+PER_FRAME = {"per_frame": True}
+
+_setup_lock = threading.Lock()
+
+class PerFrameSampler(logging.Filter):
+    """
+    Let through one of every `every` per-frame records of each message.
+
+    Records are counted per message template, so every kind of per-frame
+    message keeps showing up. Records without PER_FRAME are never dropped.
+    """
+
+    def __init__(self, every=100):
+        super().__init__()
+        self.every = every
+        self._counts = {}
+
+    def filter(self, record):
+        if not getattr(record, "per_frame", False):
+            return True
+        count = self._counts.get(record.msg, 0)
+        self._counts[record.msg] = count + 1
+        return count % self.every == 0
+
+class _ProcessAwareQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue records for the background writer, or write them directly in forked children.
+
+    Worker processes inherit the queue but not the thread that drains it,
+    so records logged there are handed to the handlers synchronously.
+    """
+
+    def __init__(self, record_queue, handlers):
+        super().__init__(record_queue)
+        self.handlers = handlers
+        self._pid = os.getpid()
+
+    def emit(self, record):
+        if os.getpid() == self._pid:
+            super().emit(record)
+            return
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+def setup_logger(name, log_dir='logs', asynchronous=True, per_frame_every=100):
     """
     Set up a logger with both file and console handlers
-    
+
+    Calling it again for the same name returns the already configured logger.
+
     Args:
         name (str): Name of the logger
         log_dir (str): Directory to store log files
-    
+        asynchronous (bool): Write records from a background thread so logging never blocks the caller
+        per_frame_every (int): Keep one of every this many records logged with extra=PER_FRAME, 1 keeps all
+
     Returns:
         logging.Logger: Configured logger instance
     """
     # Create logger
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    
-    # Create logs directory if it doesn't exist
-    os.makedirs(log_dir, exist_ok=True)
-    
-    # Create file handler
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = os.path.join(log_dir, f'{name}_{timestamp}.log')
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    
-    # Create formatters and add them to handlers
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_formatter = logging.Formatter(
-        '%(levelname)s: %(message)s'
-    )
-    
-    file_handler.setFormatter(file_formatter)
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    with _setup_lock:
+        if getattr(logger, "_configured", False):
+            return logger
+
+        logger.setLevel(logging.DEBUG)
+
+        # Create logs directory if it doesn't exist
+        os.makedirs(log_dir, exist_ok=True)
+
+        # Create file handler
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        log_file = os.path.join(log_dir, f'{name}_{timestamp}.log')
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setLevel(logging.DEBUG)
+
+        # Create console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+
+        # Create formatters and add them to handlers
+        file_formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        console_formatter = logging.Formatter(
+            '%(levelname)s: %(message)s'
+        )
+
+        file_handler.setFormatter(file_formatter)
+        console_handler.setFormatter(console_formatter)
+
+        # Sampled records are dropped before they are formatted or queued
+        if per_frame_every > 1:
+            logger.addFilter(PerFrameSampler(per_frame_every))
+
+        # Add handlers to logger
+        handlers = [file_handler, console_handler]
+        if asynchronous:
+            record_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(record_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            # Flush what is still queued when the interpreter exits
+            atexit.register(listener.stop)
+            logger.addHandler(_ProcessAwareQueueHandler(record_queue, handlers))
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
+
+        logger._configured = True
+
     return logger
 
 # Example usage
@@ -54,3 +128,5 @@ if __name__ == '__main__':
     logger.info('This is an info message')
     logger.warning('This is a warning message')
     logger.error('This is an error message')
+    for frame_index in range(250):
+        logger.debug('Processing frame %d', frame_index, extra=PER_FRAME)
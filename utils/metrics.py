@@ -0,0 +1,333 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram buckets in seconds, from sub-millisecond work up to slow inference batches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _label_text(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+def _series_name(name, labels):
+    return f"{name}{{{_label_text(labels)}}}" if labels else name
+
+class Counter:
+    """A value that only goes up, e.g. frames decoded"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+class Gauge:
+    """A value that goes up and down, either set directly or read from a callback"""
+
+    def __init__(self, fn=None):
+        self._value = 0
+        self.fn = fn
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        return self.fn() if self.fn is not None else self._value
+
+class Histogram:
+    """Distribution of observed values over fixed buckets, e.g. stage latencies"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def state(self):
+        """
+        Get a consistent copy of the bucket counts, sum and count.
+        """
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    def quantile(self, q):
+        """
+        Estimate the q-th quantile (0-1) as the upper bound of the bucket it falls in.
+        """
+        counts, _, count = self.state()
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class MetricsRegistry:
+    """
+    Named counters, gauges and histograms of the pipeline stages.
+
+    Metrics are created on first use and identified by name and labels, so
+    every stage can ask for its own without registering them up front.
+    Exports as Prometheus text or as a JSON snapshot.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help, labels, factory):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = factory()
+                    self._metrics[key] = metric
+                    self._help.setdefault(name, (kind, help))
+        return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get("counter", name, help, labels, Counter)
+
+    def gauge(self, name, help="", fn=None, **labels):
+        """
+        Get a gauge, fn is called on every export to read the current value, e.g. a queue size.
+        """
+        gauge = self._get("gauge", name, help, labels, lambda: Gauge(fn))
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get("histogram", name, help, labels, lambda: Histogram(buckets))
+
+    def _series(self):
+        with self._lock:
+            return sorted(self._metrics.items(), key=lambda item: item[0])
+
+    def render_prometheus(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        described = set()
+        for (name, labels), metric in self._series():
+            if name not in described:
+                kind, help = self._help[name]
+                if help:
+                    lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+            if isinstance(metric, Histogram):
+                counts, total, count = metric.state()
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{_series_name(name + '_bucket', labels + (('le', le),))} {cumulative}")
+                lines.append(f"{_series_name(name + '_sum', labels)} {total}")
+                lines.append(f"{_series_name(name + '_count', labels)} {count}")
+            else:
+                lines.append(f"{_series_name(name, labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Get the current value of every metric, histograms summarized by count, mean and percentiles.
+        """
+        snapshot = {"timestamp": time.time(), "counters": {}, "gauges": {}, "histograms": {}}
+        for (name, labels), metric in self._series():
+            series = _series_name(name, labels)
+            if isinstance(metric, Counter):
+                snapshot["counters"][series] = metric.value
+            elif isinstance(metric, Gauge):
+                snapshot["gauges"][series] = metric.value
+            else:
+                _, total, count = metric.state()
+                snapshot["histograms"][series] = {
+                    "count": count,
+                    "mean": total / count if count else 0.0,
+                    "p50": metric.quantile(0.5),
+                    "p99": metric.quantile(0.99),
+                }
+        return snapshot
+
+    def write_snapshot(self, path):
+        """
+        Write a JSON snapshot, replacing the previous one atomically.
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serve the Prometheus text format on http://host:port/metrics from a daemon thread.
+
+        Only local clients can connect by default, pass host="0.0.0.0" to let a remote scraper in.
+
+        Returns:
+            ThreadingHTTPServer: Call shutdown() on it to stop serving.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+class SnapshotWriter:
+    """
+    Write a JSON snapshot of a registry every few seconds from a daemon thread.
+    """
+
+    def __init__(self, registry, path, interval=10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.registry.write_snapshot(self.path)
+
+    def close(self):
+        """
+        Stop the thread and write a last snapshot.
+        """
+        self._stop.set()
+        self._thread.join()
+        self.registry.write_snapshot(self.path)
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._record(self.name, self.start, time.perf_counter())
+        return False
+
+class Tracer:
+    """
+    Per-stage spans in the Chrome trace event format, viewable in chrome://tracing or Perfetto.
+
+    While disabled, span() returns a shared no-op context manager, so the
+    instrumentation left in the pipeline costs one attribute check per span.
+    """
+
+    def __init__(self, max_events=1_000_000):
+        self.enabled = False
+        self.max_events = max_events
+        self._events = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self._origin = time.perf_counter()
+        self.enabled = True
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def _record(self, name, start, end):
+        event = {"name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                 "ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6}
+        with self._lock:
+            if len(self._events) < self.max_events:
+                self._events.append(event)
+
+    def dump(self, path):
+        """
+        Write the recorded spans as a Chrome trace JSON file.
+        """
+        with self._lock:
+            events = list(self._events)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events}, f)
+
+# Shared by every stage of the process
+metrics = MetricsRegistry()
+tracer = Tracer()
+
+class timed:
+    """
+    Time a block into the stage_seconds histogram of a stage, and as a span when tracing.
+
+    Usage:
+        with timed("inference"):
+            results = model(frames)
+    """
+    __slots__ = ("histogram", "span", "start")
+
+    def __init__(self, stage):
+        self.histogram = metrics.histogram("stage_seconds", "Time spent per call of a pipeline stage",
+                                           stage=stage)
+        self.span = tracer.span(stage)
+
+    def __enter__(self):
+        self.span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        self.span.__exit__(*exc)
+        return False
@@ -0,0 +1,96 @@
+import threading
+import cv2
+import numpy as np
+
+# Default change thresholds: mean absolute difference (0-1) and differing hash bits
+DEFAULT_THRESHOLDS = {"diff": 0.02, "phash": 6}
+
+def thumbnail(frame, size=(64, 36)):
+    """
+    Downscale a frame to a small grayscale image for cheap comparisons.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+def perceptual_hash(frame):
+    """
+    Compute a 64-bit DCT perceptual hash of a frame.
+
+    Returns:
+        numpy.ndarray: 64 booleans.
+    """
+    small = cv2.resize(thumbnail(frame), (32, 32), interpolation=cv2.INTER_AREA)
+    dct = cv2.dct(small.astype(np.float32))[:8, :8]
+    return (dct > np.median(dct)).ravel()
+
+class MotionGate:
+    """
+    Skip inference on frames that barely differ from the last inferred frame of their stream.
+
+    Frames are compared against the last frame that was let through, not the
+    previous frame, so slow changes still add up and trigger inference.
+    """
+
+    def __init__(self, mode="diff", threshold=None, max_skip=50):
+        """
+        Args:
+            mode (str): "diff" for downscaled frame differencing, "phash" for a perceptual hash.
+            threshold (float): Change needed to run inference, defaults per mode.
+            max_skip (int): Let a frame through after this many consecutive skips regardless.
+        """
+        if mode not in DEFAULT_THRESHOLDS:
+            raise ValueError(f"Unsupported motion gate mode: {mode}")
+        self.mode = mode
+        self.threshold = DEFAULT_THRESHOLDS[mode] if threshold is None else threshold
+        self.max_skip = max_skip
+        self._reference = {}
+        self._skipped_in_row = {}
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._skipped = 0
+
+    def _signature(self, frame):
+        return thumbnail(frame) if self.mode == "diff" else perceptual_hash(frame)
+
+    def _change(self, reference, signature):
+        if self.mode == "diff":
+            return float(cv2.absdiff(reference, signature).mean()) / 255
+        return int(np.count_nonzero(reference != signature))
+
+    def should_infer(self, stream, frame):
+        """
+        Decide whether a frame has changed enough to run inference on it.
+
+        Args:
+            stream (str): The video or source the frame belongs to.
+            frame (numpy.ndarray): The BGR frame.
+
+        Returns:
+            bool: True to run inference, False to skip the frame.
+        """
+        signature = self._signature(frame)
+        with self._lock:
+            self._checked += 1
+            reference = self._reference.get(stream)
+            skipped_in_row = self._skipped_in_row.get(stream, 0)
+
+            if (reference is None or skipped_in_row >= self.max_skip
+                    or self._change(reference, signature) > self.threshold):
+                self._reference[stream] = signature
+                self._skipped_in_row[stream] = 0
+                return True
+
+            self._skipped_in_row[stream] = skipped_in_row + 1
+            self._skipped += 1
+            return False
+
+    def stats(self):
+        """
+        Get how many frames were checked and how many inferences were skipped.
+        """
+        with self._lock:
+            return {
+                "checked": self._checked,
+                "skipped": self._skipped,
+                "skip_ratio": self._skipped / self._checked if self._checked else 0.0,
+            }
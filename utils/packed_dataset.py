@@ -0,0 +1,185 @@
+import glob
+import os
+import shutil
+import cv2
+import numpy as np
+
+PACKED_DIR = "packed"
+SPLITS = ("train", "test", "val")
+
+class PackedDatasetWriter:
+    """
+    Write encoded images into large shard files with a columnar label index.
+
+    Each split gets its own directory. Images are appended to
+    "<prefix>_<n>.bin" shards, and on close one "<prefix>.npz" index is
+    written per split. It holds the image names, their shard, offset and
+    length, and the labels of every image as flat class/xywh arrays. Writers
+    with different prefixes can fill the same directory concurrently.
+    """
+
+    def __init__(self, output_dir, prefix, shard_bytes=256 * (1 << 20), jpeg_quality=95):
+        """
+        Args:
+            output_dir (str): The dataset directory, shards go under its "packed" subdirectory.
+            prefix (str): Unique name for this writer's shards and index.
+            shard_bytes (int): Start a new shard once the current one reaches this size.
+            jpeg_quality (int): JPEG quality of the stored images.
+        """
+        self.root = os.path.join(output_dir, PACKED_DIR)
+        self.prefix = prefix
+        self.shard_bytes = shard_bytes
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+        self._splits = {}
+
+    def _split_state(self, split):
+        state = self._splits.get(split)
+        if state is None:
+            split_dir = os.path.join(self.root, split)
+            os.makedirs(split_dir, exist_ok=True)
+            state = {"dir": split_dir, "shard": -1, "file": None, "size": 0,
+                     "names": [], "shards": [], "offsets": [], "lengths": [],
+                     "label_counts": [], "classes": [], "boxes": []}
+            self._splits[split] = state
+        return state
+
+    def add(self, split, name, image, labels=None):
+        """
+        Encode and append one image with its labels.
+
+        Args:
+            split (str): One of "train", "test" or "val".
+            name (str): Name of the image, unique within the dataset.
+            image (numpy.ndarray): The BGR image.
+            labels (numpy.ndarray): (N, 5) rows of class, x_center, y_center, width, height, normalized.
+        """
+        state = self._split_state(split)
+        ok, encoded = cv2.imencode(".jpg", image, self.params)
+        if not ok:
+            raise ValueError(f"Could not encode {name}")
+        data = encoded.tobytes()
+
+        if state["file"] is None or state["size"] >= self.shard_bytes:
+            if state["file"] is not None:
+                state["file"].close()
+            state["shard"] += 1
+            state["file"] = open(os.path.join(state["dir"], f"{self.prefix}_{state['shard']:05d}.bin"), "wb")
+            state["size"] = 0
+
+        state["names"].append(name)
+        state["shards"].append(f"{self.prefix}_{state['shard']:05d}.bin")
+        state["offsets"].append(state["size"])
+        state["lengths"].append(len(data))
+        state["file"].write(data)
+        state["size"] += len(data)
+
+        labels = np.zeros((0, 5), dtype=np.float32) if labels is None else np.asarray(labels, dtype=np.float32)
+        state["label_counts"].append(len(labels))
+        state["classes"].append(labels[:, 0].astype(np.int16))
+        state["boxes"].append(labels[:, 1:5])
+
+    def close(self):
+        """
+        Close the open shards and write the index of every split.
+        """
+        for state in self._splits.values():
+            if state["file"] is not None:
+                state["file"].close()
+                state["file"] = None
+            np.savez(os.path.join(state["dir"], f"{self.prefix}.npz"),
+                     names=np.array(state["names"]),
+                     shards=np.array(state["shards"]),
+                     offsets=np.array(state["offsets"], dtype=np.int64),
+                     lengths=np.array(state["lengths"], dtype=np.int64),
+                     label_counts=np.array(state["label_counts"], dtype=np.int32),
+                     classes=np.concatenate(state["classes"]) if state["classes"] else np.zeros(0, np.int16),
+                     boxes=np.concatenate(state["boxes"]) if state["boxes"] else np.zeros((0, 4), np.float32))
+        self._splits = {}
+
+def clear_packed(output_dir):
+    """
+    Remove every shard and index of a dataset's packed splits.
+
+    PackedDataset reads every index in a split directory, so a full rebuild
+    clears them first; otherwise the indexes of an earlier run, written under
+    other prefixes, would be read as duplicated samples.
+    """
+    shutil.rmtree(os.path.join(output_dir, PACKED_DIR), ignore_errors=True)
+
+class PackedDataset:
+    """
+    Read one split of a packed dataset.
+
+    Shards are memory-mapped, so reading an image is a slice and a JPEG
+    decode with no file open per sample.
+    """
+
+    def __init__(self, split_dir):
+        """
+        Args:
+            split_dir (str): The split directory, e.g. "Dataset/Processed/packed/train".
+        """
+        self.split_dir = split_dir
+        names, shards, offsets, lengths, counts, classes, boxes = [], [], [], [], [], [], []
+        for index_path in sorted(glob.glob(os.path.join(split_dir, "*.npz"))):
+            with np.load(index_path) as index:
+                names.append(index["names"])
+                shards.append(index["shards"])
+                offsets.append(index["offsets"])
+                lengths.append(index["lengths"])
+                counts.append(index["label_counts"])
+                classes.append(index["classes"])
+                boxes.append(index["boxes"])
+
+        def join(parts, dtype, shape=(0,)):
+            return np.concatenate(parts) if parts else np.zeros(shape, dtype)
+
+        self.names = join(names, str)
+        self.shards = join(shards, str)
+        self.offsets = join(offsets, np.int64)
+        self.lengths = join(lengths, np.int64)
+        self.label_counts = join(counts, np.int32)
+        self.classes = join(classes, np.int16)
+        self.boxes = join(boxes, np.float32, (0, 4))
+        self.label_starts = np.concatenate([[0], np.cumsum(self.label_counts)[:-1]]).astype(np.int64)
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _shard(self, name):
+        shard = self._maps.get(name)
+        if shard is None:
+            shard = np.memmap(os.path.join(self.split_dir, name), dtype=np.uint8, mode="r")
+            self._maps[name] = shard
+        return shard
+
+    def read_bytes(self, i):
+        """
+        Get the encoded bytes of image i without copying them.
+        """
+        offset = self.offsets[i]
+        return self._shard(self.shards[i])[offset:offset + self.lengths[i]]
+
+    def read_image(self, i):
+        """
+        Decode image i as a BGR array.
+        """
+        return cv2.imdecode(np.asarray(self.read_bytes(i)), cv2.IMREAD_COLOR)
+
+    def labels(self, i):
+        """
+        Get the labels of image i.
+
+        Returns:
+            tuple: (classes, boxes) with boxes as normalized xywh.
+        """
+        start = self.label_starts[i]
+        end = start + self.label_counts[i]
+        return self.classes[start:end], self.boxes[start:end]
+
+    def __getstate__(self):
+        # Memory maps are reopened in worker processes
+        state = self.__dict__.copy()
+        state["_maps"] = {}
+        return state
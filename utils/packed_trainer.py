@@ -0,0 +1,112 @@
+import math
+import os
+import cv2
+import numpy as np
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import de_parallel
+from utils.packed_dataset import PackedDataset
+
+class PackedYOLODataset(YOLODataset):
+    """
+    YOLODataset reading images and labels from a packed split instead of loose files.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.packed = PackedDataset(kwargs["img_path"])
+        super().__init__(*args, **kwargs)
+
+    def get_img_files(self, img_path):
+        # Names only identify the samples, nothing is read from these paths
+        names = [os.path.join(img_path, f"{name}.jpg") for name in self.packed.names]
+        if self.fraction < 1:
+            names = names[: round(len(names) * self.fraction)]
+        return names
+
+    def get_labels(self):
+        labels = []
+        for i in range(len(self.im_files)):
+            classes, boxes = self.packed.labels(i)
+            labels.append({
+                "im_file": self.im_files[i],
+                "shape": (640, 640),
+                "cls": classes.astype(np.float32).reshape(-1, 1),
+                "bboxes": boxes.astype(np.float32),
+                "segments": [],
+                "keypoints": None,
+                "normalized": True,
+                "bbox_format": "xywh",
+            })
+        return labels
+
+    def load_image(self, i, rect_mode=True):
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+
+        im = self.packed.read_image(i)
+        h0, w0 = im.shape[:2]
+        if rect_mode:
+            r = self.imgsz / max(h0, w0)
+            if r != 1:
+                w, h = (min(math.ceil(w0 * r), self.imgsz), min(math.ceil(h0 * r), self.imgsz))
+                im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+        elif not (h0 == w0 == self.imgsz):
+            im = cv2.resize(im, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+
+        # Keep recently loaded images around for mosaic augmentation, as the base class does
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, (h0, w0), im.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != "ram":
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+
+        return im, (h0, w0), im.shape[:2]
+
+class PackedDetectionTrainer(DetectionTrainer):
+    """
+    DetectionTrainer whose train/val paths point at packed split directories.
+    """
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        cfg = self.args
+        return PackedYOLODataset(
+            img_path=img_path,
+            imgsz=cfg.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=cfg,
+            rect=cfg.rect or mode == "val",
+            # Shards are memory-mapped, the page cache already keeps them resident
+            cache=None,
+            single_cls=cfg.single_cls or False,
+            stride=gs,
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=colorstr(f"{mode}: "),
+            task=cfg.task,
+            classes=cfg.classes,
+            data=self.data,
+            fraction=cfg.fraction if mode == "train" else 1.0,
+        )
+
+def write_packed_data_yaml(output_dir, names=None):
+    """
+    Write a data yaml pointing at the packed splits of a dataset.
+
+    Returns:
+        str: The path of the yaml file.
+    """
+    names = names or {0: "paisa"}
+    yaml_path = os.path.join(output_dir, "data_packed.yaml")
+    with open(yaml_path, "w") as f:
+        f.write(f"path: {output_dir}\n")
+        f.write("train: packed/train\n")
+        f.write("val: packed/val\n")
+        f.write("test: packed/test\n\n")
+        f.write("names:\n")
+        for index, name in names.items():
+            f.write(f"    {index}: {name}\n")
+    return yaml_path
@@ -0,0 +1,123 @@
+import json
+import os
+import random
+from multiprocessing import Pool, cpu_count
+from utils.dataset_creator import convert_to_training_frames, default_augmenter, FRAME_SAVE_INTERVAL
+from utils.decode_pool import build_decode_tasks
+from utils.packed_dataset import clear_packed
+
+MANIFEST_NAME = "manifest.jsonl"
+SHARD_DIR = "manifests"
+
+def _convert_task(task_id, video_path, start, stop, output_dir, seed, frame_cache, output_format, augmenter,
+                  save_arrays, logger):
+    """
+    Worker: convert one frame range of a video and write its manifest shard.
+    """
+    records = convert_to_training_frames(video_path, output_dir, logger, seed=seed, start=start, stop=stop,
+                                         frame_cache=frame_cache, output_format=output_format, augmenter=augmenter,
+                                         save_arrays=save_arrays)
+
+    shard_path = os.path.join(output_dir, SHARD_DIR, f"shard_{task_id:05d}.jsonl")
+    with open(shard_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return shard_path
+
+def _run_convert_task(args):
+    return _convert_task(*args)
+
+def merge_manifests(output_dir, shard_paths):
+    """
+    Merge manifest shards into a single manifest ordered by video and frame.
+
+    Args:
+        output_dir (str): The dataset directory.
+        shard_paths (list): Paths of the shards to merge, removed once merged.
+
+    Returns:
+        str: The path of the merged manifest.
+    """
+    records = []
+    for shard_path in shard_paths:
+        with open(shard_path, "r") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+
+    records.sort(key=lambda record: (record["video"], record["frame_index"]))
+
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(manifest_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+    for shard_path in shard_paths:
+        os.remove(shard_path)
+    return manifest_path
+
+def build_dataset_parallel(video_paths, output_dir, logger, num_workers=None, segment_frames=None, seed=None,
+                           frame_cache=None, output_format="files", augmenter=None, save_arrays=False):
+    """
+    Convert videos to a training dataset across a process pool.
+
+    Work is split by video, and by frame range when segment_frames is set.
+    Each task writes its own manifest shard, and the shards are merged at the
+    end. Augmentations are seeded per block of frames at fixed positions in
+    each video, so for a fixed seed the output does not depend on the
+    number of workers or on the split.
+
+    video_paths may also be an iterator that yields videos as they become
+    available, e.g. DownloadManager.stream(); each video is converted as
+    soon as it is yielded, while the next ones are still arriving.
+
+    Args:
+        video_paths (list): Paths of the videos to convert, or an iterator of them.
+        output_dir (str): The directory to save the dataset to.
+        logger (logging.Logger): The logger to use for logging.
+        num_workers (int): Number of processes, defaults to the CPU count.
+        segment_frames (int): Split videos into tasks of this many frames.
+        seed (int): Seed for the augmentations, a random one is drawn if not given.
+        frame_cache (FrameCache): Optional cache to read the resized frames through.
+        output_format (str): "files" or "packed", see convert_to_training_frames.
+        augmenter (AugmentationEngine): The augmentations to apply, see convert_to_training_frames.
+        save_arrays (bool): Also save the frames as .npy arrays, see convert_to_training_frames.
+
+    Returns:
+        str: The path of the merged manifest.
+    """
+    # Forked workers would otherwise share the parent's random state
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+        logger.info(f"Using dataset seed {seed}")
+
+    os.makedirs(os.path.join(output_dir, SHARD_DIR), exist_ok=True)
+    if output_format == "packed":
+        # Shards of a previous build would otherwise be read alongside the new ones
+        clear_packed(output_dir)
+
+    # Frames are read at the augmented size, which is what the cache holds them at
+    size = ((augmenter or default_augmenter).width, (augmenter or default_augmenter).height)
+
+    def split(paths):
+        return build_decode_tasks(paths, segment_frames, frame_cache, stride=FRAME_SAVE_INTERVAL, resize=size)
+
+    if isinstance(video_paths, (list, tuple)):
+        tasks = split(video_paths)
+        num_workers = min(num_workers or cpu_count(), len(tasks)) or 1
+        logger.info(f"Converting {len(video_paths)} videos as {len(tasks)} tasks on {num_workers} workers")
+    else:
+        # Split each video only once it arrives
+        tasks = (task for video_path in video_paths for task in split([video_path]))
+        num_workers = num_workers or cpu_count()
+        logger.info(f"Converting videos as they arrive on {num_workers} workers")
+
+    args = ((task_id, video_path, start, stop, output_dir, seed, frame_cache, output_format, augmenter,
+             save_arrays, logger)
+            for task_id, (video_path, start, stop) in enumerate(tasks))
+
+    # Tasks are handed out as they are generated, so the pool never waits for the whole list
+    with Pool(processes=num_workers) as pool:
+        shard_paths = list(pool.imap_unordered(_run_convert_task, args))
+
+    manifest_path = merge_manifests(output_dir, shard_paths)
+    logger.info(f"Dataset manifest written to {manifest_path}")
+    return manifest_path
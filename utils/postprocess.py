@@ -0,0 +1,102 @@
+from collections import namedtuple
+import numpy as np
+
+# Accepted detections of a batch, one row per box
+Detections = namedtuple("Detections", ["frame_ids", "boxes", "confs", "classes"])
+
+def to_numpy(values):
+    """
+    Convert a torch tensor or array-like to a numpy array without copying when possible.
+    """
+    if hasattr(values, "detach"):
+        values = values.detach().cpu().numpy()
+    return np.asarray(values)
+
+def expand_boxes(xywh, frame_sizes, width_scale=1.3, height_scale=1.7):
+    """
+    Scale xywh boxes around their centre and convert them to clipped integer xyxy.
+
+    Args:
+        xywh (numpy.ndarray): (N, 4) boxes as centre x, centre y, width, height.
+        frame_sizes (numpy.ndarray): (N, 2) height and width of the frame of each box.
+        width_scale (float): Factor applied to the box width.
+        height_scale (float): Factor applied to the box height.
+
+    Returns:
+        numpy.ndarray: (N, 4) int32 boxes as x1, y1, x2, y2.
+    """
+    xywh = np.asarray(xywh, dtype=np.float32)
+    half_w = xywh[:, 2] * (width_scale / 2)
+    half_h = xywh[:, 3] * (height_scale / 2)
+
+    xyxy = np.stack([xywh[:, 0] - half_w, xywh[:, 1] - half_h,
+                     xywh[:, 0] + half_w, xywh[:, 1] + half_h], axis=1)
+    xyxy = np.trunc(xyxy).astype(np.int32)
+
+    # Clip to the frame boundaries
+    heights = frame_sizes[:, 0:1]
+    widths = frame_sizes[:, 1:2]
+    np.clip(xyxy[:, 0::2], 0, widths, out=xyxy[:, 0::2])
+    np.clip(xyxy[:, 1::2], 0, heights, out=xyxy[:, 1::2])
+    return xyxy
+
+def postprocess_batch(results, frames, conf_threshold=0.7, width_scale=1.3, height_scale=1.7):
+    """
+    Filter, expand and clip the boxes of a whole batch of results at once.
+
+    Args:
+        results (list): Ultralytics results, one per frame.
+        frames (list): The frames the results belong to.
+        conf_threshold (float): Minimum confidence for a box to be kept.
+        width_scale (float): Factor applied to the box width.
+        height_scale (float): Factor applied to the box height.
+
+    Returns:
+        Detections: Accepted boxes with the index of the frame they belong to.
+    """
+    xywh, confs, classes, frame_ids = [], [], [], []
+    for i, result in enumerate(results):
+        count = len(result.boxes)
+        if not count:
+            continue
+        xywh.append(to_numpy(result.boxes.xywh))
+        confs.append(to_numpy(result.boxes.conf))
+        classes.append(to_numpy(result.boxes.cls))
+        frame_ids.append(np.full(count, i, dtype=np.int32))
+
+    if not xywh:
+        return Detections(np.empty(0, np.int32), np.empty((0, 4), np.int32),
+                          np.empty(0, np.float32), np.empty(0, np.int32))
+
+    xywh = np.concatenate(xywh)
+    confs = np.concatenate(confs)
+    classes = np.concatenate(classes).astype(np.int32)
+    frame_ids = np.concatenate(frame_ids)
+
+    keep = confs > conf_threshold
+    xywh, confs, classes, frame_ids = xywh[keep], confs[keep], classes[keep], frame_ids[keep]
+
+    frame_sizes = np.array([frame.shape[:2] for frame in frames], dtype=np.int32)[frame_ids]
+    boxes = expand_boxes(xywh, frame_sizes, width_scale, height_scale)
+
+    # Only keep boxes that still have an area after clipping
+    valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+    return Detections(frame_ids[valid], boxes[valid], confs[valid], classes[valid])
+
+def extract_crops(frames, detections):
+    """
+    Copy out the region of every accepted box.
+
+    Only the crops are copied, frames without accepted boxes are never touched.
+
+    Args:
+        frames (list): The frames of the batch.
+        detections (Detections): Output of postprocess_batch.
+
+    Returns:
+        list: (frame_id, crop) tuples.
+    """
+    crops = []
+    for frame_id, (x1, y1, x2, y2) in zip(detections.frame_ids.tolist(), detections.boxes.tolist()):
+        crops.append((frame_id, frames[frame_id][y1:y2, x1:x2].copy()))
+    return crops
@@ -0,0 +1,124 @@
+import math
+import cv2
+import numpy as np
+
+class TextOverlay:
+    """
+    Draw Hershey text onto frames from cached glyph sprites.
+
+    Every glyph is rendered with putText once per (font, scale, thickness) and
+    kept as a small mask. Strings are assembled from the sprites, rotated as a
+    tight patch and added onto the frame in place, so no full-frame canvas is
+    allocated, warped or blended.
+    """
+
+    def __init__(self):
+        self._glyphs = {}
+
+    def glyph(self, char, font, font_scale, thickness):
+        """
+        Get the sprite of one character.
+
+        Returns:
+            tuple: (mask, origin_x, origin_y, advance), mask is None for blank characters.
+        """
+        key = (char, font, font_scale, thickness)
+        cached = self._glyphs.get(key)
+        if cached is not None:
+            return cached
+
+        (width, height), baseline = cv2.getTextSize(char, font, font_scale, thickness)
+        # getTextSize only reports whole pixels, measure a run of the glyph for a precise advance
+        run_width = cv2.getTextSize(char * 11, font, font_scale, thickness)[0][0]
+        advance = (run_width - width) / 10
+
+        pad = thickness + 2
+        origin_x, origin_y = pad, pad + height
+        mask = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+        cv2.putText(mask, char, (origin_x, origin_y), font, font_scale, 255, thickness)
+
+        cached = (mask if mask.any() else None, origin_x, origin_y, advance)
+        self._glyphs[key] = cached
+        return cached
+
+    def render_mask(self, text, font, font_scale, thickness):
+        """
+        Assemble the mask of a whole string from glyph sprites.
+
+        Returns:
+            tuple: (mask, origin_x, origin_y), the origin is the bottom-left of the text in the mask.
+        """
+        glyphs = [self.glyph(char, font, font_scale, thickness) for char in text]
+
+        # Lay out the glyphs along the baseline
+        positions = []
+        pen_x = 0.0
+        left, right, top, bottom = 0, 1, 0, 1
+        for mask, origin_x, origin_y, advance in glyphs:
+            if mask is not None:
+                x = int(round(pen_x)) - origin_x
+                y = -origin_y
+                positions.append((mask, x, y))
+                left = min(left, x)
+                right = max(right, x + mask.shape[1])
+                top = min(top, y)
+                bottom = max(bottom, y + mask.shape[0])
+            pen_x += advance
+
+        text_mask = np.zeros((bottom - top, right - left), dtype=np.uint8)
+        for mask, x, y in positions:
+            region = text_mask[y - top:y - top + mask.shape[0], x - left:x - left + mask.shape[1]]
+            np.maximum(region, mask, out=region)
+        return text_mask, -left, -top
+
+    def draw(self, frame, text, org, font, font_scale, color, thickness, angle=0.0, center=None):
+        """
+        Draw text onto a frame in place, optionally rotated about a point.
+
+        Matches cv2.putText on a blank canvas followed by cv2.warpAffine and a
+        saturating add onto the frame, but only touches the text's own region.
+
+        Args:
+            frame (numpy.ndarray): The BGR frame to draw on.
+            text (str): The text to draw.
+            org (tuple): Bottom-left corner of the text, as in cv2.putText.
+            font (int): Hershey font.
+            font_scale (float): Font scale.
+            color (tuple): BGR colour.
+            thickness (int): Line thickness.
+            angle (float): Rotation in degrees, counter-clockwise as in cv2.getRotationMatrix2D.
+            center (tuple): Rotation centre in frame coordinates.
+        """
+        mask, origin_x, origin_y = self.render_mask(text, font, font_scale, thickness)
+        # Top-left of the mask in frame coordinates
+        left = org[0] - origin_x
+        top = org[1] - origin_y
+
+        if angle:
+            center_x, center_y = int(round(center[0])), int(round(center[1]))
+            # Square patch around the rotation centre that holds the mask at any angle
+            corners = [(left, top), (left + mask.shape[1], top),
+                       (left, top + mask.shape[0]), (left + mask.shape[1], top + mask.shape[0])]
+            radius = int(math.ceil(max(math.hypot(cx - center_x, cy - center_y) for cx, cy in corners))) + 1
+            size = 2 * radius + 1
+
+            patch = np.zeros((size, size), dtype=np.uint8)
+            px, py = left - center_x + radius, top - center_y + radius
+            patch[py:py + mask.shape[0], px:px + mask.shape[1]] = mask
+
+            rotation_matrix = cv2.getRotationMatrix2D((radius, radius), angle, 1.0)
+            mask = cv2.warpAffine(patch, rotation_matrix, (size, size))
+            left, top = center_x - radius, center_y - radius
+
+        # Clip the patch to the frame
+        height, width = frame.shape[:2]
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + mask.shape[1], width), min(top + mask.shape[0], height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        mask = mask[y0 - top:y1 - top, x0 - left:x1 - left]
+
+        # Scale the colour by the mask, as the interpolated canvas would have been
+        overlay = (mask[..., None].astype(np.float32) * (np.asarray(color[:3], dtype=np.float32) / 255) + 0.5)
+        roi = frame[y0:y1, x0:x1]
+        roi[...] = cv2.add(roi, overlay.astype(np.uint8))
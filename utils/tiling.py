@@ -0,0 +1,182 @@
+import numpy as np
+from utils.postprocess import to_numpy
+
+def tile_grid(height, width, tile_size=640, overlap=0.2):
+    """
+    Cover a frame with square tiles that overlap by a fraction of their size.
+
+    The last row and column are aligned to the frame edge instead of
+    running past it, so every tile lies inside the frame.
+
+    Returns:
+        list: (x1, y1, x2, y2) tiles.
+    """
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        return list(range(0, length - tile_size, step)) + [length - tile_size]
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+def overlap_matrix(boxes_a, boxes_b, metric="ios"):
+    """
+    Compute the overlap of every pair of xyxy boxes.
+
+    Args:
+        metric (str): "iou" for intersection over union, "ios" for intersection over
+            the smaller box, which also matches a box cut at a tile edge with the whole box.
+
+    Returns:
+        numpy.ndarray: (len(boxes_a), len(boxes_b)) overlap values.
+    """
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    if metric == "iou":
+        denominator = area_a[:, None] + area_b[None, :] - intersection
+    else:
+        denominator = np.minimum(area_a[:, None], area_b[None, :])
+    return intersection / np.maximum(denominator, 1e-6)
+
+def nms(boxes, scores, classes, threshold=0.5, metric="ios"):
+    """
+    Greedy class-aware non-maximum suppression.
+
+    Returns:
+        numpy.ndarray: Indices of the kept boxes, highest score first.
+    """
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        overlaps = overlap_matrix(boxes[best:best + 1], boxes[rest], metric)[0]
+        order = rest[(overlaps <= threshold) | (classes[rest] != classes[best])]
+    return np.array(keep, dtype=np.int64)
+
+class SlicedBoxes:
+    """Merged boxes of one frame, with the attributes post-processing reads from ultralytics Boxes"""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    @property
+    def xywh(self):
+        xyxy = self.xyxy
+        return np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2, (xyxy[:, 1] + xyxy[:, 3]) / 2,
+                         xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]], axis=1)
+
+    def __len__(self):
+        return len(self.conf)
+
+class SlicedResult:
+    """Detections of one frame merged across tiles"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+def _boxes_of(result, offset_x=0, offset_y=0):
+    xyxy = to_numpy(result.boxes.xyxy).astype(np.float32).reshape(-1, 4)
+    xyxy[:, 0::2] += offset_x
+    xyxy[:, 1::2] += offset_y
+    return xyxy, to_numpy(result.boxes.conf).astype(np.float32), to_numpy(result.boxes.cls).astype(np.float32)
+
+class SlicedDetector:
+    """
+    Run a detector on overlapping tiles of each frame at native resolution.
+
+    Small objects that full-frame inference shrinks below detectable size
+    keep their pixels in the tiles. The tiles of a whole batch of frames
+    go through the model together, and their boxes are mapped back to
+    frame coordinates and merged with cross-tile NMS.
+
+    In "tiles" mode every tile is run, plus a full-frame pass for objects
+    larger than a tile. In "refine" mode a low-confidence full-frame pass
+    finds candidates first, and only the tile holding most of each
+    candidate is run.
+    Calling it matches calling a Detector, the results expose the boxes
+    that utils.postprocess reads.
+    """
+
+    def __init__(self, detector, mode="tiles", tile_size=640, overlap=0.2, batch_size=16, full_frame=True,
+                 coarse_conf=0.1, nms_threshold=0.5, nms_metric="ios"):
+        """
+        Args:
+            detector (Detector): The model to run on the frames and tiles.
+            mode (str): "tiles" to run every tile, "refine" to only run tiles with coarse candidates.
+            tile_size (int): Side of the square tiles, in frame pixels.
+            overlap (float): Fraction of a tile shared with its neighbours.
+            batch_size (int): Tiles per model call.
+            full_frame (bool): Also run the full frame in "tiles" mode, for objects larger than a tile.
+            coarse_conf (float): Confidence needed by a coarse candidate in "refine" mode.
+            nms_threshold (float): Overlap above which the lower scoring of two boxes is dropped.
+            nms_metric (str): "ios" or "iou", see overlap_matrix.
+        """
+        if mode not in ("tiles", "refine"):
+            raise ValueError(f"Unsupported sliced inference mode: {mode}")
+        self.detector = detector
+        self.mode = mode
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.full_frame = full_frame
+        self.coarse_conf = coarse_conf
+        self.nms_threshold = nms_threshold
+        self.nms_metric = nms_metric
+        self.tiles_run = 0
+
+    def _regions(self, frame, candidates):
+        tiles = tile_grid(frame.shape[0], frame.shape[1], self.tile_size, self.overlap)
+        if candidates is None:
+            return tiles
+        if not len(candidates):
+            return []
+        # The tile holding the largest part of each candidate
+        covered = overlap_matrix(np.array(tiles, dtype=np.float32), candidates, "ios")
+        return [tiles[j] for j in np.unique(covered.argmax(axis=0))]
+
+    def __call__(self, frames, imgsz=None, **kwargs):
+        parts = [[] for _ in frames]
+
+        candidates = [None] * len(frames)
+        if self.mode == "refine":
+            coarse_kwargs = dict(kwargs, conf=self.coarse_conf)
+            for i, result in enumerate(self.detector(frames, imgsz=imgsz, **coarse_kwargs)):
+                parts[i].append(_boxes_of(result))
+                candidates[i] = parts[i][-1][0]
+        elif self.full_frame:
+            for i, result in enumerate(self.detector(frames, imgsz=imgsz, **kwargs)):
+                parts[i].append(_boxes_of(result))
+
+        # Tiles are views into the frames, no pixels are copied
+        tiles = [(i, x1, y1, frame[y1:y2, x1:x2])
+                 for i, frame in enumerate(frames) for x1, y1, x2, y2 in self._regions(frame, candidates[i])]
+        self.tiles_run += len(tiles)
+        for start in range(0, len(tiles), self.batch_size):
+            chunk = tiles[start:start + self.batch_size]
+            results = self.detector([tile for _, _, _, tile in chunk], imgsz=self.tile_size, **kwargs)
+            for (i, x1, y1, _), result in zip(chunk, results):
+                parts[i].append(_boxes_of(result, x1, y1))
+
+        merged = []
+        for frame_parts in parts:
+            if not frame_parts:
+                merged.append(SlicedResult(SlicedBoxes(np.empty((0, 4), np.float32), np.empty(0, np.float32),
+                                                       np.empty(0, np.float32))))
+                continue
+            xyxy = np.concatenate([p[0] for p in frame_parts])
+            conf = np.concatenate([p[1] for p in frame_parts])
+            cls = np.concatenate([p[2] for p in frame_parts])
+            keep = nms(xyxy, conf, cls, self.nms_threshold, self.nms_metric)
+            merged.append(SlicedResult(SlicedBoxes(xyxy[keep], conf[keep], cls[keep])))
+        return merged
@@ -0,0 +1,203 @@
+import itertools
+from uuid import uuid4
+import cv2
+import numpy as np
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Compute the IoU of every pair of xyxy boxes.
+
+    Returns:
+        numpy.ndarray: (len(boxes_a), len(boxes_b)) IoU values.
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+def sharpness(crop):
+    """
+    Score how sharp a crop is as the variance of its Laplacian.
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+class Track:
+    """
+    One object followed across frames, keeping only its best crop.
+    """
+    __slots__ = ("track_id", "stream", "box", "hits", "misses", "first_frame", "last_frame",
+                 "best_frame", "best_conf", "best_score", "best_crop", "best_box")
+
+    def __init__(self, track_id, stream, frame_index, box, conf, crop, score):
+        self.track_id = track_id
+        self.stream = stream
+        self.box = box
+        self.hits = 1
+        self.misses = 0
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.best_frame = frame_index
+        self.best_conf = conf
+        self.best_score = score
+        self.best_crop = crop
+        self.best_box = box
+
+    def record(self):
+        """
+        Get the summary of the track, without its crop.
+        """
+        return {
+            "track_id": self.track_id,
+            "stream": self.stream,
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "hits": self.hits,
+            "best_frame": self.best_frame,
+            "best_conf": float(self.best_conf),
+            "best_box": [int(v) for v in self.best_box],
+        }
+
+class IoUTracker:
+    """
+    Associate detections across frames by box overlap, SORT-style without motion model.
+
+    Each stream (video or live source) is tracked separately. A track ends
+    once it has gone unmatched for max_age sampled frames, and is then
+    returned with its best crop so only one crop per object is written.
+    Track ids are unique across the streams of a tracker, and run_id tells
+    the trackers of different runs apart.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=3, select="confidence", stable_hits=3):
+        """
+        Args:
+            iou_threshold (float): Minimum IoU to continue a track.
+            max_age (int): Sampled frames a track may go unmatched before it ends.
+            select (str): Keep the crop with the best "confidence" or "sharpness".
+            stable_hits (int): Hits after which a track counts as stable.
+        """
+        if select not in ("confidence", "sharpness"):
+            raise ValueError(f"Unsupported crop selection: {select}")
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.select = select
+        self.stable_hits = stable_hits
+        self.run_id = uuid4().hex[:12]
+        self._ids = itertools.count(1)
+        self._tracks = {}
+        self._last_frame = {}
+        self._new_tracks = {}
+
+    def _score(self, conf, crop):
+        return sharpness(crop) if self.select == "sharpness" else float(conf)
+
+    def update(self, stream, frame_index, boxes, confs, crops):
+        """
+        Feed the detections of one frame.
+
+        Args:
+            stream (str): The video or source the frame belongs to.
+            frame_index (int): Index of the frame in its stream.
+            boxes (numpy.ndarray): (N, 4) xyxy boxes.
+            confs (numpy.ndarray): (N,) confidences.
+            crops (list): N crops, one per box.
+
+        Returns:
+            list: Tracks that ended with this frame.
+        """
+        finished = []
+        # Frames arriving out of order (e.g. from segmented decoding) start the stream over
+        if frame_index < self._last_frame.get(stream, -1):
+            finished.extend(self.flush(stream))
+        self._last_frame[stream] = frame_index
+
+        tracks = self._tracks.setdefault(stream, [])
+        unmatched = set(range(len(boxes)))
+
+        if tracks and len(boxes):
+            ious = iou_matrix([track.box for track in tracks], boxes)
+            # Greedy assignment, best overlaps first
+            for flat in np.argsort(ious, axis=None)[::-1]:
+                t, d = np.unravel_index(flat, ious.shape)
+                if ious[t, d] < self.iou_threshold:
+                    break
+                track = tracks[t]
+                if track.last_frame == frame_index or d not in unmatched:
+                    continue
+                unmatched.discard(d)
+                track.box = boxes[d]
+                track.hits += 1
+                track.misses = 0
+                track.last_frame = frame_index
+                score = self._score(confs[d], crops[d])
+                if score > track.best_score:
+                    track.best_score, track.best_conf = score, confs[d]
+                    track.best_crop, track.best_box, track.best_frame = crops[d], boxes[d], frame_index
+
+        # Age out tracks that were not matched
+        alive = []
+        for track in tracks:
+            if track.last_frame != frame_index:
+                track.misses += 1
+            if track.misses > self.max_age:
+                finished.append(track)
+            else:
+                alive.append(track)
+
+        for d in sorted(unmatched):
+            alive.append(Track(next(self._ids), stream, frame_index, boxes[d], confs[d], crops[d],
+                               self._score(confs[d], crops[d])))
+
+        self._tracks[stream] = alive
+        self._new_tracks[stream] = len(unmatched)
+        return finished
+
+    def is_stable(self, stream):
+        """
+        Check whether a stream has tracks and all of them are established.
+        """
+        tracks = self._tracks.get(stream)
+        if not tracks or self._new_tracks.get(stream):
+            return False
+        return all(track.hits >= self.stable_hits and track.misses == 0 for track in tracks)
+
+    def flush(self, stream=None):
+        """
+        End and return every open track, of one stream or of all of them.
+        """
+        streams = [stream] if stream is not None else list(self._tracks)
+        finished = []
+        for name in streams:
+            finished.extend(self._tracks.pop(name, []))
+            self._new_tracks.pop(name, None)
+        return finished
+
+class AdaptiveStride:
+    """
+    Widen the sampling stride of a stream while its tracks are stable.
+
+    The stride doubles after every stable update, up to max_stride, and drops
+    back to the base stride as soon as a track appears or is lost.
+    """
+
+    def __init__(self, base_stride, max_stride):
+        self.base_stride = base_stride
+        self.max_stride = max(max_stride, base_stride)
+        self._strides = {}
+
+    def stride(self, stream):
+        return self._strides.get(stream, self.base_stride)
+
+    def update(self, stream, stable):
+        if stable:
+            self._strides[stream] = min(self.stride(stream) * 2, self.max_stride)
+        else:
+            self._strides[stream] = self.base_stride
@@ -0,0 +1,164 @@
+import os
+import time
+from utils.metrics import metrics
+
+# Rough host memory one 640x640 image costs in a CPU training step: the input, activations and gradients
+CPU_BYTES_PER_IMAGE = 160 * (1 << 20)
+# Share of the available memory a CPU batch may take, the rest is left to the loaders and the cache
+CPU_MEMORY_FRACTION = 0.5
+MAX_CPU_BATCH = 32
+MAX_WORKERS = 8
+
+def usable_cores():
+    """
+    Get the number of cores this process may run on.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def available_memory():
+    """
+    Get the memory available to new allocations in bytes, without swapping.
+    """
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+def select_device(device=None):
+    """
+    Get the device to train on: the one asked for if usable, else the first GPU, else the CPU.
+    """
+    import torch
+
+    if device not in (None, "cpu") and not torch.cuda.is_available():
+        return "cpu"
+    if device is not None:
+        return device
+    return 0 if torch.cuda.is_available() else "cpu"
+
+def auto_workers(device, cores=None):
+    """
+    Get the number of data loader workers for a device.
+
+    On the CPU the loaders share the cores with the model, so they get half
+    of them; a GPU leaves all but one core to the loaders. Some ultralytics
+    versions load CPU training batches in the main process regardless.
+    """
+    cores = cores or usable_cores()
+    workers = cores // 2 if device == "cpu" else cores - 1
+    return max(1, min(workers, MAX_WORKERS))
+
+def auto_batch(device, imgsz=640, memory=None):
+    """
+    Get the batch size for a device.
+
+    GPUs use ultralytics AutoBatch (-1), which sizes the batch from the free
+    GPU memory. On the CPU the batch is sized from the available host
+    memory, and capped since larger batches do not train faster there.
+    """
+    if device != "cpu":
+        return -1
+    memory = memory or available_memory()
+    per_image = CPU_BYTES_PER_IMAGE * (imgsz / 640) ** 2
+    return int(max(1, min(memory * CPU_MEMORY_FRACTION // per_image, MAX_CPU_BATCH)))
+
+class EpochTimer:
+    """
+    Split each training epoch into time spent waiting for batches and time spent computing.
+
+    Registered as ultralytics callbacks: the data loader wait is the time
+    from the end of one batch to the start of the next, and the compute is
+    the forward, backward and optimizer step in between.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.data_seconds = metrics.histogram("stage_seconds", "Time spent per call of a pipeline stage",
+                                              stage="train_data")
+        self.compute_seconds = metrics.histogram("stage_seconds", "Time spent per call of a pipeline stage",
+                                                 stage="train_compute")
+        self._synchronize = None
+        self._reset()
+
+    def _reset(self):
+        self.data = 0.0
+        self.compute = 0.0
+        self.batches = 0
+        self._last = time.perf_counter()
+
+    def register(self, model):
+        model.add_callback("on_train_epoch_start", self.on_train_epoch_start)
+        model.add_callback("on_train_batch_start", self.on_train_batch_start)
+        model.add_callback("on_train_batch_end", self.on_train_batch_end)
+        model.add_callback("on_train_epoch_end", self.on_train_epoch_end)
+
+    def on_train_epoch_start(self, trainer):
+        if self._synchronize is None:
+            import torch
+
+            # GPU work is asynchronous, without waiting for it compute would show up as loading time
+            self._synchronize = torch.cuda.synchronize if trainer.device.type == "cuda" else (lambda: None)
+        self._reset()
+
+    def on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        self.data_seconds.observe(now - self._last)
+        self.data += now - self._last
+        self._last = now
+
+    def on_train_batch_end(self, trainer):
+        self._synchronize()
+        now = time.perf_counter()
+        self.compute_seconds.observe(now - self._last)
+        self.compute += now - self._last
+        self.batches += 1
+        self._last = now
+
+    def on_train_epoch_end(self, trainer):
+        total = self.data + self.compute
+        if self.logger and total:
+            self.logger.info(f"Epoch {trainer.epoch + 1}: {self.batches} batches, "
+                             f"data loading {self.data:.1f} s ({self.data / total:.0%}), "
+                             f"compute {self.compute:.1f} s ({self.compute / total:.0%})")
+
+def launch_training(model, data, device=None, batch=None, workers=None, cache=None, imgsz=640, logger=None,
+                    **train_args):
+    """
+    Train a YOLO model with settings sized for the machine it runs on.
+
+    Args:
+        model (YOLO): The model to train.
+        data (str): The dataset yaml.
+        device (str): Device to train on, None picks the GPU if there is one. A GPU that
+            is asked for but unavailable falls back to the CPU.
+        batch (int): Batch size, None sizes it for the device, see auto_batch.
+        workers (int): Data loader workers, None sizes them for the device, see auto_workers.
+        cache (str): "ram" to keep the decoded images in memory, "disk" to read them from
+            the .npy arrays next to the images, None to decode the images every epoch.
+        imgsz (int): Training image size.
+        logger (logging.Logger): The logger to use for logging.
+        **train_args: Passed on to model.train.
+
+    Returns:
+        The training results of ultralytics.
+    """
+    requested = device
+    device = select_device(device)
+    if logger and requested not in (None, "cpu") and device == "cpu":
+        logger.warning(f"Device {requested} is not available, training on the CPU")
+    batch = batch or auto_batch(device, imgsz)
+    workers = workers or auto_workers(device)
+    if logger:
+        logger.info(f"Training on {device} with batch {'auto' if batch == -1 else batch}, "
+                    f"{workers} workers, cache {cache or 'off'}")
+
+    EpochTimer(logger).register(model)
+    return model.train(data=data, device=device, batch=batch, workers=workers, cache=cache or False,
+                       imgsz=imgsz, **train_args)